@@ -0,0 +1,244 @@
+import ast
+import fnmatch
+import linecache
+import os
+import tracemalloc
+from collections import defaultdict
+
+# Per-frame allocation tracking built on tracemalloc.
+#
+# Traces are cleared at the start of every frame, so at the end of the frame
+# the traced memory holds exactly what the frame allocated and kept, and the
+# traced peak covers what it allocated at most at any one point, temporaries
+# included. The kept blocks are attributed to the innermost source line of
+# this repo that allocated them, and that line to a subsystem through
+# SUBSYSTEMS. Frames whose peak goes over the budget are flagged.
+#
+# Only the Python allocator is traced: pixel buffers SDL allocates for new
+# Surfaces are not counted, though the Surface objects themselves are.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+TRACEBACK_DEPTH = 16
+
+# Matched in order against "module:Class.function" of the allocating line
+SUBSYSTEMS = [
+    ('battle_royale:Particle.*', 'particles'),
+    ('battle_royale:Game.update_particles', 'particles'),
+    ('battle_royale:Game.emit_particles', 'particles'),
+    ('battle_royale:DamageNumber.*', 'damage numbers'),
+    ('battle_royale:Game.add_damage_number', 'damage numbers'),
+    ('battle_royale:Game.update_bullets', 'bullets'),
+    ('battle_royale:Game.handle_bullet_collision', 'bullets'),
+    ('battle_royale:Game.spawn_projectiles', 'bullets'),
+    ('battle_royale:Game.shoot', 'bullets'),
+    ('battle_royale:*.shoot', 'bullets'),
+    ('projectiles:*', 'bullets'),
+    ('collision:*', 'bullets'),
+    ('battle_royale:Game.move_bots', 'bot AI'),
+    ('battle_royale:Bot.*', 'bot AI'),
+    ('bot_planner:*', 'bot AI'),
+    ('battle_royale:Game.update_flow_field', 'bot AI'),
+    ('flow_field:*', 'bot AI'),
+    ('battle_royale:Game.update_safe_zone', 'storm'),
+    ('battle_royale:Game.check_zone_damage', 'storm'),
+    ('storm:*', 'storm'),
+    ('battle_royale:Game.update_world', 'world'),
+    ('battle_royale:Game.on_chunk_*', 'world'),
+    ('battle_royale:Game.update_render_index', 'world'),
+    ('world:*', 'world'),
+    ('line_of_sight:*', 'world'),
+    ('spatial_index:*', 'world'),
+    ('battle_royale:Game.render_view', 'render'),
+    ('battle_royale:Game.draw*', 'render'),
+    ('battle_royale:Game.overlay_lines', 'render'),
+    ('battle_royale:Camera.*', 'render'),
+    ('render_pipeline:*', 'render'),
+    ('minimap:*', 'render'),
+    ('quality:*', 'render'),
+    ('telemetry:*', 'telemetry'),
+    ('battle_royale:Game.record_*', 'telemetry'),
+]
+
+_functions = {}
+
+
+def function_ranges(filename):
+    # (first line, last line, qualified name) of every function in the file
+    ranges = _functions.get(filename)
+    if ranges is None:
+        ranges = []
+        try:
+            tree = ast.parse(''.join(linecache.getlines(filename)))
+        except SyntaxError:
+            tree = None
+
+        def visit(node, prefix):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    name = prefix + child.name
+                    if not isinstance(child, ast.ClassDef):
+                        ranges.append((child.lineno, child.end_lineno, name))
+                    visit(child, name + '.')
+        if tree is not None:
+            visit(tree, '')
+        _functions[filename] = ranges
+    return ranges
+
+
+def enclosing_function(filename, lineno):
+    # Innermost function around the line; module level code is '<module>'
+    best = None
+    for first, last, name in function_ranges(filename):
+        if first <= lineno <= last and (best is None or first >= best[0]):
+            best = (first, name)
+    return best[1] if best else '<module>'
+
+
+def subsystem(location):
+    for pattern, name in SUBSYSTEMS:
+        if fnmatch.fnmatchcase(location, pattern):
+            return name
+    return location.split(':')[0]
+
+
+class FrameAllocations:
+    def __init__(self, number, kept_bytes, peak_bytes, blocks):
+        self.number = number
+        self.kept_bytes = kept_bytes
+        self.peak_bytes = peak_bytes
+        self.blocks = blocks
+
+
+class AllocationProfiler:
+    # Call begin_frame() and end_frame() around each frame, then report().
+    # Keeps running totals per source line, so memory use stays flat however
+    # long the game runs.
+    def __init__(self, budget_bytes, report_path=None, top=30):
+        self.budget_bytes = budget_bytes
+        self.report_path = report_path
+        self.top = top
+        self.frames = 0
+        self.over_budget = []        # FrameAllocations of flagged frames
+        self.worst = None
+        self.last = None
+        self.total_kept = 0
+        self.total_peak = 0
+        # (filename, lineno) -> [bytes, blocks, frames seen in]
+        self.lines = defaultdict(lambda: [0, 0, 0])
+        self.locations = {}
+        self.started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_DEPTH)
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def begin_frame(self):
+        if not tracemalloc.is_tracing():
+            self.start()
+        tracemalloc.clear_traces()
+
+    def end_frame(self):
+        kept, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        self.frames += 1
+        blocks = 0
+        seen = set()
+        for trace in snapshot.traces:
+            key = self.owner(trace.traceback)
+            if key is None:
+                continue
+            totals = self.lines[key]
+            totals[0] += trace.size
+            totals[1] += 1
+            if key not in seen:
+                totals[2] += 1
+                seen.add(key)
+            blocks += 1
+
+        frame = FrameAllocations(self.frames, kept, peak, blocks)
+        self.last = frame
+        self.total_kept += kept
+        self.total_peak += peak
+        if self.worst is None or peak > self.worst.peak_bytes:
+            self.worst = frame
+        if peak > self.budget_bytes:
+            self.over_budget.append(frame)
+        return frame
+
+    def owner(self, traceback):
+        # Innermost frame in this repo (tracebacks run oldest first);
+        # allocations made inside the profiler itself are left out
+        for frame in reversed(traceback):
+            filename = frame.filename
+            if filename == __file__:
+                return None
+            if filename.startswith(ROOT) and 'site-packages' not in filename:
+                return (filename, frame.lineno)
+        return None
+
+    def location(self, key):
+        location = self.locations.get(key)
+        if location is None:
+            filename, lineno = key
+            module = os.path.splitext(os.path.relpath(filename, ROOT))[0].replace(os.sep, '.')
+            location = f"{module}:{enclosing_function(filename, lineno)}"
+            self.locations[key] = location
+        return location
+
+    def ranked_lines(self):
+        return sorted(self.lines.items(), key=lambda item: item[1][0], reverse=True)
+
+    def ranked_subsystems(self):
+        totals = defaultdict(lambda: [0, 0])
+        for key, (size, blocks, _) in self.lines.items():
+            name = subsystem(self.location(key))
+            totals[name][0] += size
+            totals[name][1] += blocks
+        return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+
+    def report_lines(self):
+        frames = max(self.frames, 1)
+        lines = [
+            f"Allocation profile: {self.frames} frames, budget {self.budget_bytes / 1024:.1f} KB peak per frame",
+            f"  kept per frame  {self.total_kept / frames / 1024:8.1f} KB average",
+            f"  peak per frame  {self.total_peak / frames / 1024:8.1f} KB average",
+        ]
+        if self.worst:
+            lines.append(f"  worst frame     {self.worst.peak_bytes / 1024:8.1f} KB peak (frame {self.worst.number})")
+        lines.append(f"  over budget     {len(self.over_budget)} frames "
+                     f"({len(self.over_budget) / frames:.1%})")
+        if self.over_budget:
+            shown = ', '.join(str(frame.number) for frame in self.over_budget[:20])
+            more = ', ...' if len(self.over_budget) > 20 else ''
+            lines.append(f"    frames {shown}{more}")
+
+        lines.append("")
+        lines.append("Kept bytes per frame by subsystem:")
+        for name, (size, blocks) in self.ranked_subsystems():
+            lines.append(f"  {size / frames:10.0f} B  {blocks / frames:8.1f} blocks  {name}")
+
+        lines.append("")
+        lines.append(f"Top {self.top} allocating lines (kept bytes per frame):")
+        for key, (size, blocks, seen) in self.ranked_lines()[:self.top]:
+            filename, lineno = key
+            location = self.location(key)
+            source = linecache.getline(filename, lineno).strip()
+            lines.append(f"  {size / frames:10.0f} B  {blocks / frames:8.1f} blocks  {seen / frames:6.1%} of frames  "
+                         f"[{subsystem(location)}] {location} "
+                         f"({os.path.relpath(filename, ROOT)}:{lineno})")
+            lines.append(f"      {source}")
+        return lines
+
+    def report(self):
+        lines = self.report_lines()
+        if self.report_path:
+            with open(self.report_path, 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+        return lines
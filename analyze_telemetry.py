@@ -0,0 +1,224 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+
+import telemetry
+from telemetry import EVENT_DTYPE, EVENT_NAMES, read_binary_header
+
+# Builds heatmaps and engagement statistics from recorded telemetry logs.
+#
+#   python analyze_telemetry.py logs/*.brtl --out report/ --jobs 8
+#
+# Binary logs are memory-mapped and every statistic is accumulated with
+# vectorized NumPy binning, one file per worker process.
+
+DISTANCE_BIN = 25       # Pixels per engagement distance bin
+MAX_DISTANCE = 1500
+TTK_BIN = 100           # Milliseconds per time-to-kill bin
+MAX_TTK = 20000
+HEATMAPS = ('shots', 'deaths', 'zone_damage')
+
+
+def read_header(path):
+    if path.endswith('.jsonl.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as stream:
+            return json.loads(stream.readline())['header']
+    return read_binary_header(path)[0]
+
+
+def load_events(path):
+    # Returns (header, records); binary logs are memory-mapped, not read
+    if path.endswith('.jsonl.gz'):
+        kinds = {name: kind for kind, name in EVENT_NAMES.items()}
+        with gzip.open(path, 'rt', encoding='utf-8') as stream:
+            header = json.loads(stream.readline())['header']
+            rows = []
+            for line in stream:
+                event = json.loads(line)
+                event['kind'] = kinds.get(event['kind'], 0)
+                rows.append(tuple(event[name] for name in EVENT_DTYPE.names))
+        return header, np.array(rows, dtype=EVENT_DTYPE)
+
+    header, offset = read_binary_header(path)
+    count = (os.path.getsize(path) - offset) // EVENT_DTYPE.itemsize
+    if count == 0:
+        return header, np.zeros(0, dtype=EVENT_DTYPE)
+    return header, np.memmap(path, dtype=EVENT_DTYPE, mode='r', offset=offset, shape=(count,))
+
+
+def weighted_heatmap(x, y, weights, shape, cell):
+    rows, cols = shape
+    col = np.clip((x // cell).astype(np.int64), 0, cols - 1)
+    row = np.clip((y // cell).astype(np.int64), 0, rows - 1)
+    return np.bincount(row * cols + col, weights=weights, minlength=rows * cols).reshape(shape)
+
+
+def analyze_file(job):
+    path, shape, cell, num_weapons = job
+    header, events = load_events(path)
+    kind = np.asarray(events['kind'])
+    x = np.asarray(events['x'], dtype=np.float64)
+    y = np.asarray(events['y'], dtype=np.float64)
+
+    result = {
+        'events': np.bincount(kind, minlength=max(EVENT_NAMES) + 1),
+        'heatmaps': {},
+    }
+
+    shots = kind == telemetry.SHOT
+    deaths = kind == telemetry.KILL
+    zone = kind == telemetry.ZONE_DAMAGE
+    result['heatmaps']['shots'] = weighted_heatmap(x[shots], y[shots], None, shape, cell)
+    result['heatmaps']['deaths'] = weighted_heatmap(x[deaths], y[deaths], None, shape, cell)
+    result['heatmaps']['zone_damage'] = weighted_heatmap(
+        x[zone], y[zone], np.asarray(events['value'][zone], dtype=np.float64), shape, cell)
+
+    # Engagement distance: how far the shooter stood from the target per hit
+    hits = (kind == telemetry.HIT) & (np.asarray(events['actor']) >= 0)
+    weapon = np.minimum(np.asarray(events['weapon'], dtype=np.int64), num_weapons - 1)
+    distance = np.hypot(x[hits] - events['src_x'][hits], y[hits] - events['src_y'][hits])
+    distance_bins = MAX_DISTANCE // DISTANCE_BIN
+    distance_bin = np.minimum((distance // DISTANCE_BIN).astype(np.int64), distance_bins - 1)
+    result['distance'] = np.bincount(weapon[hits] * distance_bins + distance_bin,
+                                      minlength=num_weapons * distance_bins
+                                      ).reshape(num_weapons, distance_bins)
+
+    # Time to kill: from the first hit a target takes in a match to the
+    # killing blow, credited to the weapon that landed it
+    match = np.cumsum(kind == telemetry.MATCH_START)
+    target = np.asarray(events['target'], dtype=np.int64)
+    times = np.asarray(events['time'], dtype=np.float64)
+    stride = int(target.max(initial=0)) + 1
+    key = match * stride + target
+
+    hit_keys, first_hit = np.unique(key[hits], return_index=True)
+    first_hit_time = times[hits][first_hit]
+    kills = deaths & (np.asarray(events['actor']) >= 0)
+    kill_keys = key[kills]
+    if len(hit_keys):
+        position = np.minimum(np.searchsorted(hit_keys, kill_keys), len(hit_keys) - 1)
+        matched = hit_keys[position] == kill_keys
+    else:
+        position = np.zeros(len(kill_keys), dtype=np.int64)
+        matched = np.zeros(len(kill_keys), dtype=bool)
+    ttk = times[kills][matched] - first_hit_time[position[matched]]
+    result['ttk'] = (weapon[kills][matched], ttk)
+    result['matches'] = int(match[-1]) if len(match) else 0
+    return result
+
+
+def merge(total, part):
+    if total is None:
+        return part
+    total['events'] = total['events'] + part['events']
+    for name in HEATMAPS:
+        total['heatmaps'][name] = total['heatmaps'][name] + part['heatmaps'][name]
+    total['distance'] = total['distance'] + part['distance']
+    total['ttk'] = (np.concatenate([total['ttk'][0], part['ttk'][0]]),
+                    np.concatenate([total['ttk'][1], part['ttk'][1]]))
+    total['matches'] += part['matches']
+    return total
+
+
+def heat_colors(values):
+    # Log-scaled black -> red -> yellow -> white gradient as uint8 RGB
+    scaled = np.log1p(values)
+    peak = scaled.max()
+    if peak > 0:
+        scaled = scaled / peak
+    stops = np.array([0, 0.35, 0.7, 1.0])
+    colors = np.array([(0, 0, 0), (200, 0, 0), (255, 220, 0), (255, 255, 255)], dtype=float)
+    rgb = np.stack([np.interp(scaled, stops, colors[:, channel]) for channel in range(3)], axis=-1)
+    return rgb.astype(np.uint8)
+
+
+def save_heatmap(path, values):
+    import pygame
+    surface = pygame.surfarray.make_surface(heat_colors(values).transpose(1, 0, 2))
+    pygame.image.save(surface, path)
+
+
+def summarize_distribution(counts, bin_width):
+    total = int(counts.sum())
+    centers = (np.arange(len(counts)) + 0.5) * bin_width
+    summary = {'count': total, 'bin_width': bin_width, 'histogram': counts.astype(int).tolist()}
+    if total:
+        cumulative = np.cumsum(counts) / total
+        summary['mean'] = float((counts * centers).sum() / total)
+        for percentile in (50, 90):
+            summary[f'p{percentile}'] = float(centers[np.searchsorted(cumulative, percentile / 100)])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded battle royale telemetry")
+    parser.add_argument('logs', nargs='+', help='log files or glob patterns')
+    parser.add_argument('--out', default='telemetry_report', help='output directory')
+    parser.add_argument('--cell', type=int, default=20, help='heatmap cell size in pixels')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    paths = sorted({path for pattern in args.logs for path in glob.glob(pattern)})
+    if not paths:
+        parser.error("no log files matched")
+
+    # The world extent and weapon list come from the log headers
+    metadata = [read_header(path).get('metadata', {}) for path in paths]
+    map_width = max(meta.get('map_width', 2400) for meta in metadata)
+    map_height = max(meta.get('map_height', 1800) for meta in metadata)
+    weapons = max((meta.get('weapons', []) for meta in metadata), key=len)
+    num_weapons = len(weapons) or 256
+    shape = (int(np.ceil(map_height / args.cell)), int(np.ceil(map_width / args.cell)))
+
+    jobs = [(path, shape, args.cell, num_weapons) for path in paths]
+    total = None
+    if args.jobs > 1 and len(jobs) > 1:
+        with Pool(min(args.jobs, len(jobs))) as pool:
+            for part in pool.imap_unordered(analyze_file, jobs):
+                total = merge(total, part)
+    else:
+        for job in jobs:
+            total = merge(total, analyze_file(job))
+
+    os.makedirs(args.out, exist_ok=True)
+    for name in HEATMAPS:
+        save_heatmap(os.path.join(args.out, f'{name}_heatmap.png'), total['heatmaps'][name])
+
+    weapon_names = weapons or [str(i) for i in range(num_weapons)]
+    ttk_weapon, ttk = total['ttk']
+    ttk_bins = MAX_TTK // TTK_BIN
+    ttk_counts = np.bincount(ttk_weapon * ttk_bins +
+                             np.minimum((ttk // TTK_BIN).astype(np.int64), ttk_bins - 1),
+                             minlength=num_weapons * ttk_bins).reshape(num_weapons, ttk_bins)
+    summary = {
+        'files': len(paths),
+        'matches': total['matches'],
+        'map': {'width': map_width, 'height': map_height, 'cell': args.cell},
+        'events': {EVENT_NAMES[kind]: int(count) for kind, count in enumerate(total['events'])
+                   if kind in EVENT_NAMES},
+        'engagement_distance': {},
+        'time_to_kill_ms': {},
+        'elapsed_seconds': None,
+    }
+    for weapon_id, name in enumerate(weapon_names):
+        if total['distance'][weapon_id].any():
+            summary['engagement_distance'][name] = summarize_distribution(
+                total['distance'][weapon_id], DISTANCE_BIN)
+        if ttk_counts[weapon_id].any():
+            summary['time_to_kill_ms'][name] = summarize_distribution(ttk_counts[weapon_id], TTK_BIN)
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+
+    with open(os.path.join(args.out, 'summary.json'), 'w') as stream:
+        json.dump(summary, stream, indent=2)
+    print(f"Analyzed {len(paths)} logs ({sum(summary['events'].values())} events, "
+          f"{summary['matches']} matches) in {summary['elapsed_seconds']}s -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
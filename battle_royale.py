@@ -1,19 +1,39 @@
+import argparse
+import copy
+import os
+import threading
 import pygame
 import random
 import math
+import time
 import numpy as np
-
-# Initialize Pygame and its mixer
-pygame.init()
-pygame.mixer.init()
+from bot_planner import make_planner
+from collision import earliest_hits
+import events
+from events import EventBus
+from flow_field import FlowField
+from gc_manager import GcManager
+from line_of_sight import LineOfSight
+from minimap import Minimap
+from projectiles import BulletPool, ProjectileSpawner
+from quality import FAR_BOT_DISTANCE, QualityGovernor
+from render_pipeline import RenderPipeline
+from replay import ReplayRecorder
+from scenario import DEFAULT_SCENARIO, load_scenario, scenario_names
+from spatial_index import UniformGrid
+from storm import Storm, default_schedule
+import telemetry
+from telemetry import TelemetryRecorder
+from rewind import RewindBuffer
+from snapshot import load_state, read_snapshot, write_snapshot
+from world import ChunkedWorld
 
 # Constants
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
-MAP_WIDTH = 2400
-MAP_HEIGHT = 1800
 HUD_HEIGHT = 50
 FPS = 60
+TICK_MS = 1000 / FPS
 
 # Colors
 WHITE = (255, 255, 255)
@@ -33,20 +53,52 @@ PURPLE = (128, 0, 128)
 GOLD = (255, 215, 0)
 ORANGE = (255, 165, 0)
 
+# Match settings come from a scenario file; apply_scenario swaps them
+SCENARIO = load_scenario(DEFAULT_SCENARIO)
+MAP_WIDTH = SCENARIO.map_width
+MAP_HEIGHT = SCENARIO.map_height
+PLAYER_SPEED = SCENARIO.player_speed
+SHOOT_COOLDOWN = SCENARIO.shoot_cooldown
+NUM_BOTS = SCENARIO.num_bots
+BOT_SPEED = SCENARIO.bot_speed
+BOT_SHOOT_RANGE = SCENARIO.bot_shoot_range
+BOT_WEAPONS = SCENARIO.bot_weapons
+WEAPONS = SCENARIO.weapons  # WEAPON_DTYPE record array indexed by weapon id
+ZONE_DAMAGE_PER_SECOND = SCENARIO.storm_damage_per_second
+ZONE_DAMAGE_INTERVAL = SCENARIO.storm_damage_interval  # Milliseconds of sim time between storm damage ticks
+STORM_WAIT_TIME = SCENARIO.storm_wait_time
+STORM_MIN_RADIUS = SCENARIO.storm_min_radius
+STORM_PHASES = SCENARIO.storm_phases  # STORM_PHASE_DTYPE record array, one row per shrink
+
 # Game settings
 PLAYER_SIZE = 20
 BOT_SIZE = 20
-PLAYER_SPEED = 5
-BOT_SPEED = 3
-ZONE_DAMAGE = 1
 BULLET_SPEED = 7
 BULLET_SIZE = 5
 BULLET_DAMAGE = 34
-SHOOT_COOLDOWN = 500
 SCORE_PER_HIT = 10
 SCORE_PER_KILL = 50
-NUM_BOTS = 10
 BOT_DIRECTION_CHANGE_TIME = 1000
+LOS_CELL_SIZE = 20
+FLOW_CELL_SIZE = 40
+FLOW_EDGE_MARGIN = 100  # Bots this close to the zone edge or outside it follow the flow field
+FLOW_REFRESH_MS = 2000  # Least sim time between flow field rebuilds for newly loaded terrain
+FLOW_LEAD_MS = 3000     # How long before the storm starts the first flow field is built
+RENDER_CELL_SIZE = 200
+ENTITY_DRAW_RADIUS = BOT_SIZE * 2  # Covers the body, head and health bar
+MINIMAP_WIDTH = 160
+MINIMAP_HEIGHT = 120
+MINIMAP_REFRESH_INTERVAL = 250  # Milliseconds of sim time between entity dot redraws
+CHUNK_SIZE = 600
+MAX_LOADED_CHUNKS = 256
+QUICKSAVE_PATH = "quicksave.brsnap"  # F5 saves the match here, F9 loads it
+KILL_CAM_SECONDS = 3
+REWIND_SECONDS = 5  # F8 rewinds the match this far
+FRAME_BUDGET_MS = 1000 / FPS  # The quality governor steps down above this
+ALLOC_BUDGET_BYTES = 64 * 1024  # Frames allocating more at peak are flagged by --alloc-profile
+PARTICLES_PER_KILL = 24
+COUNTDOWN_MS = 3000
+MENU_IDLE_TIMEOUT_MS = 1000  # Longest a menu waits for input before looking again
 
 PARTICLE_COLORS = [
     (255, 223, 0),   # Gold
@@ -69,28 +121,58 @@ BOT_COLORS = [
     (128, 0, 255)     # Deep purple
 ]
 
-class Bullet:
-    def __init__(self, x, y, dx, dy, damage, speed, size, owner, is_enemy=False):
-        self.x = x
-        self.y = y
-        self.dx = dx
-        self.dy = dy
-        self.damage = damage
-        self.speed = speed
-        self.size = size
-        self.owner = owner
-        self.is_enemy = is_enemy
-
-    def move(self):
-        self.x += self.dx * self.speed
-        self.y += self.dy * self.speed
-
-    def draw(self):
-        pygame.draw.circle(screen, WHITE, (int(self.x), int(self.y)), self.size)
+_fonts = {}
 
-    def is_off_screen(self):
-        return (self.x < 0 or self.x > MAP_WIDTH or 
-                self.y < HUD_HEIGHT or self.y > MAP_HEIGHT)
+def init_display():
+    # Opens the game window on first use rather than at import time
+    if not pygame.display.get_init():
+        pygame.display.init()
+    surface = pygame.display.get_surface()
+    if surface is None:
+        surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("Battle Royale")
+    return surface
+
+def get_font(size):
+    # Fonts are loaded once per size and shared
+    font = _fonts.get(size)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.Font(None, size)
+        _fonts[size] = font
+    return font
+
+def set_map_size(width, height):
+    global MAP_WIDTH, MAP_HEIGHT
+    MAP_WIDTH = width
+    MAP_HEIGHT = height
+
+def apply_scenario(scenario):
+    # Call before creating a Game; matches already running keep their bots
+    # and storm
+    global SCENARIO, PLAYER_SPEED, SHOOT_COOLDOWN, NUM_BOTS, BOT_SPEED, BOT_SHOOT_RANGE, BOT_WEAPONS
+    global WEAPONS, ZONE_DAMAGE_PER_SECOND, ZONE_DAMAGE_INTERVAL, STORM_WAIT_TIME, STORM_MIN_RADIUS
+    global STORM_PHASES
+    SCENARIO = scenario
+    set_map_size(scenario.map_width, scenario.map_height)
+    PLAYER_SPEED = scenario.player_speed
+    SHOOT_COOLDOWN = scenario.shoot_cooldown
+    NUM_BOTS = scenario.num_bots
+    BOT_SPEED = scenario.bot_speed
+    BOT_SHOOT_RANGE = scenario.bot_shoot_range
+    BOT_WEAPONS = scenario.bot_weapons
+    WEAPONS = scenario.weapons
+    ZONE_DAMAGE_PER_SECOND = scenario.storm_damage_per_second
+    ZONE_DAMAGE_INTERVAL = scenario.storm_damage_interval
+    STORM_WAIT_TIME = scenario.storm_wait_time
+    STORM_MIN_RADIUS = scenario.storm_min_radius
+    STORM_PHASES = scenario.storm_phases
+
+def storm_schedule(map_width, map_height, seed=None):
+    return default_schedule(map_width, map_height, ZONE_DAMAGE_PER_SECOND, seed=seed,
+                            wait_time=STORM_WAIT_TIME, min_radius=STORM_MIN_RADIUS,
+                            shrinks=STORM_PHASES.tolist())
 
 class Player:
     def __init__(self, x, y, color, is_bot=False):
@@ -122,7 +204,7 @@ class Player:
         self.x = new_x
         self.y = new_y
 
-    def draw(self):
+    def draw(self, surface):
         if not self.alive:
             return
             
@@ -132,30 +214,30 @@ class Player:
         # Draw body (rectangle)
         body_width = PLAYER_SIZE - 4
         body_height = PLAYER_SIZE + 4
-        pygame.draw.rect(screen, draw_color, 
+        pygame.draw.rect(surface, draw_color, 
                         (self.x - body_width//2, 
                          self.y - body_height//2, 
                          body_width, body_height))
         
         # Draw head (circle)
         head_radius = PLAYER_SIZE//3
-        pygame.draw.circle(screen, draw_color, 
+        pygame.draw.circle(surface, draw_color, 
                           (int(self.x), int(self.y - body_height//2 - head_radius)), 
                           head_radius)
         
         # Draw health bar
         health_width = 30
         health_height = 4
-        pygame.draw.rect(screen, RED, 
+        pygame.draw.rect(surface, RED, 
                         (self.x - health_width//2, 
                          self.y - body_height - head_radius*2 - 5,
                          health_width, health_height))
-        pygame.draw.rect(screen, GREEN, 
+        pygame.draw.rect(surface, GREEN, 
                         (self.x - health_width//2, 
                          self.y - body_height - head_radius*2 - 5,
                          health_width * (self.health/self.max_health), health_height))
 
-    def draw_at_pos(self, x, y):
+    def draw_at_pos(self, surface, x, y):
         if not self.alive:
             return
             
@@ -165,35 +247,33 @@ class Player:
         # Draw body (rectangle)
         body_width = PLAYER_SIZE - 4
         body_height = PLAYER_SIZE + 4
-        pygame.draw.rect(screen, draw_color, 
+        pygame.draw.rect(surface, draw_color, 
                         (x - body_width//2, 
                          y - body_height//2, 
                          body_width, body_height))
         
         # Draw head (circle)
         head_radius = PLAYER_SIZE//3
-        pygame.draw.circle(screen, draw_color, 
+        pygame.draw.circle(surface, draw_color, 
                           (int(x), int(y - body_height//2 - head_radius)), 
                           head_radius)
         
         # Draw health bar
         health_width = 30
         health_height = 4
-        pygame.draw.rect(screen, RED, 
+        pygame.draw.rect(surface, RED, 
                         (x - health_width//2, 
                          y - body_height - head_radius*2 - 5,
                          health_width, health_height))
-        pygame.draw.rect(screen, GREEN, 
+        pygame.draw.rect(surface, GREEN, 
                         (x - health_width//2, 
                          y - body_height - head_radius*2 - 5,
                          health_width * (self.health/self.max_health), health_height))
 
-    def shoot(self, target_x, target_y, current_time):
-        if not self.alive or not self.can_shoot(current_time):
-            return None
-
-        self.last_shot_time = current_time
-        return self.weapon_inventory.shoot(self, target_x, target_y, current_time)
+    def shoot(self, spawner, target_x, target_y):
+        # Cooldowns are resolved when the spawner emits the tick's bullets
+        if self.alive:
+            spawner.request(self, target_x, target_y)
 
 class Bot(Player):
     def __init__(self, x, y, color):
@@ -242,21 +322,21 @@ class Bot(Player):
             self.x = new_x
             self.y = new_y
 
-    def draw(self):
+    def draw(self, surface):
         if not self.alive:
             return
             
         # Draw body (rectangle)
         body_width = 30
         body_height = 40
-        pygame.draw.rect(screen, self.color, 
+        pygame.draw.rect(surface, self.color, 
                         (self.x - body_width//2,
                          self.y - body_height//2,
                          body_width, body_height))
         
         # Draw head (circle)
         head_radius = 10
-        pygame.draw.circle(screen, self.color,
+        pygame.draw.circle(surface, self.color,
                          (int(self.x), int(self.y - body_height//2 - head_radius)),
                          head_radius)
         
@@ -264,31 +344,31 @@ class Bot(Player):
         health_width = 40
         health_height = 5
         # Draw background (red)
-        pygame.draw.rect(screen, RED, 
+        pygame.draw.rect(surface, RED, 
                         (self.x - health_width//2, 
                          self.y - body_height - head_radius*2 - 5,
                          health_width, health_height))
         # Draw current health (green)
-        pygame.draw.rect(screen, GREEN, 
+        pygame.draw.rect(surface, GREEN, 
                         (self.x - health_width//2, 
                          self.y - body_height - head_radius*2 - 5,
                          health_width * (self.health/self.max_health), health_height))
 
-    def draw_at_pos(self, x, y):
+    def draw_at_pos(self, surface, x, y):
         if not self.alive:
             return
             
         # Draw body (rectangle)
         body_width = 30
         body_height = 40
-        pygame.draw.rect(screen, self.color, 
+        pygame.draw.rect(surface, self.color, 
                         (x - body_width//2,
                          y - body_height//2,
                          body_width, body_height))
         
         # Draw head (circle)
         head_radius = 10
-        pygame.draw.circle(screen, self.color,
+        pygame.draw.circle(surface, self.color,
                          (int(x), int(y - body_height//2 - head_radius)),
                          head_radius)
         
@@ -296,12 +376,12 @@ class Bot(Player):
         health_width = 40
         health_height = 5
         # Draw background (red)
-        pygame.draw.rect(screen, RED, 
+        pygame.draw.rect(surface, RED, 
                         (x - health_width//2, 
                          y - body_height - head_radius*2 - 5,
                          health_width, health_height))
         # Draw current health (green)
-        pygame.draw.rect(screen, GREEN, 
+        pygame.draw.rect(surface, GREEN, 
                         (x - health_width//2, 
                          y - body_height - head_radius*2 - 5,
                          health_width * (self.health/self.max_health), health_height))
@@ -344,11 +424,14 @@ class Particle:
         return self.lifetime > 0
         
     def draw(self, screen):
+        self.draw_at_pos(screen, self.x, self.y)
+
+    def draw_at_pos(self, screen, x, y):
         alpha = max(0, min(255, self.lifetime))
         color = (self.color[0], self.color[1], self.color[2], alpha)
         surf = pygame.Surface((self.size * 2, self.size * 2), pygame.SRCALPHA)
         pygame.draw.circle(surf, color, (self.size, self.size), self.size)
-        screen.blit(surf, (int(self.x - self.size), int(self.y - self.size)))
+        screen.blit(surf, (int(x - self.size), int(y - self.size)))
 
 class DamageNumber:
     def __init__(self, x, y, damage):
@@ -358,7 +441,7 @@ class DamageNumber:
         self.lifetime = 30  # Number of frames the damage number will be visible
         self.y_offset = 0
         self.alpha = 255
-        self.font = pygame.font.Font(None, 36)
+        self.font = get_font(36)
     
     def update(self):
         self.lifetime -= 1
@@ -372,7 +455,9 @@ class DamageNumber:
         screen.blit(text, (self.x - text.get_width()//2, self.y + self.y_offset - 20))
 
 class Weapon:
-    def __init__(self, name, damage, fire_rate, bullet_speed, bullet_size, bullet_color, sound_freq):
+    def __init__(self, name, damage, fire_rate, bullet_speed, bullet_size, bullet_color, sound_freq,
+                 pellets=1, spread=0):
+        self.id = 0
         self.name = name
         self.damage = damage
         self.fire_rate = fire_rate
@@ -380,6 +465,8 @@ class Weapon:
         self.bullet_size = bullet_size
         self.bullet_color = bullet_color
         self.sound_freq = sound_freq
+        self.pellets = pellets
+        self.spread = spread
         self.last_shot = 0
 
     def can_shoot(self, current_time):
@@ -391,104 +478,17 @@ class Weapon:
 
 class WeaponInventory:
     def __init__(self):
-        self.weapons = {
-            'Pistol': Weapon('Pistol', 
-                           damage=15, 
-                           fire_rate=400,  
-                           bullet_speed=12, 
-                           bullet_size=3,
-                           bullet_color=YELLOW,
-                           sound_freq=440),
-                           
-            'Shotgun': Weapon('Shotgun', 
-                            damage=8,  
-                            fire_rate=800,  
-                            bullet_speed=8,  
-                            bullet_size=4,
-                            bullet_color=RED,
-                            sound_freq=220),
-                            
-            'Sniper': Weapon('Sniper', 
-                           damage=75,  
-                           fire_rate=1500,  
-                           bullet_speed=20,  
-                           bullet_size=2,  
-                           bullet_color=BLUE,
-                           sound_freq=880),
-                           
-            'AssaultRifle': Weapon('AssaultRifle', 
-                                 damage=20,
-                                 fire_rate=200,  
-                                 bullet_speed=15,
-                                 bullet_size=3,
-                                 bullet_color=GREEN,
-                                 sound_freq=660),
-                                 
-            'SMG': Weapon('SMG', 
-                         damage=12,  
-                         fire_rate=100,  
-                         bullet_speed=14,
-                         bullet_size=2,
-                         bullet_color=PURPLE,
-                         sound_freq=550),
-                         
-            'Revolver': Weapon('Revolver', 
-                             damage=40,  
-                             fire_rate=600,  
-                             bullet_speed=13,
-                             bullet_size=4,
-                             bullet_color=ORANGE,
-                             sound_freq=330),
-        }
+        # One Weapon per row of the scenario's weapon table; the row number is
+        # the weapon's id in bullets, telemetry and snapshots
+        self.weapons = {}
+        for weapon_id, row in enumerate(WEAPONS.tolist()):
+            name, damage, fire_rate, bullet_speed, bullet_size, color, sound_freq, pellets, spread = row
+            weapon = Weapon(name, damage, fire_rate, bullet_speed, bullet_size, tuple(color), sound_freq,
+                            pellets=pellets, spread=spread)
+            weapon.id = weapon_id
+            self.weapons[name] = weapon
         self.current_weapon = self.weapons[random.choice(list(self.weapons.keys()))]
 
-    def shoot(self, shooter, target_x, target_y, current_time):
-        if not shooter.alive or not self.current_weapon:
-            return []
-
-        weapon = self.current_weapon
-        if current_time - shooter.last_shot_time < weapon.fire_rate:
-            return []
-
-        shooter.last_shot_time = current_time
-        bullets = []
-
-        dx = target_x - shooter.x
-        dy = target_y - shooter.y
-        length = math.sqrt(dx*dx + dy*dy)
-        if length > 0:
-            dx = dx/length
-            dy = dy/length
-
-        if weapon.name == "Shotgun":
-            num_pellets = 5
-            spread_angle = math.pi / 8  
-            for i in range(num_pellets):
-                angle = math.atan2(dy, dx) + random.uniform(-spread_angle, spread_angle)
-                pellet_dx = math.cos(angle)
-                pellet_dy = math.sin(angle)
-                bullets.append(Bullet(
-                    shooter.x, shooter.y,
-                    pellet_dx, pellet_dy,
-                    weapon.damage // num_pellets,  
-                    weapon.bullet_speed,
-                    weapon.bullet_size,
-                    shooter,
-                    isinstance(shooter, Bot)
-                ))
-        else:
-            bullets.append(Bullet(
-                shooter.x, shooter.y,
-                dx, dy,
-                weapon.damage,
-                weapon.bullet_speed,
-                weapon.bullet_size,
-                shooter,
-                isinstance(shooter, Bot)
-            ))
-
-        return bullets
-
     def switch_weapon(self, weapon_name):
         if weapon_name in self.weapons:
             self.current_weapon = self.weapons[weapon_name]
@@ -531,77 +531,147 @@ class Camera:
     def apply_radius(self, radius):
         return radius * self.zoom
 
+    def visible_rect(self):
+        # World-space (left, top, right, bottom) of everything shown on screen
+        return (self.x, self.y,
+                self.x + WINDOW_WIDTH / self.zoom, self.y + WINDOW_HEIGHT / self.zoom)
+
+class RenderView:
+    # Frozen copy of what one game frame draws; built by Game.render_view
+    pass
+
 class Game:
-    def __init__(self):
-        pygame.init()
-        pygame.mixer.init()
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption("Battle Royale")
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+    def __init__(self, screen=None, telemetry=None, ai_workers=0, pipelined=False,
+                 alloc_profiler=None, gc_manager=None, replay=None, rewind=None):
+        # Everything is drawn onto screen; without one, the game opens its own
+        # window. Pass any Surface to run headless or render offscreen.
+        self.screen = screen if screen is not None else init_display()
+        # Optional TelemetryRecorder that match events are logged to
+        self.telemetry = telemetry
+        # Hits, kills, shots and zone damage raised during a tick reach their
+        # side effects through the event bus once the tick's systems have run
+        self.events = EventBus()
+        self.events.subscribe(self.on_hits, (events.HIT,))
+        self.events.subscribe(self.on_kills, (events.KILL,))
+        if telemetry:
+            self.events.subscribe(self.record_events)
+        # Bot planning runs in a pool of ai_workers processes, or in-process for 0
+        self.planner = make_planner(ai_workers)
+        # Steps optional work down when frames run over budget; F3 shows it
+        self.quality = QualityGovernor(FRAME_BUDGET_MS)
+        self.show_overlay = False
+        self.frame_ms = 0
+        self.font = get_font(36)
+        self.small_font = get_font(24)
         self.camera = Camera()
         self.game_started = False
         self.in_countdown = False
         self.in_weapon_select = False
         self.selected_weapon_index = 0
         self.game_over = False
+        # Finished menu frames by menu_key(), and the key of the one on screen
+        self.menu_frames = {}
+        self.menu_shown = None
+        self.line_of_sight = LineOfSight(MAP_WIDTH, MAP_HEIGHT, LOS_CELL_SIZE, CHUNK_SIZE)
+        self.render_index = UniformGrid(RENDER_CELL_SIZE)
+        self.minimap = Minimap(MINIMAP_WIDTH, MINIMAP_HEIGHT, MAP_WIDTH, MAP_HEIGHT,
+                               MINIMAP_REFRESH_INTERVAL)
+        self.minimap_lock = threading.Lock()
+        # With pipelined set, game frames are drawn on a render thread while
+        # the next tick is simulated; see RenderPipeline
+        self.pipeline = RenderPipeline(self.draw_view, self.screen) if pipelined else None
+        # Optional AllocationProfiler that every game frame is measured by
+        self.alloc_profiler = alloc_profiler
+        # Optional GcManager that keeps collector pauses out of match frames
+        self.gc_manager = gc_manager
+        # Optional ReplayRecorder that every simulated tick is saved to
+        self.replay = replay
+        # Optional RewindBuffer holding the last seconds of the match, for
+        # the kill cam and F8; kill_cam is [sim time shown next, last frame]
+        # while one plays
+        self.rewind = rewind
+        self.kill_cam = None
         self.reset_game()
 
     def reset_game(self):
         self.player = Player(MAP_WIDTH//2, MAP_HEIGHT//2, BLUE)
         self.bots = []
-        self.bullets = []
+        self.bullets = BulletPool()
+        self.spawner = ProjectileSpawner(WEAPONS, random.getrandbits(32))
         self.particles = []
         self.damage_numbers = []
-        self.safe_zone_radius = min(MAP_WIDTH, MAP_HEIGHT) // 2
-        self.safe_zone_center = (MAP_WIDTH//2, MAP_HEIGHT//2)
+        self.player_hits = 0
         self.score = 0
-        self.storm_start_time = pygame.time.get_ticks()
+        self.sim_time = 0
+        self.events.clear()
+        self.storm = Storm(storm_schedule(MAP_WIDTH, MAP_HEIGHT), ZONE_DAMAGE_INTERVAL)
+        self.safe_zone_radius = self.storm.radius
+        self.safe_zone_center = self.storm.center
         self.storm_started = False
         self.create_bots()
+        # (target, step x, step y) of each bot's last plan; see follow_last_plan
+        self.last_plan = None
 
         self.player.weapon_inventory = WeaponInventory()
-        self.terrain_patches = []
-        
-        # Add water bodies
-        for _ in range(3):
-            x = random.randint(0, MAP_WIDTH)
-            y = random.randint(HUD_HEIGHT, MAP_HEIGHT)
-            size = random.randint(100, 200)
-            self.terrain_patches.append(TerrainPatch(x, y, size, 'water'))
-            
-            # Add sand around water
-            for i in range(8):
-                angle = i * (math.pi/4)
-                sand_x = x + math.cos(angle) * (size + 20)
-                sand_y = y + math.sin(angle) * (size + 20)
-                self.terrain_patches.append(TerrainPatch(sand_x, sand_y, 40, 'sand'))
-        
-        # Add trees
-        for _ in range(50):
-            x = random.randint(0, MAP_WIDTH)
-            y = random.randint(HUD_HEIGHT, MAP_HEIGHT)
-            size = random.randint(30, 50)
-            self.terrain_patches.append(TerrainPatch(x, y, size, 'tree'))
-        
-        # Add rocks
-        for _ in range(30):
-            x = random.randint(0, MAP_WIDTH)
-            y = random.randint(HUD_HEIGHT, MAP_HEIGHT)
-            size = random.randint(20, 35)
-            self.terrain_patches.append(TerrainPatch(x, y, size, 'rock'))
-        
-        # Add grass patches
-        for _ in range(200):
-            x = random.randint(0, MAP_WIDTH)
-            y = random.randint(HUD_HEIGHT, MAP_HEIGHT)
-            size = random.randint(20, 40)
-            self.terrain_patches.append(TerrainPatch(x, y, size, 'grass'))
+
+        self.start_world(random.getrandbits(32))
+
+    def begin_match(self):
+        # Called once play actually starts, when the countdown ends; reset_game
+        # also runs for the menus, so it can't mark the start itself
+        self.in_countdown = False
+        self.game_started = True
+        if self.telemetry:
+            self.telemetry.record(self.sim_time, telemetry.MATCH_START, value=len(self.bots) + 1)
+        if self.gc_manager:
+            self.gc_manager.match_started()
+
+    def start_world(self, seed):
+        # Terrain is generated lazily, chunk by chunk, as entities and the
+        # camera come near it; see on_chunk_loaded
+        self.line_of_sight.clear()
+        # Shared by every bot for finding a way around terrain into the zone
+        self.flow_field = FlowField(FLOW_CELL_SIZE)
+        self.flow_terrain_changed = False
+        self.flow_refreshed_at = self.sim_time
+        with self.minimap_lock:
+            self.minimap.bake([], GRASS_GREEN)
+        self.render_index.clear()
+        self.render_entities = None   # What update_render_index last saw
+        self.world = ChunkedWorld(seed, MAP_WIDTH, MAP_HEIGHT, HUD_HEIGHT,
+                                  make_patch=TerrainPatch, chunk_size=CHUNK_SIZE,
+                                  max_loaded=MAX_LOADED_CHUNKS,
+                                  on_load=self.on_chunk_loaded, on_unload=self.on_chunk_unloaded)
+        self.update_render_index()
+        self.update_world()
+
+    def on_chunk_loaded(self, key, patches):
+        # Rasterize trees and rocks into the blocking grid used for occlusion.
+        # The chunk's new tile also gets what loaded neighbours reach into
+        # it, and its own patches may reach into theirs.
+        self.line_of_sight.add_tile(key, patches, self.world.neighbour_patches(key))
+        with self.minimap_lock:
+            self.minimap.paint_patches(patches)
+        # Terrain never moves, so it goes into the render index once per load
+        for patch in patches:
+            self.render_index.insert(patch, patch.x, patch.y, patch.size)
+
+    def on_chunk_unloaded(self, key, patches):
+        # Blocking goes with the chunk; only loaded terrain is near anyone
+        self.line_of_sight.remove_tile(key)
+        for patch in patches:
+            self.render_index.remove(patch)
+
+    def update_world(self):
+        entities = [entity for entity in [self.player] + self.bots if entity.alive]
+        # One call, so the LRU is sized for the view and every entity at once
+        self.world.ensure(self.world.rect_keys(*self.camera.visible_rect())
+                          + self.world.point_keys([entity.x for entity in entities],
+                                                  [entity.y for entity in entities],
+                                                  BOT_SHOOT_RANGE))
 
     def create_bots(self):
         self.bots = []
-        bot_weapons = ['Pistol', 'SMG', 'Shotgun', 'Sniper']
-        
         for _ in range(NUM_BOTS):
             while True:
                 x = random.randint(0, MAP_WIDTH)
@@ -610,7 +680,7 @@ class Game:
                 if distance_to_player > 200:
                     bot = Bot(x, y, random.choice(BOT_COLORS))
                     bot.weapon_inventory = WeaponInventory()
-                    chosen_weapon = random.choice(bot_weapons)
+                    chosen_weapon = random.choice(BOT_WEAPONS)
                     bot.weapon_inventory.switch_weapon(chosen_weapon)
                     self.bots.append(bot)
                     break
@@ -646,244 +716,471 @@ class Game:
         # Update camera to follow player
         self.camera.update(self.player.x, self.player.y)
 
+    def update_render_index(self):
+        # Only entities that crossed a cell boundary, died or came back need
+        # the index touched; the rest are ruled out in one array comparison
+        entities = [self.player] + self.bots
+        alive = np.array([entity.alive for entity in entities], dtype=bool)
+        x = np.array([entity.x for entity in entities], dtype=float)
+        y = np.array([entity.y for entity in entities], dtype=float)
+        ranges = self.render_index.cell_ranges(x, y, ENTITY_DRAW_RADIUS)
+        if self.render_entities == entities:
+            changed = np.flatnonzero((alive != self.render_alive)
+                                     | (alive & (ranges != self.render_ranges).any(axis=1)))
+        else:
+            changed = range(len(entities))
+        for index in changed:
+            entity = entities[index]
+            if entity.alive:
+                if entity in self.render_index:
+                    self.render_index.move(entity, entity.x, entity.y)
+                else:
+                    # Back alive after a rewind
+                    self.render_index.insert(entity, entity.x, entity.y, ENTITY_DRAW_RADIUS)
+            elif entity in self.render_index:
+                self.render_index.remove(entity)
+        self.render_entities = entities
+        self.render_alive = alive
+        self.render_ranges = ranges
+        # Also where the minimap finds everyone
+        self.render_x = x
+        self.render_y = y
+
     def update_particles(self):
         self.particles = [p for p in self.particles if p.update()]
 
+    def emit_particles(self, x, y, count):
+        # New particles past the quality tier's cap are dropped
+        count = min(count, self.quality.settings['particle_cap'] - len(self.particles))
+        for _ in range(count):
+            self.particles.append(Particle(x, y))
+
+    def add_damage_number(self, x, y, damage):
+        # Lower quality tiers show only every Nth of the player's hits
+        self.player_hits += 1
+        if self.player_hits % self.quality.settings['damage_number_every'] == 0:
+            self.damage_numbers.append(DamageNumber(x, y, damage))
+
+    def entity_index(self):
+        # Maps each entity to its slot in [player] + bots, the order used by
+        # bullet owners and collision targets
+        return {id(entity): i for i, entity in enumerate([self.player] + self.bots)}
+
     def update_bullets(self):
-        for bullet in self.bullets[:]:
-            bullet.move()
-            
-            if bullet.is_off_screen():
-                if bullet in self.bullets:
-                    self.bullets.remove(bullet)
+        bullets = self.bullets
+        n = bullets.count
+        if n == 0:
+            return
+
+        start_x = bullets.x[:n].copy()
+        start_y = bullets.y[:n].copy()
+        bullets.move()
+        end_x = bullets.x[:n]
+        end_y = bullets.y[:n]
+
+        # Sweep every bullet's step this tick against every living target so
+        # fast bullets cannot tunnel through anyone between ticks
+        targets = [self.player] + self.bots
+        hit_t, hit_target = earliest_hits(
+            start_x, start_y, end_x, end_y,
+            [target.x for target in targets], [target.y for target in targets],
+            [PLAYER_SIZE] + [BOT_SIZE] * len(self.bots),
+            [target.alive for target in targets], bullets.owner[:n])
+
+        # Trees and rocks stop a bullet before anything behind them
+        terrain_t = self.line_of_sight.first_blocked(start_x, start_y, end_x, end_y)
+
+        keep = ((terrain_t > 1) &
+                (end_x >= 0) & (end_x <= MAP_WIDTH) & (end_y >= HUD_HEIGHT) & (end_y <= MAP_HEIGHT))
+        hits = np.flatnonzero((hit_target >= 0) & (hit_t < terrain_t))
+        for i, target_index, owner, weapon, damage in zip(
+                hits.tolist(), hit_target[hits].tolist(), bullets.owner[hits].tolist(),
+                bullets.weapon[hits].tolist(), bullets.damage[hits].tolist()):
+            # An earlier bullet this tick may already have killed the target;
+            # this one flies on, as it would have a tick later
+            if not targets[target_index].alive:
                 continue
-            
-            if self.player.alive and bullet.owner != self.player:
-                dx = bullet.x - self.player.x
-                dy = bullet.y - self.player.y
-                distance = math.sqrt(dx**2 + dy**2)
-                if distance < PLAYER_SIZE:
-                    self.player.health -= bullet.damage
-                    if bullet in self.bullets:
-                        self.bullets.remove(bullet)
-                    if self.player.health <= 0:
-                        self.player.alive = False
-                        self.player.health = 0
-                    continue
-            
-            for bot in self.bots:
-                if bot.alive and bullet.owner != bot:
-                    dx = bullet.x - bot.x
-                    dy = bullet.y - bot.y
-                    distance = math.sqrt(dx**2 + dy**2)
-                    if distance < BOT_SIZE:
-                        bot.health -= bullet.damage
-                        if bullet in self.bullets:
-                            self.bullets.remove(bullet)
-                        if bullet.owner == self.player:
-                            self.damage_numbers.append(DamageNumber(bot.x, bot.y - 20, bullet.damage))
-                        if bot.health <= 0:
-                            bot.alive = False
-                            bot.health = 0
-                        break
+            self.apply_hit(targets, target_index, owner, weapon, damage)
+            keep[i] = False
+
+        bullets.compact(keep)
+
+    def apply_hit(self, entities, target_index, owner, weapon, damage):
+        # Everything a hit changes in the simulation; damage numbers,
+        # particles, score and telemetry follow from the HIT and KILL events
+        target = entities[target_index]
+        shooter = entities[owner] if owner >= 0 else target
+        target.health -= damage
+        self.events.push(events.HIT, owner, target_index, target.x, target.y,
+                         shooter.x, shooter.y, damage, weapon)
+        if target.health <= 0:
+            target.alive = False
+            target.health = 0
+            self.events.push(events.KILL, owner, target_index, target.x, target.y,
+                             shooter.x, shooter.y, damage, weapon)
+
+    def on_hits(self, hits):
+        # Damage numbers over bots the player hit
+        shown = hits[(hits['actor'] == 0) & (hits['target'] != 0)]
+        for x, y, damage in zip(shown['x'].tolist(), shown['y'].tolist(), shown['value'].tolist()):
+            self.add_damage_number(x, y - 20, damage)
+
+    def on_kills(self, kills):
+        # Bullet kills burst into particles; the player scores their kills
+        shot = kills[kills['actor'] >= 0]
+        for x, y in zip(shot['x'].tolist(), shot['y'].tolist()):
+            self.emit_particles(x, y, PARTICLES_PER_KILL)
+        self.score += int(np.count_nonzero(kills['actor'] == 0))
+
+    def record_events(self, batch):
+        self.telemetry.record_many(self.sim_time, batch['kind'], batch['actor'], batch['target'],
+                                   batch['x'], batch['y'], batch['src_x'], batch['src_y'],
+                                   batch['value'], batch['weapon'])
 
     def update_safe_zone(self):
-        current_time = pygame.time.get_ticks()
-        
-        if not self.storm_started and self.game_started and current_time - self.storm_start_time >= 20000:
-            self.storm_started = True
-        
-        if self.storm_started:
-            self.safe_zone_radius = max(100, self.safe_zone_radius - 0.1)  
+        self.storm.update(self.sim_time)
+        self.storm_started = self.storm.started
+        self.safe_zone_center = self.storm.center
+        self.safe_zone_radius = self.storm.radius
+
+    def update_flow_field(self):
+        # The field leads to where the zone is heading, so it is rebuilt once
+        # per storm phase rather than as the zone shrinks, and only covers the
+        # zone as it stands. Nobody needs it before the storm starts. Builds
+        # run a slice per tick; see FlowField.advance
+        self.note_flow_terrain()
+        if not self.storm_started and self.storm.time_until_start(self.sim_time) > FLOW_LEAD_MS:
+            return
+        center, radius = self.storm.next_target()
+        flow = self.flow_field
+        (zone_x, zone_y), reach = self.safe_zone_center, self.safe_zone_radius + FLOW_EDGE_MARGIN
+        bounds = (max(0, zone_x - reach), max(0, zone_y - reach),
+                  min(MAP_WIDTH, zone_x + reach), min(MAP_HEIGHT, zone_y + reach))
+        started = flow.request(center, radius, bounds, self.line_of_sight)
+        if (not started and self.flow_terrain_changed
+                and self.sim_time - self.flow_refreshed_at >= FLOW_REFRESH_MS):
+            started = flow.refresh(self.line_of_sight)
+        if started:
+            self.flow_terrain_changed = False
+            self.flow_refreshed_at = self.sim_time
+        flow.advance()
+
+    def note_flow_terrain(self):
+        # Terrain loaded or unloaded since last tick only calls for a rebuild
+        # where it overlaps the field in use or the one being built
+        changed = self.line_of_sight.changed
+        if not changed:
+            return
+        flow = self.flow_field
+        windows = [window for window in (flow.window, flow.build and flow.build.window) if window]
+        if any(window.overlaps(*self.line_of_sight.tile_rect(key))
+               for key in changed for window in windows):
+            self.flow_terrain_changed = True
+        changed.clear()
 
     def check_zone_damage(self):
-        if not self.storm_started:
-            return  
-        
-        distance_to_center = math.sqrt((self.player.x - self.safe_zone_center[0])**2 + 
-                                     (self.player.y - self.safe_zone_center[1])**2)
-        if distance_to_center > self.safe_zone_radius and self.player.alive:
-            self.player.health -= ZONE_DAMAGE
-            if self.player.health <= 0:
-                self.player.alive = False
-                self.player.health = 0
-        
-        for bot in self.bots:
-            if bot.alive:
-                distance_to_center = math.sqrt((bot.x - self.safe_zone_center[0])**2 + 
-                                             (bot.y - self.safe_zone_center[1])**2)
-                if distance_to_center > self.safe_zone_radius:
-                    bot.health -= ZONE_DAMAGE
-                    if bot.health <= 0:
-                        bot.alive = False
-                        bot.health = 0
+        if not self.storm.damage_due(self.sim_time):
+            return
+
+        entities = [self.player] + self.bots
+        x = np.array([entity.x for entity in entities], dtype=float)
+        y = np.array([entity.y for entity in entities], dtype=float)
+        health = np.array([entity.health for entity in entities], dtype=float)
+        alive = np.array([entity.alive for entity in entities], dtype=bool)
+
+        health_before = health.copy()
+        damaged = self.storm.apply_damage(self.sim_time, x, y, health, alive)
+        for index in np.flatnonzero(damaged).tolist():
+            entity = entities[index]
+            entity.health = health[index]
+            entity.alive = bool(alive[index])
+
+        if damaged.any():
+            center_x, center_y = self.storm.center
+            hurt = np.flatnonzero(damaged)
+            self.events.push_many(events.ZONE_DAMAGE, -1, hurt, x[hurt], y[hurt], center_x, center_y,
+                                  health_before[hurt] - health[hurt])
+            killed = hurt[~alive[hurt]]
+            self.events.push_many(events.KILL, -1, killed, x[killed], y[killed], center_x, center_y,
+                                  health_before[killed] - health[killed])
 
     def move_bots(self):
-        current_time = pygame.time.get_ticks()
-        for bot in self.bots:
+        # Every bot plans from where everyone stood at the start of the tick;
+        # see bot_planner.plan_bots
+        entities = [self.player] + self.bots
+        x = np.array([entity.x for entity in entities], dtype=float)
+        y = np.array([entity.y for entity in entities], dtype=float)
+        alive = np.array([entity.alive for entity in entities])
+        # Far from the player, lower quality tiers replan each bot only every
+        # far_ai_interval ticks, staggered across bots
+        planned = alive
+        interval = self.quality.settings['far_ai_interval']
+        if interval > 1:
+            tick = round(self.sim_time / TICK_MS)
+            near = np.hypot(x - self.player.x, y - self.player.y) <= FAR_BOT_DISTANCE
+            planned = alive & (near | ((np.arange(len(entities)) + tick) % interval == 0))
+        plan = self.planner.plan(x, y, alive, (BOT_SPEED, 50, 40, 0, HUD_HEIGHT,
+                                               MAP_WIDTH, MAP_HEIGHT), planned)
+
+        new_x = plan['new_x'].copy()
+        new_y = plan['new_y'].copy()
+        targets = plan['target'].copy()
+        distance = plan['distance'].copy()
+        if interval > 1:
+            self.follow_last_plan(x, y, alive, planned, new_x, new_y, targets, distance)
+        if self.storm_started:
+            # Bots near the edge of the zone or caught outside it head in
+            # along the flow field instead of wandering
+            center_x, center_y = self.safe_zone_center
+            outside = alive & (np.hypot(x - center_x, y - center_y) >
+                               self.safe_zone_radius - FLOW_EDGE_MARGIN)
+            outside[0] = False
+            if outside.any():
+                step_x, step_y = self.flow_field.steer(x[outside], y[outside])
+                new_x[outside] = np.clip(x[outside] + step_x * BOT_SPEED, 0, MAP_WIDTH)
+                new_y[outside] = np.clip(y[outside] + step_y * BOT_SPEED, HUD_HEIGHT, MAP_HEIGHT)
+
+        targets = targets.tolist()
+        in_range = (distance < BOT_SHOOT_RANGE).tolist()
+        shooters = []
+        for index, bot, new_x, new_y in zip(range(1, len(entities)), self.bots,
+                                            new_x[1:].tolist(), new_y[1:].tolist()):
             if not bot.alive:
                 continue
+            bot.x = new_x
+            bot.y = new_y
+            if targets[index] >= 0 and in_range[index]:
+                shooters.append((bot, entities[targets[index]]))
 
-            closest_target = None
-            closest_distance = float('inf')
-            
-            if self.player.alive:
-                dx = self.player.x - bot.x
-                dy = self.player.y - bot.y
-                player_distance = math.sqrt(dx*dx + dy*dy)
-                if player_distance < closest_distance:
-                    closest_distance = player_distance
-                    closest_target = self.player
-            
-            for other_bot in self.bots:
-                if other_bot != bot and other_bot.alive:
-                    dx = other_bot.x - bot.x
-                    dy = other_bot.y - bot.y
-                    bot_distance = math.sqrt(dx*dx + dy*dy)
-                    if bot_distance < closest_distance:
-                        closest_distance = bot_distance
-                        closest_target = other_bot
-            
-            if closest_target and closest_distance > 50:  
-                dx = closest_target.x - bot.x
-                dy = closest_target.y - bot.y
-                distance = math.sqrt(dx*dx + dy*dy)
-                if distance > 0:
-                    dx = dx/distance * BOT_SPEED
-                    dy = dy/distance * BOT_SPEED
-                    
-                    new_x = bot.x + dx
-                    new_y = bot.y + dy
-                    
-                    can_move = True
-                    for other_bot in self.bots:
-                        if other_bot != bot and other_bot.alive:
-                            dist = math.sqrt((new_x - other_bot.x)**2 + (new_y - other_bot.y)**2)
-                            if dist < 40:  
-                                can_move = False
-                                break
-                    
-                    if self.player.alive:
-                        dist = math.sqrt((new_x - self.player.x)**2 + (new_y - self.player.y)**2)
-                        if dist < 40:
-                            can_move = False
-                    
-                    if can_move:
-                        new_x = max(0, min(new_x, MAP_WIDTH))
-                        new_y = max(HUD_HEIGHT, min(new_y, MAP_HEIGHT))
-                        bot.x = new_x
-                        bot.y = new_y
-            
-            if closest_target and closest_distance < 300:  
-                target_x = closest_target.x + random.uniform(-20, 20)
-                target_y = closest_target.y + random.uniform(-20, 20)
-                bullets = self.shoot(bot, target_x, target_y, current_time)
-                if bullets:
-                    self.bullets.extend(bullets)
-
-    def handle_bullet_collision(self, bullet):
-        if self.player.alive and bullet.owner != self.player:
-            dx = self.player.x - bullet.x
-            dy = self.player.y - bullet.y
-            distance = math.sqrt(dx*dx + dy*dy)
-            if distance < PLAYER_SIZE:
-                damage = bullet.damage
-                self.player.health -= damage
-                if self.player.health <= 0:
-                    self.player.alive = False
-                    self.player.health = 0
-                return True
+        if not shooters:
+            return
 
-        for bot in self.bots:
-            if bot.alive and bullet.owner != bot:
-                dx = bot.x - bullet.x
-                dy = bot.y - bullet.y
-                distance = math.sqrt(dx*dx + dy*dy)
-                if distance < BOT_SIZE:
-                    damage = bullet.damage
-                    bot.health -= damage
-                    if bullet.owner == self.player:
-                        damage_number = DamageNumber(bot.x, bot.y, damage)
-                        self.damage_numbers.append(damage_number)
-                    if bot.health <= 0:
-                        bot.alive = False
-                        bot.health = 0
-                        if bullet.owner == self.player:
-                            self.score += 1
-                    return True
+        # Only fire at targets that are not hidden behind trees or rocks
+        visible = self.line_of_sight.batch_line_of_sight(
+            [bot.x for bot, _ in shooters], [bot.y for bot, _ in shooters],
+            [target.x for _, target in shooters], [target.y for _, target in shooters])
+        for (bot, target), can_see in zip(shooters, visible):
+            if not can_see:
+                continue
+            target_x = target.x + random.uniform(-20, 20)
+            target_y = target.y + random.uniform(-20, 20)
+            self.shoot(bot, target_x, target_y)
+
+    def follow_last_plan(self, x, y, alive, planned, new_x, new_y, targets, distance):
+        # Bots that weren't replanned this tick keep taking the step their
+        # last plan chose and keep their target while it lives, rather than
+        # standing still until their turn comes round again. Skipped steps
+        # aren't checked for separation; the next plan sorts that out.
+        count = len(x)
+        if self.last_plan is None or len(self.last_plan[0]) != count:
+            self.last_plan = (np.full(count, -1, dtype=np.int64), np.zeros(count), np.zeros(count))
+        last_target, last_step_x, last_step_y = self.last_plan
+        last_target[planned] = targets[planned]
+        last_step_x[planned] = new_x[planned] - x[planned]
+        last_step_y[planned] = new_y[planned] - y[planned]
+
+        skipped = alive & ~planned
+        skipped[0] = False
+        new_x[skipped] = np.clip(x[skipped] + last_step_x[skipped], 0, MAP_WIDTH)
+        new_y[skipped] = np.clip(y[skipped] + last_step_y[skipped], HUD_HEIGHT, MAP_HEIGHT)
+        following = np.flatnonzero(skipped & (last_target >= 0))
+        following = following[alive[last_target[following]]]
+        chased = last_target[following]
+        targets[following] = chased
+        distance[following] = np.hypot(x[chased] - x[following], y[chased] - y[following])
+
+    def handle_bullet_collision(self, index):
+        # Point test for a single bullet in self.bullets against every entity;
+        # update_bullets sweeps them all at once instead
+        bullets = self.bullets
+        bullet_x = bullets.x[index]
+        bullet_y = bullets.y[index]
+        owner = int(bullets.owner[index])
+        entities = [self.player] + self.bots
+        for target_index, target in enumerate(entities):
+            size = PLAYER_SIZE if target_index == 0 else BOT_SIZE
+            if (target.alive and owner != target_index and
+                    math.hypot(target.x - bullet_x, target.y - bullet_y) < size):
+                self.apply_hit(entities, target_index, owner, int(bullets.weapon[index]),
+                               float(bullets.damage[index]))
+                return True
         return False
 
-    def draw_hud(self):
+    def draw_hud(self, surface, view):
         # Draw HUD background
-        pygame.draw.rect(screen, GRAY, (0, 0, WINDOW_WIDTH, HUD_HEIGHT))
+        pygame.draw.rect(surface, GRAY, (0, 0, WINDOW_WIDTH, HUD_HEIGHT))
         
         # Draw score
-        score_text = self.font.render(f'Score: {self.score}', True, WHITE)
-        screen.blit(score_text, (10, 10))
+        score_text = self.font.render(f'Score: {view.score}', True, WHITE)
+        surface.blit(score_text, (10, 10))
         
         # Draw number of players remaining
-        alive_bots = len([bot for bot in self.bots if bot.alive])
-        players_text = self.font.render(f'Players: {alive_bots + (1 if self.player.alive else 0)}', True, WHITE)
-        screen.blit(players_text, (WINDOW_WIDTH - 150, 10))
+        players_text = self.font.render(f'Players: {view.players_alive}', True, WHITE)
+        surface.blit(players_text, (WINDOW_WIDTH - 150, 10))
         
         # Draw player health with color indicator
-        if self.player.alive:
+        if view.player:
             health_width = 200
             health_height = 20
             health_x = WINDOW_WIDTH//2 - health_width//2
             health_y = 10
             
             # Draw health bar background
-            pygame.draw.rect(screen, RED, (health_x, health_y, health_width, health_height))
+            pygame.draw.rect(surface, RED, (health_x, health_y, health_width, health_height))
             # Draw current health
-            pygame.draw.rect(screen, GREEN, 
+            pygame.draw.rect(surface, GREEN, 
                            (health_x, health_y, 
-                            health_width * (self.player.health/self.player.max_health), 
+                            health_width * (view.health/view.max_health), 
                             health_height))
             
             # Draw health text
-            health_text = self.font.render(f'Health: {int(self.player.health)}', True, WHITE)
-            screen.blit(health_text, (health_x + health_width//2 - health_text.get_width()//2, 
+            health_text = self.font.render(f'Health: {int(view.health)}', True, WHITE)
+            surface.blit(health_text, (health_x + health_width//2 - health_text.get_width()//2, 
                                     health_y + health_height + 5))
         
         # Draw current weapon
-        if self.player.weapon_inventory.current_weapon:
-            weapon_text = self.font.render(f'Weapon: {self.player.weapon_inventory.current_weapon.name}', 
-                                         True, WHITE)
-            screen.blit(weapon_text, (10, HUD_HEIGHT - 30))
+        if view.weapon_name:
+            weapon_text = self.font.render(f'Weapon: {view.weapon_name}', True, WHITE)
+            surface.blit(weapon_text, (10, HUD_HEIGHT - 30))
+
+    def overlay_lines(self):
+        quality = self.quality
+        lines = [
+            f"Frame: {self.frame_ms:.1f} ms (avg {quality.average_ms:.1f} / budget {quality.budget_ms:.1f})",
+            f"Quality tier {quality.tier}: {quality.tier_name} ({quality.changes} changes)",
+        ]
+        lines += ["  " + line for line in quality.describe()]
+        lines.append(f"Bots: {len(self.bots)}  Bullets: {self.bullets.count}  "
+                     f"Particles: {len(self.particles)}  Damage numbers: {len(self.damage_numbers)}")
+        flow = self.flow_field
+        lines.append(f"Flow field: {flow.builds} builds"
+                     + (f", building ({flow.build.updates} updates)" if flow.building else ""))
+        profiler = self.alloc_profiler
+        if profiler and profiler.last:
+            lines.append(f"Alloc: {profiler.last.kept_bytes / 1024:.1f} KB kept, "
+                         f"{profiler.last.peak_bytes / 1024:.1f} KB peak "
+                         f"({len(profiler.over_budget)} frames over budget)")
+        if self.gc_manager:
+            lines.append(self.gc_manager.describe())
+        if self.rewind:
+            lines.append(self.rewind.describe())
+        return lines
+
+    def draw_overlay(self, surface, lines):
+        # Instrumentation overlay, toggled with F3
+        y = HUD_HEIGHT + 5
+        for line in lines:
+            text = self.small_font.render(line, True, WHITE)
+            background = pygame.Surface((text.get_width() + 8, text.get_height()), pygame.SRCALPHA)
+            background.fill((0, 0, 0, 160))
+            surface.blit(background, (5, y))
+            surface.blit(text, (9, y))
+            y += text.get_height()
+
+    def draw_minimap(self, surface, view):
+        # The minimap surface is also painted by chunk loads on the sim thread
+        with self.minimap_lock:
+            if view.minimap_entities is not None:
+                self.minimap.refresh(view.sim_time, *view.minimap_entities)
+            self.minimap.draw(surface, (WINDOW_WIDTH - MINIMAP_WIDTH - 10, HUD_HEIGHT + 10),
+                              view.safe_zone_center if view.storm_started else None,
+                              view.safe_zone_radius, view.camera.visible_rect())
+
+    def render_view(self):
+        # Copies out everything a game frame draws, so the frame can be drawn
+        # on another thread while the next tick changes the live state
+        view = RenderView()
+        view.camera = Camera()
+        view.camera.x, view.camera.y, view.camera.zoom = self.camera.x, self.camera.y, self.camera.zoom
+        left, top, right, bottom = view.camera.visible_rect()
+        visible = self.render_index.query(left, top, right, bottom)
+        view.terrain = [item for item in visible if isinstance(item, TerrainPatch)]
+        view.bots = [(bot.x, bot.y, bot.color) for bot in visible
+                     if isinstance(bot, Bot) and bot.alive]
+        view.player = (self.player.x, self.player.y, self.player.color) if self.player.alive else None
+        view.player_pos = (self.player.x, self.player.y)
+
+        n = self.bullets.count
+        bullet_x = self.bullets.x[:n]
+        bullet_y = self.bullets.y[:n]
+        bullet_size = self.bullets.size[:n]
+        on_screen = np.flatnonzero((bullet_x + bullet_size >= left) & (bullet_x - bullet_size <= right) &
+                                   (bullet_y + bullet_size >= top) & (bullet_y - bullet_size <= bottom))
+        view.bullets = (bullet_x[on_screen].tolist(), bullet_y[on_screen].tolist(),
+                        bullet_size[on_screen].tolist())
+        view.particles = [copy.copy(particle) for particle in self.particles
+                          if left <= particle.x <= right and top <= particle.y <= bottom]
+        view.damage_numbers = [copy.copy(number) for number in self.damage_numbers]
+
+        view.storm_started = self.storm_started
+        view.safe_zone_center = self.safe_zone_center
+        view.safe_zone_radius = self.safe_zone_radius
+        view.time_until_storm = self.storm.time_until_start(self.sim_time) / 1000
+        view.sim_time = self.sim_time
+
+        view.score = self.score
+        view.players_alive = len([bot for bot in self.bots if bot.alive]) + (1 if self.player.alive else 0)
+        view.health = self.player.health
+        view.max_health = self.player.max_health
+        weapon = self.player.weapon_inventory.current_weapon
+        view.weapon_name = weapon.name if weapon else None
+
+        # Dots are only gathered when the minimap will redraw them; bots
+        # first, so the player's dot goes on top
+        view.minimap_entities = None
+        if self.minimap.refresh_due(self.sim_time):
+            shown = np.flatnonzero(self.render_alive[1:]) + 1
+            colors = [self.bots[index - 1].color for index in shown.tolist()]
+            if self.render_alive[0]:
+                shown = np.append(shown, 0)
+                colors.append(WHITE)
+            view.minimap_entities = (self.render_x[shown], self.render_y[shown], colors)
+        view.settings = self.quality.settings
+        view.overlay = self.overlay_lines() if self.show_overlay else None
+        return view
+
+    def draw_view(self, surface, view):
+        surface.fill(GRASS_GREEN)
+        self.draw_game_objects(surface, view)
+        self.draw_hud(surface, view)
+        self.draw_minimap(surface, view)
+        for damage_number in view.damage_numbers:
+            damage_number.draw(surface)
+        if view.overlay:
+            self.draw_overlay(surface, view.overlay)
 
     def draw_game_over_screen(self):
-        screen.fill(BLACK)
+        self.screen.fill(BLACK)
         if self.player.alive:
             text = self.font.render("Victory Royale!", True, GOLD)
         else:
             text = self.font.render("Game Over", True, RED)
         
         text_rect = text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2 - 50))
-        screen.blit(text, text_rect)
+        self.screen.blit(text, text_rect)
         
         score_text = self.font.render(f"Score: {self.score}", True, WHITE)
         score_rect = score_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2 + 20))
-        screen.blit(score_text, score_rect)
+        self.screen.blit(score_text, score_rect)
         
         restart_text = self.font.render("Click anywhere to restart", True, WHITE)
         restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2 + 90))
-        screen.blit(restart_text, restart_rect)
+        self.screen.blit(restart_text, restart_rect)
 
     def draw_start_screen(self):
-        screen.fill(BLACK)
+        self.screen.fill(BLACK)
         title_text = self.font.render("Battle Royale", True, WHITE)
         start_text = self.font.render("Click to Start", True, WHITE)
         
         title_rect = title_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2 - 50))
         start_rect = start_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2 + 50))
         
-        screen.blit(title_text, title_rect)
+        self.screen.blit(title_text, title_rect)
         
         # Draw start button
         button_rect = pygame.Rect(WINDOW_WIDTH//2 - 100, WINDOW_HEIGHT//2 - 25, 200, 50)
-        pygame.draw.rect(screen, BLUE, button_rect)
-        screen.blit(start_text, start_rect)
+        pygame.draw.rect(self.screen, BLUE, button_rect)
+        self.screen.blit(start_text, start_rect)
         
         # Draw instructions
         instructions = [
@@ -897,27 +1194,29 @@ class Game:
         for line in instructions:
             text = self.small_font.render(line, True, WHITE)
             text_rect = text.get_rect(center=(WINDOW_WIDTH//2, y_pos))
-            screen.blit(text, text_rect)
+            self.screen.blit(text, text_rect)
             y_pos += 25
         
         return button_rect
 
+    def countdown_value(self):
+        return 4 - int((pygame.time.get_ticks() - self.countdown_start) / 1000)
+
     def draw_countdown(self):
-        screen.fill(BLACK)
-        time_elapsed = (pygame.time.get_ticks() - self.countdown_start) / 1000
-        count = 4 - int(time_elapsed)
+        self.screen.fill(BLACK)
+        count = self.countdown_value()
         if count > 0:
             count_text = self.font.render(str(count), True, WHITE)
             text_rect = count_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT//2))
-            screen.blit(count_text, text_rect)
+            self.screen.blit(count_text, text_rect)
 
     def draw_weapon_select_screen(self):
-        screen.fill((20, 20, 40))  # Dark blue background
+        self.screen.fill((20, 20, 40))  # Dark blue background
         
         # Draw title
         title = self.font.render("Select Your Weapon", True, WHITE)
         title_rect = title.get_rect(center=(WINDOW_WIDTH//2, 50))
-        screen.blit(title, title_rect)
+        self.screen.blit(title, title_rect)
         
         # Get list of weapons
         weapons = list(self.player.weapon_inventory.weapons.values())
@@ -933,15 +1232,15 @@ class Game:
             
             # Highlight selected weapon
             if i == self.selected_weapon_index:
-                pygame.draw.rect(screen, (60, 60, 100), rect)  # Highlighted color
-                pygame.draw.rect(screen, WHITE, rect, 2)  # White border
+                pygame.draw.rect(self.screen, (60, 60, 100), rect)  # Highlighted color
+                pygame.draw.rect(self.screen, WHITE, rect, 2)  # White border
             else:
-                pygame.draw.rect(screen, (40, 40, 80), rect)  # Normal color
+                pygame.draw.rect(self.screen, (40, 40, 80), rect)  # Normal color
             
             # Draw weapon name
             name = self.font.render(weapon.name, True, WHITE)
             name_rect = name.get_rect(center=(WINDOW_WIDTH//2, start_y + i*spacing + 20))
-            screen.blit(name, name_rect)
+            self.screen.blit(name, name_rect)
             
             # Draw weapon stats
             stats_color = GOLD if i == self.selected_weapon_index else GRAY
@@ -951,7 +1250,7 @@ class Game:
                 True, stats_color
             )
             stats_rect = stats.get_rect(center=(WINDOW_WIDTH//2, start_y + i*spacing + 50))
-            screen.blit(stats, stats_rect)
+            self.screen.blit(stats, stats_rect)
         
         # Draw instructions at bottom
         instructions = [
@@ -963,46 +1262,115 @@ class Game:
         for instruction in instructions:
             text = self.small_font.render(instruction, True, WHITE)
             text_rect = text.get_rect(center=(WINDOW_WIDTH//2, y_pos))
-            screen.blit(text, text_rect)
+            self.screen.blit(text, text_rect)
             y_pos += 30
 
+    def menu_key(self):
+        # Everything the current menu screen depends on, or None during a
+        # match; a menu is only redrawn when this changes
+        if self.kill_cam is not None:
+            return None
+        if self.game_over:
+            return ('game over', self.player.alive, self.score)
+        if self.in_weapon_select:
+            return ('weapon select', self.selected_weapon_index)
+        if self.in_countdown:
+            return ('countdown', self.countdown_value())
+        if not self.game_started:
+            return ('start',)
+        return None
+
+    def menu_timeout(self):
+        # How long a menu can wait for input before it has to change by itself
+        if self.in_countdown:
+            elapsed = pygame.time.get_ticks() - self.countdown_start
+            return max(1, min(1000 - elapsed % 1000, COUNTDOWN_MS - elapsed))
+        return MENU_IDLE_TIMEOUT_MS
+
+    def menu_idle(self):
+        key = self.menu_key()
+        return key is not None and key == self.menu_shown
+
+    def present_menu(self):
+        # Menus are drawn once per distinct menu_key() into cached frames;
+        # while the key stays the same nothing is drawn or flipped
+        key = self.menu_key()
+        if key == self.menu_shown:
+            return False
+        frame = self.menu_frames.get(key)
+        if frame is None:
+            if self.menu_frames and next(iter(self.menu_frames))[0] != key[0]:
+                # Only the frames of the current menu are worth keeping
+                self.menu_frames.clear()
+            if key[0] == 'game over':
+                self.draw_game_over_screen()
+            elif key[0] == 'weapon select':
+                self.draw_weapon_select_screen()
+            elif key[0] == 'countdown':
+                self.draw_countdown()
+            else:
+                self.draw_start_screen()
+            self.menu_frames[key] = self.screen.copy()
+        else:
+            self.screen.blit(frame, (0, 0))
+        pygame.display.flip()
+        self.menu_shown = key
+        return True
+
+    def rewind_to(self, sim_time):
+        # Puts the match back to the latest held tick at or before sim_time
+        # and forgets everything after it
+        index = self.rewind.index_before(sim_time)
+        load_state(self, *self.rewind.state(index), keep_world=True)
+        self.rewind.truncate(index)
+        self.events.clear()
+
+    def start_kill_cam(self):
+        frames = self.rewind.frames if self.rewind else None
+        if not frames:
+            return
+        first = self.rewind.index_before(self.sim_time - KILL_CAM_SECONDS * 1000)
+        self.kill_cam = [frames[first].sim_time, len(frames) - 1]
+        self.death_time = self.sim_time
+
+    def play_kill_cam(self):
+        # Shows the next tick leading up to the player's death, straight
+        # from the rewind history. The history may only hold every few
+        # ticks (see RewindBuffer.stride), so playback follows sim time and
+        # holds each held tick until the next one is due.
+        clock, last = self.kill_cam
+        index = min(self.rewind.index_before(clock), last)
+        load_state(self, *self.rewind.state(index), keep_world=True)
+        self.game_over = True
+        self.draw_view(self.screen, self.render_view())
+        label = self.font.render(f"KILL CAM  {(self.sim_time - self.death_time) / 1000:+.1f} s",
+                                 True, RED)
+        self.screen.blit(label, label.get_rect(center=(WINDOW_WIDTH // 2, HUD_HEIGHT + 30)))
+        pygame.display.flip()
+        if index >= last:
+            self.kill_cam = None
+        else:
+            self.kill_cam[0] = clock + TICK_MS
+
+    def end_kill_cam(self):
+        # Skips to the end; the match state is left as it was at the death
+        load_state(self, *self.rewind.state(self.kill_cam[1]), keep_world=True)
+        self.game_over = True
+        self.kill_cam = None
+
     def draw(self):
         if self.in_weapon_select:
             self.draw_weapon_select_screen()
         elif self.in_countdown:
             self.draw_countdown()
-            if pygame.time.get_ticks() - self.countdown_start >= 3000:
-                self.in_countdown = False
-                self.game_started = True
+            if pygame.time.get_ticks() - self.countdown_start >= COUNTDOWN_MS:
+                self.begin_match()
         elif not self.game_started and not self.in_countdown and not self.in_weapon_select:
             button_rect = self.draw_start_screen()
             pygame.display.flip()
             return button_rect
         elif self.game_started and not self.game_over:
-            screen.fill(GRASS_GREEN)
-            self.draw_hud()
-            pygame.draw.line(screen, WHITE, (0, HUD_HEIGHT), (WINDOW_WIDTH, HUD_HEIGHT))
-            
-            if self.storm_started:
-                pygame.draw.circle(screen, YELLOW, self.safe_zone_center, int(self.safe_zone_radius), 2)
-            
-            for bullet in self.bullets:
-                bullet.draw()
-            
-            for particle in self.particles:
-                particle.draw(screen)
-            
-            if self.player.alive:
-                self.player.draw()
-            
-            for bot in self.bots:
-                if bot.alive:
-                    bot.draw()
-            
-            self.damage_numbers = [num for num in self.damage_numbers if num.update()]
-            for damage_number in self.damage_numbers:
-                damage_number.draw(screen)
-            
+            self.draw_view(self.screen, self.render_view())
             pygame.display.flip()
             return None  
         elif self.game_over:
@@ -1010,138 +1378,202 @@ class Game:
             pygame.display.flip()
             return None  
 
-    def draw_game_objects(self):
-        screen.fill(GRASS_GREEN)
+    def draw_game_objects(self, surface, view):
+        camera = view.camera
+        settings = view.settings
         
-        for patch in self.terrain_patches:
-            screen_pos = self.camera.apply(patch.x, patch.y)
-            if (0 <= screen_pos[0] <= WINDOW_WIDTH and 
-                HUD_HEIGHT <= screen_pos[1] <= WINDOW_HEIGHT):
-                scaled_size = self.camera.apply_radius(patch.size)
-                
-                if patch.type == 'tree':
-                    # Draw tree trunk
-                    trunk_width = scaled_size // 3
-                    trunk_height = scaled_size // 2
-                    pygame.draw.rect(screen, BROWN, 
+        for patch in view.terrain:
+            screen_pos = camera.apply(patch.x, patch.y)
+            scaled_size = camera.apply_radius(patch.size)
+            
+            if patch.type == 'tree':
+                # Draw tree trunk
+                trunk_width = scaled_size // 3
+                trunk_height = scaled_size // 2
+                if settings['terrain_detail'] >= 2:
+                    pygame.draw.rect(surface, BROWN, 
                                   (screen_pos[0] - trunk_width//2,
                                    screen_pos[1] - trunk_height//2,
                                    trunk_width, trunk_height))
-                    # Draw tree top
-                    pygame.draw.circle(screen, patch.color,
-                                    (int(screen_pos[0]), int(screen_pos[1] - trunk_height//2)),
-                                    int(scaled_size//2))
-                else:
-                    pygame.draw.circle(screen, patch.color,
-                                    (int(screen_pos[0]), int(screen_pos[1])),
-                                    int(scaled_size))
+                # Draw tree top
+                pygame.draw.circle(surface, patch.color,
+                                (int(screen_pos[0]), int(screen_pos[1] - trunk_height//2)),
+                                int(scaled_size//2))
+            else:
+                pygame.draw.circle(surface, patch.color,
+                                (int(screen_pos[0]), int(screen_pos[1])),
+                                int(scaled_size))
         
-        if self.storm_started:
-            screen_pos = self.camera.apply(self.safe_zone_center[0], self.safe_zone_center[1])
-            scaled_radius = self.camera.apply_radius(self.safe_zone_radius)
-            pygame.draw.circle(screen, YELLOW, (int(screen_pos[0]), int(screen_pos[1])), 
+        if view.storm_started:
+            screen_pos = camera.apply(view.safe_zone_center[0], view.safe_zone_center[1])
+            scaled_radius = camera.apply_radius(view.safe_zone_radius)
+            pygame.draw.circle(surface, YELLOW, (int(screen_pos[0]), int(screen_pos[1])), 
                             int(scaled_radius), 2)
-        else:
-            time_until_storm = max(0, 20 - (pygame.time.get_ticks() - self.storm_start_time) / 1000)
-            if time_until_storm > 0:
-                timer_text = self.font.render(f"Storm begins in: {int(time_until_storm)}s", True, YELLOW)
-                text_rect = timer_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT - 30))
-                screen.blit(timer_text, text_rect)
+        elif view.time_until_storm > 0:
+            timer_text = self.font.render(f"Storm begins in: {int(view.time_until_storm)}s", True, YELLOW)
+            text_rect = timer_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT - 30))
+            surface.blit(timer_text, text_rect)
         
-        for bullet in self.bullets:
-            screen_pos = self.camera.apply(bullet.x, bullet.y)
-            scaled_size = self.camera.apply_radius(bullet.size)
-            pygame.draw.circle(screen, WHITE, (int(screen_pos[0]), int(screen_pos[1])), 
+        for x, y, size in zip(*view.bullets):
+            screen_pos = camera.apply(x, y)
+            scaled_size = camera.apply_radius(size)
+            pygame.draw.circle(surface, WHITE, (int(screen_pos[0]), int(screen_pos[1])), 
                             int(scaled_size))
+
+        for particle in view.particles:
+            particle.draw_at_pos(surface, *camera.apply(particle.x, particle.y))
         
-        if self.player.alive:
-            screen_pos = self.camera.apply(self.player.x, self.player.y)
-            scaled_size = self.camera.apply_radius(PLAYER_SIZE)
+        if view.player:
+            x, y, color = view.player
+            screen_pos = camera.apply(x, y)
+            scaled_size = camera.apply_radius(PLAYER_SIZE)
             body_width = scaled_size - 4
             body_height = scaled_size + 4
-            pygame.draw.rect(screen, self.player.color, 
+            pygame.draw.rect(surface, color, 
                         (screen_pos[0] - body_width//2, 
                          screen_pos[1] - body_height//2, 
                          body_width, body_height))
             head_radius = scaled_size//3
-            pygame.draw.circle(screen, self.player.color,
+            pygame.draw.circle(surface, color,
                           (int(screen_pos[0]), int(screen_pos[1] - body_height//2 - head_radius)),
                           head_radius)
         
-        for bot in self.bots:
-            if bot.alive:
-                screen_pos = self.camera.apply(bot.x, bot.y)
-                scaled_size = self.camera.apply_radius(BOT_SIZE)
-                body_width = scaled_size - 4
-                body_height = scaled_size + 4
-                pygame.draw.rect(screen, bot.color, 
-                            (screen_pos[0] - body_width//2,
-                             screen_pos[1] - body_height//2,
-                             body_width, body_height))
-                head_radius = scaled_size//3
-                pygame.draw.circle(screen, bot.color,
-                              (int(screen_pos[0]), int(screen_pos[1] - body_height//2 - head_radius)),
-                              head_radius)
-
-    def shoot(self, shooter, target_x, target_y, current_time):
-        if not shooter.alive or not shooter.weapon_inventory.current_weapon:
-            return []
-
-        weapon = shooter.weapon_inventory.current_weapon
-        if current_time - shooter.last_shot_time < weapon.fire_rate:
-            return []
-
-        shooter.last_shot_time = current_time
-        bullets = []
-
-        dx = target_x - shooter.x
-        dy = target_y - shooter.y
-        length = math.sqrt(dx*dx + dy*dy)
-        if length > 0:
-            dx = dx/length
-            dy = dy/length
-
-        if weapon.name == "Shotgun":
-            num_pellets = 5
-            spread_angle = math.pi / 8  
-            for i in range(num_pellets):
-                angle = math.atan2(dy, dx) + random.uniform(-spread_angle, spread_angle)
-                pellet_dx = math.cos(angle)
-                pellet_dy = math.sin(angle)
-                bullets.append(Bullet(
-                    shooter.x, shooter.y,
-                    pellet_dx, pellet_dy,
-                    weapon.damage // num_pellets,  
-                    weapon.bullet_speed,
-                    weapon.bullet_size,
-                    shooter,
-                    isinstance(shooter, Bot)
-                ))
-        else:
-            bullets.append(Bullet(
-                shooter.x, shooter.y,
-                dx, dy,
-                weapon.damage,
-                weapon.bullet_speed,
-                weapon.bullet_size,
-                shooter,
-                isinstance(shooter, Bot)
-            ))
-
-        return bullets
+        lod_distance = settings['bot_lod_distance']
+        player_x, player_y = view.player_pos
+        for x, y, color in view.bots:
+            screen_pos = camera.apply(x, y)
+            scaled_size = camera.apply_radius(BOT_SIZE)
+            body_width = scaled_size - 4
+            body_height = scaled_size + 4
+            pygame.draw.rect(surface, color, 
+                        (screen_pos[0] - body_width//2,
+                         screen_pos[1] - body_height//2,
+                         body_width, body_height))
+            # Distant bots are drawn as just a body at lower quality tiers
+            if math.hypot(x - player_x, y - player_y) > lod_distance:
+                continue
+            head_radius = scaled_size//3
+            pygame.draw.circle(surface, color,
+                          (int(screen_pos[0]), int(screen_pos[1] - body_height//2 - head_radius)),
+                          head_radius)
+
+    def step(self, keys):
+        # Advances the match by one tick, with keys as returned by
+        # pygame.key.get_pressed()
+        # Handle movement
+        dx = 0
+        dy = 0
+        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+            dx = -PLAYER_SPEED
+        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+            dx = PLAYER_SPEED
+        if keys[pygame.K_w] or keys[pygame.K_UP]:
+            dy = -PLAYER_SPEED
+        if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+            dy = PLAYER_SPEED
+
+        # Store facing direction when moving
+        if dx != 0 or dy != 0:
+            length = math.sqrt(dx*dx + dy*dy)
+            self.player.facing_dx = dx/length
+            self.player.facing_dy = dy/length
+
+        # Normalize diagonal movement
+        if dx != 0 and dy != 0:
+            dx *= 0.707  # 1/sqrt(2)
+            dy *= 0.707
+
+        # Update player position
+        if dx != 0 or dy != 0:
+            new_x = self.player.x + dx
+            new_y = self.player.y + dy
+
+            # Keep player within bounds
+            self.player.x = max(0, min(new_x, MAP_WIDTH))
+            self.player.y = max(HUD_HEIGHT, min(new_y, MAP_HEIGHT))
+
+        # Update camera to follow player
+        self.camera.update(self.player.x, self.player.y)
+
+        # Update game state
+        self.sim_time += TICK_MS
+        self.update_bullets()
+        self.update_safe_zone()
+        self.update_flow_field()
+        self.check_zone_damage()
+        self.move_bots()
+        self.spawn_projectiles(self.sim_time)
+        # Side effects of this tick's hits, kills and shots, all at once
+        self.events.dispatch()
+        self.update_particles()
+        self.update_render_index()
+        self.update_world()
+
+        self.damage_numbers = [num for num in self.damage_numbers if num.update()]
+
+        # Check win/lose conditions
+        alive_bots = len([bot for bot in self.bots if bot.alive])
+        if alive_bots == 0 and self.player.alive:
+            self.game_over = True
+            self.victory = True
+        elif not self.player.alive:
+            self.game_over = True
+            self.victory = False
+
+        if self.replay:
+            self.replay.record(self)
+        if self.rewind:
+            self.rewind.record(self)
+
+    def shoot(self, shooter, target_x, target_y):
+        shooter.shoot(self.spawner, target_x, target_y)
+
+    def spawn_projectiles(self, current_time):
+        # Emits the bullets for every shot requested this tick in one batch
+        entity_index = self.entity_index()
+        fired = self.spawner.resolve(current_time, self.bullets, entity_index)
+        if fired:
+            x = [shooter.x for shooter in fired]
+            y = [shooter.y for shooter in fired]
+            self.events.push_many(events.SHOT, [entity_index[id(shooter)] for shooter in fired], -1,
+                                  x, y, x, y, 0,
+                                  [shooter.weapon_inventory.current_weapon.id for shooter in fired])
+
+    def record_weapon_switch(self):
+        if self.telemetry:
+            self.telemetry.record(self.sim_time, telemetry.WEAPON_SWITCH, 0, -1,
+                                  self.player.x, self.player.y, self.player.x, self.player.y,
+                                  weapon=self.player.weapon_inventory.current_weapon.id)
 
     def run(self):
         clock = pygame.time.Clock()
         running = True
         
         while running:
+            if self.menu_idle():
+                # Nothing on a menu changes without input, so sleep until some
+                # arrives or the countdown ticks over
+                pending_events = [pygame.event.wait(self.menu_timeout())] + pygame.event.get()
+            else:
+                pending_events = pygame.event.get()
             current_time = pygame.time.get_ticks()
+            frame_start = time.perf_counter()
+            if self.alloc_profiler:
+                self.alloc_profiler.begin_frame()
+            if self.pipeline and not (self.game_started and not self.game_over):
+                # Menus draw on this thread; let the last game frame finish first
+                self.pipeline.present()
             
-            for event in pygame.event.get():
+            for event in pending_events:
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                    # The window lost its contents; show the menu again
+                    self.menu_shown = None
                 elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if self.game_over:
+                    if self.kill_cam is not None:
+                        self.end_kill_cam()
+                    elif self.game_over:
                         # Reset everything when clicking after game over
                         self.game_over = False
                         self.game_started = False
@@ -1156,6 +1588,21 @@ class Game:
                             print("Start button clicked in the rectangle. Entering weapon select.")
                             self.reset_game()
                             self.in_weapon_select = True
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.show_overlay = not self.show_overlay
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                    if self.game_started and not self.game_over:
+                        size = write_snapshot(self, QUICKSAVE_PATH)
+                        print(f"Saved {size} bytes to {QUICKSAVE_PATH}")
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                    if os.path.exists(QUICKSAVE_PATH):
+                        self.kill_cam = None
+                        read_snapshot(self, QUICKSAVE_PATH)
+                        print(f"Loaded {QUICKSAVE_PATH}")
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F8:
+                    if self.rewind and self.rewind.frames and self.game_started and not self.game_over:
+                        self.rewind_to(self.sim_time - REWIND_SECONDS * 1000)
+                        print(f"Rewound to {self.sim_time / 1000:.1f} s")
                 elif event.type == pygame.KEYDOWN:
                     if self.in_weapon_select:
                         weapons = list(self.player.weapon_inventory.weapons.values())
@@ -1167,6 +1614,7 @@ class Game:
                             # Select weapon and start countdown
                             weapon_name = list(self.player.weapon_inventory.weapons.keys())[self.selected_weapon_index]
                             self.player.weapon_inventory.switch_weapon(weapon_name)
+                            self.record_weapon_switch()
                             self.in_weapon_select = False
                             self.in_countdown = True
                             self.countdown_start = current_time
@@ -1210,114 +1658,135 @@ class Game:
                                     target_x = self.player.x + dx * 100
                                     target_y = self.player.y + dy * 100
                                     
-                                    bullets = self.shoot(self.player, target_x, target_y, current_time)
-                                    if bullets:
-                                        self.bullets.extend(bullets)
+                                    self.shoot(self.player, target_x, target_y)
                         elif event.key == pygame.K_w:
                             self.player.weapon_inventory.prev_weapon()
+                            self.record_weapon_switch()
                         elif event.key == pygame.K_e:
                             self.player.weapon_inventory.next_weapon()
+                            self.record_weapon_switch()
 
-            if self.game_started and not self.game_over:
-                # Handle movement
-                keys = pygame.key.get_pressed()
-                dx = 0
-                dy = 0
-                if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-                    dx = -PLAYER_SPEED
-                if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-                    dx = PLAYER_SPEED
-                if keys[pygame.K_w] or keys[pygame.K_UP]:
-                    dy = -PLAYER_SPEED
-                if keys[pygame.K_s] or keys[pygame.K_DOWN]:
-                    dy = PLAYER_SPEED
-                
-                # Store facing direction when moving
-                if dx != 0 or dy != 0:
-                    length = math.sqrt(dx*dx + dy*dy)
-                    self.player.facing_dx = dx/length
-                    self.player.facing_dy = dy/length
-                
-                # Normalize diagonal movement
-                if dx != 0 and dy != 0:
-                    dx *= 0.707  # 1/sqrt(2)
-                    dy *= 0.707
-                
-                # Update player position
-                if dx != 0 or dy != 0:
-                    new_x = self.player.x + dx
-                    new_y = self.player.y + dy
-                    
-                    # Keep player within bounds
-                    self.player.x = max(0, min(new_x, MAP_WIDTH))
-                    self.player.y = max(HUD_HEIGHT, min(new_y, MAP_HEIGHT))
-                
-                # Update camera to follow player
-                self.camera.update(self.player.x, self.player.y)
-                
-                # Update game state
-                self.update_bullets()
-                self.update_safe_zone()
-                self.check_zone_damage()
-                self.update_particles()
-                self.move_bots()
-                
-                # Draw everything
-                screen.fill(GRASS_GREEN)
-                self.draw_game_objects()
-                self.draw_hud()
-                
-                # Draw storm timer if storm hasn't started
-                if not self.storm_started:
-                    time_until_storm = max(0, 20 - (current_time - self.storm_start_time) / 1000)
-                    if time_until_storm > 0:
-                        timer_text = self.font.render(f"Storm begins in: {int(time_until_storm)}s", True, YELLOW)
-                        text_rect = timer_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT - 30))
-                        screen.blit(timer_text, text_rect)
-                
-                # Draw damage numbers
-                self.damage_numbers = [num for num in self.damage_numbers if num.update()]
-                for damage_number in self.damage_numbers:
-                    damage_number.draw(screen)
-                
-                # Check win/lose conditions
-                alive_bots = len([bot for bot in self.bots if bot.alive])
-                if alive_bots == 0 and self.player.alive:
-                    self.game_over = True
-                    self.victory = True
-                elif not self.player.alive:
-                    self.game_over = True
-                    self.victory = False
-                
-                pygame.display.flip()
-                clock.tick(60)
-            
-            elif self.game_over:
-                self.draw_game_over_screen()
-                pygame.display.flip()
+            if self.kill_cam is not None:
+                self.play_kill_cam()
                 clock.tick(60)
 
-            if self.in_countdown:
-                self.draw_countdown()
-                if current_time - self.countdown_start >= 3000:
-                    self.in_countdown = False
-                    self.game_started = True
-                pygame.display.flip()
+            elif self.game_started and not self.game_over:
+                self.step(pygame.key.get_pressed())
+                if self.pipeline:
+                    # Draw this tick on the render thread while the next one is
+                    # simulated; present() flips the previous tick's frame
+                    self.pipeline.present()
+                    self.pipeline.submit(self.render_view())
+                else:
+                    self.draw_view(self.screen, self.render_view())
+                    pygame.display.flip()
+                # Frame time covers the work done this frame, not the wait in tick()
+                self.frame_ms = (time.perf_counter() - frame_start) * 1000
+                self.quality.record(self.frame_ms)
+                if self.gc_manager:
+                    self.gc_manager.end_frame(self.frame_ms, self.quality.budget_ms)
+                    if self.game_over:
+                        self.gc_manager.match_ended()
+                if self.game_over and not self.player.alive:
+                    self.start_kill_cam()
+                if self.alloc_profiler:
+                    self.alloc_profiler.end_frame()
                 clock.tick(60)
 
-            if not self.game_started and not self.in_countdown and not self.in_weapon_select:
-                button_rect = self.draw_start_screen()
-                pygame.display.flip()
-                clock.tick(60)
+            elif self.in_countdown and current_time - self.countdown_start >= COUNTDOWN_MS:
+                self.begin_match()
 
-            if self.in_weapon_select:
-                self.draw_weapon_select_screen()
-                pygame.display.flip()
+            else:
+                if (self.present_menu() and self.gc_manager
+                        and self.menu_shown[0] in ('countdown', 'game over')):
+                    # Nothing moves on these screens, so a collection goes unseen
+                    self.gc_manager.safe_point()
                 clock.tick(60)
 
+        if self.telemetry:
+            self.telemetry.close()
+        if self.replay:
+            self.replay.close()
+            print(f"Recorded {self.replay.frames} frames to {self.replay.path}")
+        self.planner.close()
+        if self.pipeline:
+            self.pipeline.close()
+        if self.gc_manager:
+            self.gc_manager.close()
+        if self.alloc_profiler:
+            self.alloc_profiler.stop()
+            print('\n'.join(self.alloc_profiler.report()))
         pygame.quit()
 
-screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Battle Royale")
+    parser.add_argument('--scenario', default=DEFAULT_SCENARIO,
+                        help=f"scenario name from scenarios/ ({', '.join(scenario_names())}) "
+                             f"or path to a scenario JSON file")
+    parser.add_argument('--map-size',
+                        help="arena size as WIDTHxHEIGHT, e.g. 50000x50000; overrides the scenario's")
+    parser.add_argument('--telemetry', metavar='PATH',
+                        help='record match events to PATH (.jsonl.gz for JSON lines, '
+                             'anything else for the binary format)')
+    parser.add_argument('--record', metavar='PATH',
+                        help='save every tick to the replay file PATH, for render_replay.py')
+    parser.add_argument('--load', metavar='PATH', help='resume the match saved in PATH')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='draw each frame on a render thread while the next tick runs')
+    parser.add_argument('--ai-workers', type=int, default=0, metavar='N',
+                        help='plan bots in N worker processes (0 plans in-process)')
+    parser.add_argument('--alloc-profile', metavar='PATH',
+                        help='trace allocations every game frame and write a ranked report '
+                             'to PATH on exit (slows the game down)')
+    parser.add_argument('--alloc-budget', type=float, default=ALLOC_BUDGET_BYTES / 1024, metavar='KB',
+                        help='flag frames whose allocations peak above KB')
+    parser.add_argument('--gc', choices=('managed', 'default'), default='managed',
+                        help='managed freezes match state and holds full collections for '
+                             'safe points; default leaves the collector alone. Both show '
+                             'collection pauses on the F3 overlay')
+    parser.add_argument('--rewind-seconds', type=float, default=10,
+                        help='seconds of match history kept for the kill cam and F8 (0 turns it off)')
+    parser.add_argument('--rewind-mb', type=float, default=16,
+                        help='memory cap for that history in megabytes')
+    parser.add_argument('--rewind-budget', type=float, default=10, metavar='PERCENT',
+                        help='share of tick time recording that history may take; past it, '
+                             'fewer ticks are recorded')
+    args = parser.parse_args()
+    try:
+        apply_scenario(load_scenario(args.scenario))
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.map_size:
+        width, height = (int(value) for value in args.map_size.lower().split('x'))
+        set_map_size(width, height)
+
+    recorder = None
+    if args.telemetry:
+        recorder = TelemetryRecorder(args.telemetry, metadata={
+            'map_width': MAP_WIDTH,
+            'map_height': MAP_HEIGHT,
+            'weapons': list(WeaponInventory().weapons),
+        })
+    replay = None
+    if args.record:
+        replay = ReplayRecorder(args.record, metadata={
+            'scenario': args.scenario,
+            'map_width': MAP_WIDTH,
+            'map_height': MAP_HEIGHT,
+            'fps': FPS,
+        })
+    profiler = None
+    if args.alloc_profile:
+        # Imported only when asked for; ast and tracemalloc add to startup
+        from alloc_profile import AllocationProfiler
+        profiler = AllocationProfiler(args.alloc_budget * 1024, args.alloc_profile)
+        profiler.start()
+    game = Game(telemetry=recorder, ai_workers=args.ai_workers, pipelined=args.pipelined,
+                alloc_profiler=profiler, gc_manager=GcManager(managed=args.gc == 'managed'),
+                replay=replay,
+                rewind=RewindBuffer(args.rewind_seconds, FPS, int(args.rewind_mb * (1 << 20)),
+                                    budget=args.rewind_budget / 100)
+                if args.rewind_seconds > 0 else None)
+    if args.load:
+        read_snapshot(game, args.load)
     game.run()
@@ -0,0 +1,64 @@
+import argparse
+import collections
+import os
+import random
+import sys
+
+# Plays a seeded headless match under the allocation profiler, one frame
+# per tick (simulate, then draw offscreen), and prints the ranked report.
+# Fails when more than --max-over of the frames go over the budget, so an
+# allocation regression in a hot loop shows up here.
+#
+#   python benchmarks/frame_allocations.py --ticks 1200 --budget-kb 64
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pygame  # noqa: E402
+import battle_royale  # noqa: E402
+from alloc_profile import AllocationProfiler  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile per-frame allocations in a headless match")
+    parser.add_argument('--ticks', type=int, default=900)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--budget-kb', type=float, default=battle_royale.ALLOC_BUDGET_BYTES / 1024)
+    parser.add_argument('--max-over', type=float, default=0.05,
+                        help='fraction of frames allowed over budget')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--report', metavar='PATH', help='also write the report to PATH')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    game = battle_royale.Game(screen=pygame.Surface((battle_royale.WINDOW_WIDTH,
+                                                     battle_royale.WINDOW_HEIGHT)))
+    game.game_started = True
+    no_input = collections.defaultdict(bool)
+    profiler = AllocationProfiler(args.budget_kb * 1024, args.report, top=args.top)
+    profiler.start()
+    try:
+        for _ in range(args.ticks):
+            profiler.begin_frame()
+            game.step(no_input)
+            game.draw_view(game.screen, game.render_view())
+            profiler.end_frame()
+            if game.game_over:
+                break
+    finally:
+        profiler.stop()
+        game.planner.close()
+
+    print('\n'.join(profiler.report()))
+    over = len(profiler.over_budget) / max(profiler.frames, 1)
+    if over > args.max_over:
+        print(f"\nFAIL: {over:.1%} of frames over the {args.budget_kb:g} KB budget "
+              f"(allowed {args.max_over:.1%})")
+        sys.exit(1)
+    print(f"\nOK: {over:.1%} of frames over budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Measures how long `import battle_royale` takes in a fresh interpreter and
+# checks that importing it leaves the display, mixer and font modules alone.
+#
+#   python benchmarks/import_time.py --runs 10
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import time
+start = time.perf_counter()
+import battle_royale
+elapsed = time.perf_counter() - start
+import pygame
+print(elapsed, pygame.display.get_init(), bool(pygame.mixer.get_init()), pygame.font.get_init())
+"""
+
+
+def run_probe():
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), [value == 'True' for value in output[1:]]
+
+
+def top_imports(count):
+    # -X importtime writes one line per module to stderr:
+    #   import time: self [us] | cumulative | imported package
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import battle_royale'],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure battle_royale import time")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest modules to list')
+    args = parser.parse_args()
+
+    times = []
+    side_effects = set()
+    for _ in range(args.runs):
+        elapsed, (display, mixer, font) = run_probe()
+        times.append(elapsed * 1000)
+        for name, initialized in (('display', display), ('mixer', mixer), ('font', font)):
+            if initialized:
+                side_effects.add(name)
+
+    print(f"import battle_royale over {args.runs} runs: "
+          f"median {statistics.median(times):.1f} ms, "
+          f"min {min(times):.1f} ms, max {max(times):.1f} ms")
+    print("\nSlowest modules by self time:")
+    for self_us, cumulative_us, name in top_imports(args.top):
+        print(f"  {self_us / 1000:8.2f} ms self  {cumulative_us / 1000:8.2f} ms total  {name}")
+
+    if side_effects:
+        print(f"\nFAIL: importing initialized pygame {', '.join(sorted(side_effects))}")
+        sys.exit(1)
+    print("\nOK: import has no pygame side effects")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Times one tick of bot planning in-process and with 1, 2, 4 and 8 worker
+# processes, checks every mode plans the same moves, and reports speedup and
+# scaling efficiency against the in-process planner.
+#
+#   python benchmarks/parallel_ai_scaling.py --bots 5000 --ticks 20
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bot_planner import InlinePlanner, ParallelPlanner  # noqa: E402
+
+
+def make_world(bots, width, height, seed):
+    rng = np.random.default_rng(seed)
+    count = bots + 1
+    x = rng.uniform(0, width, count)
+    y = rng.uniform(0, height, count)
+    alive = rng.random(count) > 0.1
+    return x, y, alive
+
+
+def time_planner(planner, world, params, ticks):
+    x, y, alive = world
+    planner.plan(x, y, alive, params)  # Warm up workers and shared memory
+    started = time.perf_counter()
+    for _ in range(ticks):
+        plan = planner.plan(x, y, alive, params)
+    return (time.perf_counter() - started) * 1000 / ticks, plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parallel bot planning scaling")
+    parser.add_argument('--bots', type=int, default=5000)
+    parser.add_argument('--ticks', type=int, default=20)
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--map-size', default='2400x1800')
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.map_size.lower().split('x'))
+    world = make_world(args.bots, width, height, seed=1)
+    params = (2, 50, 40, 0, 40, width, height)
+
+    baseline, expected = time_planner(InlinePlanner(), world, params, args.ticks)
+    print(f"{args.bots} bots, {os.cpu_count()} CPUs, {args.ticks} ticks per run")
+    print(f"  in-process  {baseline:8.2f} ms/tick")
+
+    mismatches = []
+    for workers in (int(value) for value in args.workers.split(',')):
+        planner = ParallelPlanner(workers)
+        try:
+            elapsed, plan = time_planner(planner, world, params, args.ticks)
+        finally:
+            planner.close()
+        if not all(np.array_equal(plan[name][1:], expected[name][1:]) for name in expected):
+            mismatches.append(workers)
+        speedup = baseline / elapsed
+        print(f"  {workers} worker{'s' if workers > 1 else ' '}   {elapsed:8.2f} ms/tick  "
+              f"speedup {speedup:5.2f}x  efficiency {speedup / workers:6.1%}")
+
+    if mismatches:
+        print(f"\nFAIL: plans differ from in-process with {mismatches} workers")
+        sys.exit(1)
+    print("\nOK: every worker count planned identical moves")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+import argparse
+import collections
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+# Renders fixed, seeded scenes offscreen and reports per-frame render time,
+# draw calls per frame, and a hash of each scene's pixels checked against
+# render_golden.json. A render optimization should make the times go down
+# and leave every hash alone.
+#
+#   python benchmarks/render_frames.py --frames 200
+#   python benchmarks/render_frames.py --update     # re-record the hashes
+#
+# Fonts and SDL's rasterizers can change pixels between pygame releases, so
+# the golden file records the pygame version it was made with.
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import pygame  # noqa: E402
+import battle_royale  # noqa: E402
+from quality import QUALITY_TIERS  # noqa: E402
+from storm import Storm  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'render_golden.json')
+
+DRAW_FUNCTIONS = ('rect', 'circle', 'line', 'lines', 'polygon', 'ellipse', 'arc')
+
+MENU_SCENES = ['start screen', 'weapon select', 'countdown', 'game over']
+# (name, ticks simulated before drawing, setup)
+MATCH_SCENES = [
+    ('match start', 0, None),
+    ('mid match', 600, None),
+    ('storm', 1260, None),
+    ('lowest quality', 600, 'lowest quality'),
+    ('overlay', 600, 'overlay'),
+]
+
+
+class CountingSurface(pygame.Surface):
+    # The frame target; counts blits and fills made directly onto it
+    def __init__(self, size, counts):
+        super().__init__(size)
+        self.counts = counts
+
+    def blit(self, *args, **kwargs):
+        self.counts['blit'] += 1
+        return super().blit(*args, **kwargs)
+
+    def fill(self, *args, **kwargs):
+        self.counts['fill'] += 1
+        return super().fill(*args, **kwargs)
+
+
+class CountingFont:
+    def __init__(self, font, counts):
+        self.font = font
+        self.counts = counts
+
+    def render(self, *args, **kwargs):
+        self.counts['font.render'] += 1
+        return self.font.render(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.font, name)
+
+
+def count_draw_calls(counts):
+    # Wraps pygame.draw so calls from every module are counted
+    for name in DRAW_FUNCTIONS:
+        function = getattr(pygame.draw, name)
+
+        def counted(*args, _function=function, _name='draw.' + name, **kwargs):
+            counts[_name] += 1
+            return _function(*args, **kwargs)
+        setattr(pygame.draw, name, counted)
+
+
+def timed(function, name, stage_times):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = function(*args, **kwargs)
+        stage_times[name].append((time.perf_counter() - started) * 1000)
+        return result
+    return wrapper
+
+
+def make_game(seed, surface, counts):
+    random.seed(seed)
+    game = battle_royale.Game(screen=surface)
+    # The default storm schedule draws its path from an unseeded RNG
+    game.storm = Storm(battle_royale.storm_schedule(battle_royale.MAP_WIDTH, battle_royale.MAP_HEIGHT,
+                                                    seed=seed),
+                       battle_royale.ZONE_DAMAGE_INTERVAL)
+    game.font = CountingFont(game.font, counts)
+    game.small_font = CountingFont(game.small_font, counts)
+    return game
+
+
+def menu_scene(game, name):
+    if name == 'start screen':
+        return game.draw_start_screen
+    if name == 'weapon select':
+        game.selected_weapon_index = 1
+        return game.draw_weapon_select_screen
+    if name == 'countdown':
+        def draw():
+            game.countdown_start = pygame.time.get_ticks()
+            game.draw_countdown()
+        return draw
+    game.game_over = True
+    game.score = 3
+    return game.draw_game_over_screen
+
+
+def match_scene(game, ticks, setup, stage_times):
+    no_input = collections.defaultdict(bool)
+    game.game_started = True
+    for _ in range(ticks):
+        game.step(no_input)
+    if setup == 'lowest quality':
+        game.quality.set_tier(len(QUALITY_TIERS) - 1)
+    elif setup == 'overlay':
+        game.show_overlay = True
+    view = game.render_view()
+    for name in ('draw_game_objects', 'draw_hud', 'draw_minimap'):
+        setattr(game, name, timed(getattr(game, name), name, stage_times))
+    return lambda: game.draw_view(game.screen, view)
+
+
+def frame_hash(surface):
+    return hashlib.sha256(pygame.image.tobytes(surface, 'RGB')).hexdigest()[:16]
+
+
+def run_scene(name, frames, seed, counts, ticks=0, setup=None):
+    surface = CountingSurface((battle_royale.WINDOW_WIDTH, battle_royale.WINDOW_HEIGHT), counts)
+    game = make_game(seed, surface, counts)
+    stage_times = collections.defaultdict(list)
+    if name in MENU_SCENES:
+        draw = menu_scene(game, name)
+    else:
+        draw = match_scene(game, ticks, setup, stage_times)
+
+    draw()  # Warm up caches and the minimap before timing
+    expected = frame_hash(surface)
+    counts.clear()
+    stage_times.clear()
+    times = []
+    stable = True
+    for _ in range(frames):
+        started = time.perf_counter()
+        draw()
+        times.append((time.perf_counter() - started) * 1000)
+    if frame_hash(surface) != expected:
+        stable = False
+    per_frame = {call: count / frames for call, count in sorted(counts.items())}
+    game.planner.close()
+    return expected, stable, times, stage_times, per_frame
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def describe(times):
+    return (f"median {statistics.median(times):6.3f}  p95 {percentile(times, 0.95):6.3f}  "
+            f"max {max(times):6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time offscreen rendering and check golden frame hashes")
+    parser.add_argument('--frames', type=int, default=100, help='frames timed per scene')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scene', action='append', help='only run these scenes')
+    parser.add_argument('--update', action='store_true', help='rewrite the golden hashes')
+    args = parser.parse_args()
+
+    pygame.display.init()
+    counts = collections.Counter()
+    count_draw_calls(counts)
+
+    scenes = [(name, 0, None) for name in MENU_SCENES] + MATCH_SCENES
+    if args.scene:
+        scenes = [scene for scene in scenes if scene[0] in args.scene]
+
+    golden = {}
+    if os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH) as f:
+            golden = json.load(f)
+    golden_hashes = golden.get('hashes', {})
+    if golden and golden.get('seed') != args.seed:
+        # Scenes from another seed are different pictures
+        print(f"note: golden hashes are for seed {golden.get('seed')}, not checking")
+        golden_hashes = {}
+    if golden and golden.get('pygame') != pygame.version.ver:
+        print(f"note: golden hashes were recorded with pygame {golden.get('pygame')}, "
+              f"running {pygame.version.ver}")
+
+    print(f"{args.frames} frames per scene, seed {args.seed}, "
+          f"{battle_royale.WINDOW_WIDTH}x{battle_royale.WINDOW_HEIGHT}")
+    hashes = {}
+    failures = []
+    for name, ticks, setup in scenes:
+        digest, stable, times, stage_times, per_frame = run_scene(name, args.frames, args.seed,
+                                                                  counts, ticks, setup)
+        hashes[name] = digest
+        if not stable:
+            failures.append(f"{name}: frames differ between repeated draws")
+        elif not args.update and golden_hashes.get(name, digest) != digest:
+            failures.append(f"{name}: hash {digest} != golden {golden_hashes[name]}")
+        status = 'new' if name not in golden_hashes else (
+            'ok' if golden_hashes[name] == digest else 'CHANGED')
+
+        print(f"\n{name}  [{digest} {status}]")
+        print(f"  frame                {describe(times)}")
+        for stage, values in stage_times.items():
+            print(f"  {stage:20} {describe(values)}")
+        print("  calls/frame  " + ", ".join(f"{call} {count:g}" for call, count in per_frame.items()))
+
+    if args.update:
+        golden_hashes.update(hashes)
+        with open(GOLDEN_PATH, 'w') as f:
+            json.dump({'pygame': pygame.version.ver, 'seed': args.seed, 'hashes': golden_hashes},
+                      f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nWrote {len(hashes)} hashes to {os.path.relpath(GOLDEN_PATH, ROOT)}")
+        return
+    if failures:
+        print("\nFAIL:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nOK: every scene matches its golden hash")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import collections
+import gc
+import os
+import random
+import statistics
+import sys
+import time
+
+# Times saving and loading a snapshot of a crowded match, the cost paid per
+# tick by the rewind buffer and per frame by replay rendering.
+#
+# Bots are plain objects, so both directions still read or write every bot
+# an attribute at a time and grow linearly with the bot count: around
+# 15-25 ms each way at 5000 bots on a slow machine, with wide swings from
+# run to run. The timings are only reported, per snapshot and per entity;
+# pass --max-ms to fail when a median goes over it.
+#
+#   python benchmarks/snapshot_timing.py --bots 5000
+#   python benchmarks/snapshot_timing.py --bots 1000 --max-ms 10
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import battle_royale  # noqa: E402
+from snapshot import load_snapshot, save_snapshot  # noqa: E402
+
+
+def timed(function, repeats):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time snapshot save and load in a crowded match")
+    parser.add_argument('--bots', type=int, default=5000)
+    parser.add_argument('--ticks', type=int, default=60, help='ticks to play before timing')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-ms', type=float, default=None,
+                        help='fail when the median save or keep_world load takes longer')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    battle_royale.NUM_BOTS = args.bots
+    game = battle_royale.Game()
+    game.game_started = True
+    no_input = collections.defaultdict(bool)
+    try:
+        for _ in range(args.ticks):
+            game.step(no_input)
+        data = save_snapshot(game, spawner=False)
+        # As under GcManager, the match's objects are frozen so collections
+        # don't walk them
+        gc.collect()
+        gc.freeze()
+        results = {
+            'save': timed(lambda: save_snapshot(game, spawner=False), args.repeats),
+            'load keep_world': timed(lambda: load_snapshot(game, data, keep_world=True),
+                                     args.repeats),
+            'load full': timed(lambda: load_snapshot(game, data), max(1, args.repeats // 4)),
+        }
+    finally:
+        gc.unfreeze()
+        game.planner.close()
+
+    print(f"{args.bots} bots, {len(data) / 1024:.0f} KB snapshot")
+    for name, (median, worst) in results.items():
+        print(f"  {name:16s} median {median:7.2f}  max {worst:7.2f} ms"
+              f"  ({median * 1000 / (args.bots + 1):.2f} us per entity)")
+    if args.max_ms is None:
+        return
+    slow = [name for name in ('save', 'load keep_world') if results[name][0] > args.max_ms]
+    if slow:
+        print(f"\nFAIL: {', '.join(slow)} over {args.max_ms:g} ms")
+        sys.exit(1)
+    print(f"\nOK: save and keep_world load under {args.max_ms:g} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+import math
+from multiprocessing import Pool, shared_memory
+import numpy as np
+
+# Bot decisions for one tick are planned from a snapshot of every entity's
+# position taken at the start of the tick: each bot picks the nearest living
+# entity as its target and steps towards it unless that would bring it too
+# close to someone. Entity indexes are [player] + bots, so bots are 1..n-1.
+#
+# InlinePlanner runs the plan in this process. ParallelPlanner publishes the
+# snapshot through shared memory and has a pool of worker processes plan
+# disjoint ranges of bots, writing their results into shared output arrays.
+# Both produce identical results.
+
+PLAN_BLOCK = 128          # Bots per vectorized distance block
+PARTITIONS_PER_WORKER = 4
+
+INPUT_FIELDS = {'x': np.float64, 'y': np.float64, 'alive': np.bool_, 'planned': np.bool_}
+OUTPUT_FIELDS = {'target': np.int64, 'distance': np.float64,
+                 'new_x': np.float64, 'new_y': np.float64}
+
+
+def plan_bots(x, y, alive, planned, start, stop, params, out):
+    # Fills out['target'|'distance'|'new_x'|'new_y'][start:stop] for the bots
+    # flagged in planned. target is -1 when a bot is dead, was not planned
+    # or has no one left to chase. Row 0, the player, is never planned.
+    speed, stop_distance, separation, left, top, right, bottom = params
+    others = np.flatnonzero(alive[:len(x)])
+    other_x = x[others]
+    other_y = y[others]
+    out['target'][start:stop] = -1
+    out['distance'][start:stop] = math.inf
+    out['new_x'][start:stop] = x[start:stop]
+    out['new_y'][start:stop] = y[start:stop]
+    if len(others) < 2:
+        return
+
+    # Only living, planned bots are computed; every living entity is a
+    # possible target or obstacle
+    active = np.flatnonzero(alive[start:stop] & planned[start:stop]) + start
+    for lo in range(0, len(active), PLAN_BLOCK):
+        rows = active[lo:lo + PLAN_BLOCK]
+        block = np.arange(len(rows))
+        bx = x[rows]
+        by = y[rows]
+        # Column of each bot's own entry in others
+        self_column = np.searchsorted(others, rows)
+
+        d2 = (other_x[None, :] - bx[:, None]) ** 2 + (other_y[None, :] - by[:, None]) ** 2
+        d2[block, self_column] = math.inf
+        nearest = d2.argmin(axis=1)
+        distance = np.sqrt(d2[block, nearest])
+        target = others[nearest]
+
+        # Step towards the target, then cancel the step if it lands within
+        # separation of any other living entity
+        moving = distance > stop_distance
+        scale = np.where(moving, speed / np.where(distance > 0, distance, 1), 0)
+        step_x = bx + (x[target] - bx) * scale
+        step_y = by + (y[target] - by) * scale
+        c2 = (other_x[None, :] - step_x[:, None]) ** 2 + (other_y[None, :] - step_y[:, None]) ** 2
+        c2[block, self_column] = math.inf
+        moving &= ~(c2 < separation * separation).any(axis=1)
+
+        out['target'][rows] = target
+        out['distance'][rows] = distance
+        out['new_x'][rows] = np.where(moving, np.clip(step_x, left, right), bx)
+        out['new_y'][rows] = np.where(moving, np.clip(step_y, top, bottom), by)
+
+
+class InlinePlanner:
+    workers = 0
+
+    def plan(self, x, y, alive, params, planned=None):
+        if planned is None:
+            planned = alive
+        out = {name: np.empty(len(x), dtype=dtype) for name, dtype in OUTPUT_FIELDS.items()}
+        plan_bots(x, y, alive, planned, 1, len(x), params, out)
+        return out
+
+    def close(self):
+        pass
+
+
+class SharedArrays:
+    # One shared memory block per field, each holding `capacity` items
+    def __init__(self, fields, capacity):
+        self.capacity = capacity
+        self.blocks = {}
+        self.arrays = {}
+        for name, dtype in fields.items():
+            block = shared_memory.SharedMemory(create=True,
+                                               size=max(1, capacity * np.dtype(dtype).itemsize))
+            self.blocks[name] = block
+            self.arrays[name] = np.ndarray(capacity, dtype=dtype, buffer=block.buf)
+
+    def spec(self):
+        return {name: (block.name, self.arrays[name].dtype.str)
+                for name, block in self.blocks.items()}
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+# Shared memory blocks a worker process has attached to, by block name
+_attached = {}
+
+
+def attach(spec, capacity):
+    arrays = {}
+    for name, (block_name, dtype) in spec.items():
+        if block_name not in _attached:
+            _attached[block_name] = shared_memory.SharedMemory(name=block_name)
+        arrays[name] = np.ndarray(capacity, dtype=dtype, buffer=_attached[block_name].buf)
+    return arrays
+
+
+def detach_stale(names):
+    for block_name in list(_attached):
+        if block_name not in names:
+            _attached.pop(block_name).close()
+
+
+def plan_partition(job):
+    inputs, outputs, capacity, count, start, stop, params = job
+    detach_stale({name for name, _ in inputs.values()} | {name for name, _ in outputs.values()})
+    world = attach(inputs, capacity)
+    out = attach(outputs, capacity)
+    plan_bots(world['x'][:count], world['y'][:count], world['alive'][:count],
+              world['planned'][:count], start, stop, params, out)
+    return stop - start
+
+
+class ParallelPlanner:
+    def __init__(self, workers, capacity=1024):
+        self.workers = workers
+        self.inputs = None
+        self.outputs = None
+        self.reserve(capacity)
+        try:
+            self.pool = Pool(workers)
+        except Exception:
+            self.inputs.close()
+            self.outputs.close()
+            raise
+
+    def reserve(self, capacity):
+        if self.inputs is not None and self.inputs.capacity >= capacity:
+            return
+        if self.inputs is not None:
+            self.inputs.close()
+            self.outputs.close()
+        self.inputs = SharedArrays(INPUT_FIELDS, capacity)
+        self.outputs = SharedArrays(OUTPUT_FIELDS, capacity)
+
+    def plan(self, x, y, alive, params, planned=None):
+        if planned is None:
+            planned = alive
+        count = len(x)
+        if count > self.inputs.capacity:
+            self.reserve(max(count, self.inputs.capacity * 2))
+        world = self.inputs.arrays
+        world['x'][:count] = x
+        world['y'][:count] = y
+        world['alive'][:count] = alive
+        world['planned'][:count] = planned
+
+        # Partitions outnumber workers so one slow range doesn't stall the tick
+        bounds = np.linspace(1, count, self.workers * PARTITIONS_PER_WORKER + 1).astype(int)
+        inputs = self.inputs.spec()
+        outputs = self.outputs.spec()
+        jobs = [(inputs, outputs, self.inputs.capacity, count, int(lo), int(hi), params)
+                for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+        self.pool.map(plan_partition, jobs)
+        return {name: array[:count].copy() for name, array in self.outputs.arrays.items()}
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.inputs.close()
+        self.outputs.close()
+
+
+def make_planner(workers):
+    # Falls back to planning in-process when workers is 0 or the platform
+    # can't provide a process pool or shared memory
+    if workers <= 0:
+        return InlinePlanner()
+    try:
+        return ParallelPlanner(workers)
+    except (OSError, ImportError, ValueError) as error:
+        print(f"Parallel AI unavailable ({error}); planning bots in-process")
+        return InlinePlanner()
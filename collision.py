@@ -0,0 +1,68 @@
+import numpy as np
+
+# Largest bullets x targets block evaluated at once, to bound temporary memory
+MAX_PAIRS_PER_BLOCK = 1 << 22
+
+
+def swept_circle_times(x0, y0, x1, y1, cx, cy, radius):
+    # Time of first contact (0..1 along each segment) between every segment
+    # and every circle, or inf where the segment misses. Shapes broadcast as
+    # (bullets, 1) against (targets,).
+    dx = x1 - x0
+    dy = y1 - y0
+    fx = x0 - cx
+    fy = y0 - cy
+    a = dx * dx + dy * dy
+    b = 2 * (fx * dx + fy * dy)
+    c = fx * fx + fy * fy - radius * radius
+    disc = b * b - 4 * a * c
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (-b - np.sqrt(np.maximum(disc, 0))) / (2 * a)
+    hit = (disc >= 0) & (a > 0) & (t >= 0) & (t <= 1)
+    t = np.where(hit, t, np.inf)
+
+    # Segments that start inside a circle hit it immediately
+    return np.where(c < 0, 0.0, t)
+
+
+def earliest_hits(x0, y0, x1, y1, cx, cy, radius, alive, owners):
+    # For every bullet return the earliest hit time and the index of the
+    # target hit (-1 for a miss). Bullets never hit dead targets or the
+    # target that fired them.
+    x0 = np.asarray(x0, dtype=np.float64)
+    y0 = np.asarray(y0, dtype=np.float64)
+    x1 = np.asarray(x1, dtype=np.float64)
+    y1 = np.asarray(y1, dtype=np.float64)
+    cx = np.asarray(cx, dtype=np.float64)
+    cy = np.asarray(cy, dtype=np.float64)
+    radius = np.asarray(radius, dtype=np.float64)
+    alive = np.asarray(alive, dtype=bool)
+    owners = np.asarray(owners, dtype=np.int64)
+
+    count = len(x0)
+    hit_t = np.full(count, np.inf)
+    hit_target = np.full(count, -1, dtype=np.int64)
+    if count == 0 or len(cx) == 0 or not alive.any():
+        return hit_t, hit_target
+
+    # Only living targets take part in the sweep
+    candidates = np.flatnonzero(alive)
+    cx = cx[candidates]
+    cy = cy[candidates]
+    radius = radius[candidates]
+
+    block = max(1, MAX_PAIRS_PER_BLOCK // len(candidates))
+    for start in range(0, count, block):
+        end = min(count, start + block)
+        times = swept_circle_times(x0[start:end, None], y0[start:end, None],
+                                   x1[start:end, None], y1[start:end, None],
+                                   cx, cy, radius)
+        times[owners[start:end, None] == candidates[None, :]] = np.inf
+        first = np.argmin(times, axis=1)
+        first_t = times[np.arange(end - start), first]
+        hit = np.isfinite(first_t)
+        hit_t[start:end] = first_t
+        hit_target[start:end] = np.where(hit, candidates[first], -1)
+
+    return hit_t, hit_target
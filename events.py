@@ -0,0 +1,87 @@
+import numpy as np
+from telemetry import HIT, KILL, SHOT, ZONE_DAMAGE
+
+# Gameplay events raised by the simulation during a tick. Systems push one
+# fixed-width record per event and carry on; side effects (damage numbers,
+# particles, score, telemetry) subscribe to the kinds they care about and
+# get every matching record of the tick as one array when dispatch() runs.
+# The arrays handed to subscribers are views into the bus and are only
+# valid during the call; subscribers must not push events themselves.
+#
+# actor/target are entity indexes in [player] + bots (-1 for none), x/y is
+# where the event happened and src_x/src_y where its actor stood. value is
+# the damage dealt. Kind codes are shared with telemetry.
+
+EVENT_KINDS = (SHOT, HIT, KILL, ZONE_DAMAGE)
+
+GAME_EVENT_DTYPE = np.dtype([
+    ('kind', np.uint8),
+    ('weapon', np.int16),
+    ('actor', np.int32),
+    ('target', np.int32),
+    ('x', np.float64),
+    ('y', np.float64),
+    ('src_x', np.float64),
+    ('src_y', np.float64),
+    ('value', np.float64),
+])
+
+
+class EventBus:
+    def __init__(self, capacity=256):
+        self.events = np.zeros(capacity, dtype=GAME_EVENT_DTYPE)
+        self.count = 0
+        self.subscribers = []   # (kinds or None for every kind, callback)
+        self.dispatched = 0
+
+    def subscribe(self, callback, kinds=None):
+        self.subscribers.append((tuple(kinds) if kinds is not None else None, callback))
+
+    def unsubscribe(self, callback):
+        self.subscribers = [entry for entry in self.subscribers if entry[1] != callback]
+
+    def reserve(self, added):
+        if self.count + added > len(self.events):
+            events = np.zeros(max(len(self.events) * 2, self.count + added), dtype=GAME_EVENT_DTYPE)
+            events[:self.count] = self.events[:self.count]
+            self.events = events
+
+    def push(self, kind, actor, target, x, y, src_x, src_y, value=0, weapon=0):
+        self.reserve(1)
+        self.events[self.count] = (kind, weapon, actor, target, x, y, src_x, src_y, value)
+        self.count += 1
+
+    def push_many(self, kind, actor, target, x, y, src_x, src_y, value=0, weapon=0):
+        # Vectorized push of many events of one kind; arguments broadcast
+        columns = (('kind', kind), ('weapon', weapon), ('actor', actor), ('target', target),
+                   ('x', x), ('y', y), ('src_x', src_x), ('src_y', src_y), ('value', value))
+        added = np.broadcast(*(np.atleast_1d(values) for _, values in columns)).size
+        if added == 0:
+            return
+        self.reserve(added)
+        end = self.count + added
+        for name, values in columns:
+            self.events[name][self.count:end] = values
+        self.count = end
+
+    def clear(self):
+        self.count = 0
+
+    def dispatch(self):
+        # Hands the tick's events to every subscriber in subscription order,
+        # then empties the bus
+        if self.count == 0:
+            return
+        events = self.events[:self.count]
+        kinds = events['kind']
+        for wanted, callback in self.subscribers:
+            if wanted is None:
+                callback(events)
+                continue
+            selected = np.isin(kinds, wanted)
+            if selected.all():
+                callback(events)
+            elif selected.any():
+                callback(events[selected])
+        self.dispatched += self.count
+        self.count = 0
@@ -0,0 +1,274 @@
+import math
+import numpy as np
+
+# Navigation toward the safe zone, shared by every bot. An integration
+# field over a coarse grid holds each cell's path cost to the goal circle,
+# going around blocked terrain; a bot steers toward whichever of the eight
+# neighbours of its cell is cheapest, so the per-bot cost is one lookup
+# however many bots there are.
+#
+# The grid only covers a window around the zone, at most MAX_CELLS_PER_SIDE
+# cells a side, with cells coarsened as needed, so its size doesn't depend
+# on the map's. Bots outside the window steer straight at the goal.
+#
+# Costs are built with a bucketed Dijkstra wavefront (steps cost 2 straight
+# and 3 diagonally), each bucket expanded as one batch of array operations.
+# advance() does at most CELL_UPDATES_PER_TICK terrain samples and neighbour
+# updates per call, splitting buckets where needed, while bots keep following
+# the previous field.
+#
+# When the goal shrinks inside the previous one, the previous field is
+# reused: only the previous goal region is searched from the new goal, and
+# every cell outside it keeps its old cost, raised past the region's
+# highest. Bots out there still head for the old goal region and pick up
+# the new costs once inside it.
+
+CELL_UPDATES_PER_TICK = 20000
+MAX_CELLS_PER_SIDE = 256
+STRAIGHT = 2
+DIAGONAL = 3
+UNREACHED = 1 << 30
+
+
+def neighbour_offsets(width):
+    # (flat index offset, step cost, unit x, unit y), straight steps first
+    offsets = []
+    for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)):
+        length = math.hypot(dr, dc)
+        offsets.append((dr * width + dc, DIAGONAL if dr and dc else STRAIGHT,
+                        dc / length, dr / length))
+    return offsets
+
+
+class FlowWindow:
+    # The grid's placement over the map, padded by one closed cell on every
+    # side so neighbour lookups need no bounds checks
+    def __init__(self, left, top, right, bottom, min_cell_size):
+        extent = max(right - left, bottom - top, 1)
+        self.cell_size = max(min_cell_size,
+                             min_cell_size * math.ceil(extent / MAX_CELLS_PER_SIDE / min_cell_size))
+        self.left = left
+        self.top = top
+        self.cols = max(1, int(math.ceil((right - left) / self.cell_size)))
+        self.rows = max(1, int(math.ceil((bottom - top) / self.cell_size)))
+        self.width = self.cols + 2
+        self.size = self.width * (self.rows + 2)
+        self.offsets = neighbour_offsets(self.width)
+
+    def cell_of(self, x, y):
+        # Flat cell index of each point, -1 outside the window
+        col = np.floor((np.asarray(x, dtype=float) - self.left) / self.cell_size).astype(np.int64)
+        row = np.floor((np.asarray(y, dtype=float) - self.top) / self.cell_size).astype(np.int64)
+        inside = (col >= 0) & (col < self.cols) & (row >= 0) & (row < self.rows)
+        return np.where(inside, (row + 1) * self.width + col + 1, -1)
+
+    def centers(self):
+        flat = np.arange(self.size)
+        return (self.left + (flat % self.width - 0.5) * self.cell_size,
+                self.top + (flat // self.width - 0.5) * self.cell_size)
+
+    def open_rows(self, line_of_sight, start, stop):
+        # Which cells of grid rows start..stop are open: a cell is closed when
+        # at least half of four points spread over it are blocked, and the
+        # padding always is
+        flat = np.arange(start * self.width, stop * self.width)
+        x = self.left + (flat % self.width - 0.5) * self.cell_size
+        y = self.top + (flat // self.width - 0.5) * self.cell_size
+        quarter = self.cell_size / 4
+        blocked = sum(line_of_sight.blocked_at(x + dx, y + dy).astype(np.int8)
+                      for dx in (-quarter, quarter) for dy in (-quarter, quarter))
+        rows = (blocked < 2).reshape(stop - start, self.width)
+        rows[:, 0] = rows[:, -1] = False
+        if start == 0:
+            rows[0] = False
+        if stop == self.rows + 2:
+            rows[-1] = False
+        return rows.ravel()
+
+    def overlaps(self, left, top, right, bottom):
+        return (left < self.left + self.cols * self.cell_size and self.left < right
+                and top < self.top + self.rows * self.cell_size and self.top < bottom)
+
+    def contains(self, other):
+        return (other.left >= self.left and other.top >= self.top
+                and other.left + other.cols * other.cell_size <= self.left + self.cols * self.cell_size
+                and other.top + other.rows * other.cell_size <= self.top + self.rows * self.cell_size)
+
+
+class FlowBuild:
+    # A build part way through: first the window's terrain is sampled a band
+    # of rows at a time (skipped when refining, which keeps the old terrain),
+    # then the wavefront is expanded
+    def __init__(self, goal, window, line_of_sight, passable=None, previous=None):
+        self.goal = goal
+        self.window = window
+        self.line_of_sight = line_of_sight
+        self.passable = passable
+        self.sampled_rows = window.rows + 2 if passable is not None else 0
+        if passable is None:
+            self.passable = np.zeros(window.size, dtype=bool)
+        self.previous = previous    # Cost of the field being refined, if any
+        self.cost = None
+        self.buckets = None
+        self.current = 0
+        self.pending = None
+        self.updates = 0
+
+
+class FlowField:
+    def __init__(self, cell_size=40):
+        self.cell_size = cell_size
+        self.goal = None           # (center x, center y, radius) of the active field
+        self.window = None
+        self.passable = None
+        self.cost = None
+        self.build = None
+        self.builds = 0
+
+    @property
+    def building(self):
+        return self.build is not None
+
+    def request(self, center, radius, bounds, line_of_sight):
+        # Starts a build toward the circle unless the active field or the one
+        # being built already leads there. bounds is (left, top, right,
+        # bottom) of the area bots need steering in.
+        goal = (float(center[0]), float(center[1]), float(radius))
+        if goal == self.goal or (self.build and goal == self.build.goal):
+            return False
+        window = FlowWindow(*bounds, self.cell_size)
+        if self.reusable(goal, window):
+            region = self.passable & (self.cost == 0)
+            self.build = FlowBuild(goal, self.window, line_of_sight, region, self.cost)
+        else:
+            self.build = FlowBuild(goal, window, line_of_sight)
+        return True
+
+    def refresh(self, line_of_sight):
+        # Rebuilds toward the current goal from scratch, e.g. after new
+        # terrain was loaded; the current field stays in use until it's done
+        if self.goal is None or self.build is not None:
+            return False
+        self.build = FlowBuild(self.goal, self.window, line_of_sight)
+        return True
+
+    def reusable(self, goal, window):
+        # The old field can be refined when the new goal lies inside the old
+        # one and the old window still fits the zone without being much
+        # coarser than a new one would be
+        if self.cost is None:
+            return False
+        old_x, old_y, old_radius = self.goal
+        inside = math.hypot(goal[0] - old_x, goal[1] - old_y) + goal[2] <= old_radius
+        return (inside and self.window.contains(window)
+                and self.window.cell_size <= window.cell_size * 2)
+
+    def seed(self, build):
+        goal = build.goal
+        window = build.window
+        x, y = window.centers()
+        distance = (x - goal[0]) ** 2 + (y - goal[1]) ** 2
+        seeds = np.flatnonzero(build.passable & (distance <= goal[2] ** 2))
+        if not len(seeds):
+            # A circle smaller than a cell still needs a cell to aim at
+            seeds = np.array([int(np.argmin(np.where(build.passable, distance, np.inf)))])
+        build.cost = np.full(window.size, UNREACHED, dtype=np.int32)
+        build.cost[seeds] = 0
+        build.buckets = {0: [seeds]}
+        build.pending = seeds[:0]
+
+    def advance(self, budget=CELL_UPDATES_PER_TICK):
+        # Does this tick's share of the build; returns True when it finished
+        build = self.build
+        if build is None:
+            return False
+        window = build.window
+        spent = 0
+        while build.sampled_rows < window.rows + 2 and spent < budget:
+            # Four samples per cell
+            start = build.sampled_rows
+            stop = min(window.rows + 2, start + max(1, (budget - spent) // (4 * window.width)))
+            build.passable[start * window.width:stop * window.width] = \
+                window.open_rows(build.line_of_sight, start, stop)
+            build.sampled_rows = stop
+            spent += 4 * window.width * (stop - start)
+        if build.sampled_rows < window.rows + 2:
+            return False
+        if build.cost is None:
+            self.seed(build)
+        cost = build.cost
+        while spent < budget:
+            if not len(build.pending):
+                if not build.buckets:
+                    self.finish(build)
+                    return True
+                build.current = min(build.buckets)
+                cells = np.unique(np.concatenate(build.buckets.pop(build.current)))
+                # Cells reached more cheaply since they were queued are done
+                build.pending = cells[cost[cells] == build.current]
+                continue
+            take = max(1, (budget - spent) // len(window.offsets))
+            cells = build.pending[:take]
+            build.pending = build.pending[take:]
+            for offset, step, _, _ in window.offsets:
+                reached = build.current + step
+                neighbours = cells + offset
+                better = build.passable[neighbours] & (cost[neighbours] > reached)
+                neighbours = neighbours[better]
+                if len(neighbours):
+                    cost[neighbours] = reached
+                    build.buckets.setdefault(reached, []).append(neighbours)
+            spent += len(cells) * len(window.offsets)
+        build.updates += spent
+        return False
+
+    def finish(self, build):
+        cost = build.cost
+        if build.previous is not None:
+            # Outside the refined region the old costs still lead into it;
+            # lifted above everything inside so they keep draining inward
+            region = cost < UNREACHED
+            lift = int(cost[region].max()) + STRAIGHT
+            cost = np.where(region, cost,
+                            np.minimum(build.previous.astype(np.int64) + lift, UNREACHED)).astype(np.int32)
+        else:
+            self.passable = build.passable
+        self.goal = build.goal
+        self.window = build.window
+        self.cost = cost
+        self.build = None
+        self.builds += 1
+
+    def steer(self, x, y):
+        # Unit steering vectors for positions x, y: toward the cheapest
+        # neighbouring cell, or straight at the goal center at the goal,
+        # outside the window and where the field doesn't reach
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        step_x = np.zeros_like(x)
+        step_y = np.zeros_like(y)
+        if self.goal is None:
+            return step_x, step_y
+        window = self.window
+        cell = window.cell_of(x, y)
+        inside = np.flatnonzero(cell >= 0)
+        lost = np.ones(len(x), dtype=bool)
+        if len(inside):
+            here = cell[inside]
+            offsets = np.array([offset for offset, _, _, _ in window.offsets])
+            around = self.cost[here[:, None] + offsets[None, :]]
+            best = np.argmin(around, axis=1)
+            downhill = around[np.arange(len(here)), best] < self.cost[here]
+            units_x = np.array([unit_x for _, _, unit_x, _ in window.offsets])
+            units_y = np.array([unit_y for _, _, _, unit_y in window.offsets])
+            step_x[inside] = np.where(downhill, units_x[best], 0)
+            step_y[inside] = np.where(downhill, units_y[best], 0)
+            lost[inside[downhill]] = False
+        if lost.any():
+            dx = self.goal[0] - x[lost]
+            dy = self.goal[1] - y[lost]
+            length = np.hypot(dx, dy)
+            length[length == 0] = 1
+            step_x[lost] = dx / length
+            step_y[lost] = dy / length
+        return step_x, step_y
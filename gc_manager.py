@@ -0,0 +1,121 @@
+import gc
+import time
+
+# Keeps the cyclic garbage collector from pausing in the middle of a match,
+# and times every collection so the pauses show up on the overlay.
+#
+# When managed, a new match's state is collected once and frozen with
+# gc.freeze(), so full collections during the match only walk what the
+# match itself allocated since. Automatic gen-2 collections are suspended
+# while a match runs; they run instead at safe points: menus such as the
+# countdown and game over screen, and match frames that finished with
+# enough headroom left in their budget for the last full collection's
+# pause. Past FORCED_FULL_AFTER gen-1 collections a full collection runs
+# anyway, so garbage cycles can't pile up without bound.
+#
+# Unmanaged, the collector runs as usual and only the pauses are recorded.
+
+FULL_COLLECT_AFTER = 10   # Gen-1 collections before a full one is wanted (CPython's default)
+FORCED_FULL_AFTER = 200
+SUSPENDED_THRESHOLD = 1 << 30
+
+
+class GcManager:
+    def __init__(self, managed=True, headroom=0.5):
+        self.managed = managed
+        self.headroom = headroom    # Fraction of the budget a frame must leave free for a collection
+        self.default_threshold = gc.get_threshold()
+        self.started = None
+        self.explicit = False
+        # Automatic collections are the ones that could hit mid-frame
+        self.collections = [0, 0, 0]
+        self.explicit_collections = 0
+        self.worst_pause_ms = 0
+        self.last_pause_ms = 0
+        self.last_full_ms = 0
+        self.frame_pause_ms = 0
+        self.last_frame_pause_ms = 0
+        self.in_match = False
+        gc.callbacks.append(self.on_collect)
+
+    def on_collect(self, phase, info):
+        if phase == 'start':
+            self.started = time.perf_counter()
+            return
+        if self.started is None:
+            return
+        pause = (time.perf_counter() - self.started) * 1000
+        self.started = None
+        if info['generation'] == 2:
+            self.last_full_ms = pause
+        if self.explicit:
+            return
+        self.collections[info['generation']] += 1
+        self.last_pause_ms = pause
+        self.frame_pause_ms += pause
+        self.worst_pause_ms = max(self.worst_pause_ms, pause)
+
+    def collect(self):
+        self.explicit = True
+        try:
+            gc.collect()
+        finally:
+            self.explicit = False
+        self.explicit_collections += 1
+
+    def match_started(self):
+        # Pause figures are per match
+        self.collections = [0, 0, 0]
+        self.worst_pause_ms = 0
+        if not self.managed:
+            return
+        # The new match's state lives until the match ends, so it is moved
+        # out of the collector's way. Last match's frozen objects are thawed
+        # first so its garbage cycles can go.
+        gc.unfreeze()
+        self.collect()
+        gc.freeze()
+        # That collection walked everything; the match's own will be quicker
+        self.last_full_ms = 0
+        threshold0, threshold1, _ = self.default_threshold
+        gc.set_threshold(threshold0, threshold1, SUSPENDED_THRESHOLD)
+        self.in_match = True
+
+    def match_ended(self):
+        if not self.managed or not self.in_match:
+            return
+        gc.set_threshold(*self.default_threshold)
+        self.in_match = False
+
+    def safe_point(self):
+        # Called while nothing time critical is on screen; collects whatever
+        # has built up since the last collection
+        if self.managed and gc.get_count() != (0, 0, 0):
+            self.collect()
+
+    def end_frame(self, frame_ms, budget_ms):
+        # Call after each match frame. Runs the suspended full collection
+        # when this frame left room for it.
+        self.last_frame_pause_ms = self.frame_pause_ms
+        self.frame_pause_ms = 0
+        if not self.managed or not self.in_match:
+            return
+        pending = gc.get_count()[2]
+        if pending >= FORCED_FULL_AFTER or (
+                pending >= FULL_COLLECT_AFTER
+                and frame_ms + self.last_full_ms <= budget_ms * (1 - self.headroom)):
+            self.collect()
+
+    def describe(self):
+        mode = 'managed' if self.managed else 'unmanaged'
+        return (f"GC ({mode}): last frame {self.last_frame_pause_ms:.2f} ms, "
+                f"worst {self.worst_pause_ms:.2f} ms, last full {self.last_full_ms:.2f} ms; "
+                f"gen0/1/2 {self.collections[0]}/{self.collections[1]}/{self.collections[2]}, "
+                f"{self.explicit_collections} at safe points, {gc.get_freeze_count()} frozen")
+
+    def close(self):
+        if self.on_collect in gc.callbacks:
+            gc.callbacks.remove(self.on_collect)
+        if self.managed:
+            gc.set_threshold(*self.default_threshold)
+            gc.unfreeze()
@@ -0,0 +1,229 @@
+import math
+import numpy as np
+
+# Terrain types that stop bullets and block bot vision
+BLOCKING_TERRAIN = ('tree', 'rock')
+
+# Upper bound on cached (cell, cell) results before the cache is reset
+MAX_CACHE_ENTRIES = 200000
+
+
+def blocking_circle(patch):
+    # Trees only block with their canopy, which is drawn above the trunk
+    if patch.type == 'tree':
+        return patch.x, patch.y - patch.size / 4, patch.size / 2
+    return patch.x, patch.y, patch.size
+
+
+class LineOfSight:
+    # Blocking cells are kept in tiles the size of a world chunk, one per
+    # loaded chunk, so memory follows the loaded terrain rather than the
+    # map's area. Tiles live in one pooled array and a small grid maps each
+    # tile position to its slot in the pool (-1 when not loaded), so cell
+    # lookups stay vectorized. Cells of tiles that aren't loaded are open.
+    def __init__(self, width, height, cell_size=20, tile_size=600):
+        self.cell_size = cell_size
+        self.cols = int(math.ceil(width / cell_size)) + 1
+        self.rows = int(math.ceil(height / cell_size)) + 1
+        self.tile_cells = tile_size // cell_size
+        self.slots = np.full((int(math.ceil(self.rows / self.tile_cells)),
+                              int(math.ceil(self.cols / self.tile_cells))), -1, dtype=np.int32)
+        self.pool = np.zeros((0, self.tile_cells, self.tile_cells), dtype=bool)
+        self.free = []
+        self.cache = {}
+        self.version = 0      # Bumped whenever blocking changes
+        self.changed = set()  # Tile keys changed since the owner last cleared it
+
+    def invalidate(self):
+        self.cache.clear()
+        self.version += 1
+
+    def clear(self):
+        self.slots[:] = -1
+        self.free = list(range(len(self.pool)))
+        self.changed.clear()
+        self.invalidate()
+
+    @property
+    def tile_count(self):
+        return len(self.pool) - len(self.free)
+
+    def tile_rect(self, key):
+        # (left, top, right, bottom) of the tile at key, in pixels
+        size = self.tile_cells * self.cell_size
+        col, row = key
+        return col * size, row * size, (col + 1) * size, (row + 1) * size
+
+    def add_tile(self, key, patches, neighbour_patches=()):
+        # Starts blocking in the tile at chunk key. The chunk's own patches
+        # are marked wherever they reach, which may be into loaded neighbour
+        # tiles, and the neighbours' patches only within the new tile.
+        col, row = key
+        if self.slots[row, col] >= 0:
+            return
+        if not self.free:
+            # Grows the pool by half again; slots stay valid
+            grown = max(16, len(self.pool) // 2)
+            self.free = list(range(len(self.pool) + grown - 1, len(self.pool) - 1, -1))
+            self.pool = np.concatenate([self.pool, np.zeros((grown,) + self.pool.shape[1:],
+                                                             dtype=bool)])
+        slot = self.free.pop()
+        self.pool[slot] = False
+        self.slots[row, col] = slot
+        tile = self.tile_cells
+        self.add_patches(neighbour_patches,
+                         (col * tile, row * tile, (col + 1) * tile - 1, (row + 1) * tile - 1))
+        self.add_patches(patches)
+        self.changed.add(key)
+        self.invalidate()
+
+    def remove_tile(self, key):
+        col, row = key
+        slot = self.slots[row, col]
+        if slot >= 0:
+            self.slots[row, col] = -1
+            self.free.append(int(slot))
+            self.changed.add(key)
+            self.invalidate()
+
+    def rasterize(self, patches):
+        self.clear()
+        self.add_patches(patches)
+        self.invalidate()
+
+    def add_patches(self, patches, within=None):
+        # Only cells of loaded tiles are marked; within limits the marking to
+        # a (col0, row0, col1, row1) range of cells. Callers invalidate once
+        # they're done.
+        for patch in patches:
+            if patch.type in BLOCKING_TERRAIN:
+                self.block_circle(*blocking_circle(patch), within=within)
+
+    def block_circle(self, x, y, radius, within=None):
+        cs = self.cell_size
+        col0, row0, col1, row1 = within or (0, 0, self.cols - 1, self.rows - 1)
+        col0 = max(col0, 0, int((x - radius) // cs))
+        col1 = min(col1, self.cols - 1, int((x + radius) // cs))
+        row0 = max(row0, 0, int((y - radius) // cs))
+        row1 = min(row1, self.rows - 1, int((y + radius) // cs))
+        if col0 > col1 or row0 > row1:
+            return
+
+        # Mark every cell whose center lies inside the circle, plus the cell
+        # holding the center so small patches still block something
+        cols = np.arange(col0, col1 + 1)
+        rows = np.arange(row0, row1 + 1)
+        inside = (((cols[None, :] + 0.5) * cs - x)**2 + ((rows[:, None] + 0.5) * cs - y)**2
+                  <= radius * radius)
+        inside |= (cols[None, :] == int(x // cs)) & (rows[:, None] == int(y // cs))
+        row, col = np.nonzero(inside)
+        self.set_blocked(rows[row], cols[col])
+        tile = self.tile_cells
+        self.changed.update((tile_col, tile_row)
+                            for tile_row in range(row0 // tile, row1 // tile + 1)
+                            for tile_col in range(col0 // tile, col1 // tile + 1))
+
+    def set_blocked(self, row, col):
+        tile = self.tile_cells
+        slot = self.slots[row // tile, col // tile]
+        loaded = slot >= 0
+        self.pool[slot[loaded], row[loaded] % tile, col[loaded] % tile] = True
+
+    def is_blocked(self, row, col):
+        # Cells must be inside the grid
+        tile = self.tile_cells
+        slot = self.slots[row // tile, col // tile]
+        blocked = self.pool[np.maximum(slot, 0), row % tile, col % tile] if len(self.pool) else \
+            np.zeros(np.shape(row), dtype=bool)
+        return blocked & (slot >= 0)
+
+    def cell_index(self, x, y):
+        col = np.clip((np.asarray(x) // self.cell_size).astype(np.int64), 0, self.cols - 1)
+        row = np.clip((np.asarray(y) // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return row * self.cols + col
+
+    def blocked_at(self, x, y):
+        # Whether each point lies in a blocking cell; off the map counts as blocked
+        col = np.floor(np.asarray(x, dtype=np.float64) / self.cell_size).astype(np.int64)
+        row = np.floor(np.asarray(y, dtype=np.float64) / self.cell_size).astype(np.int64)
+        in_grid = (col >= 0) & (col < self.cols) & (row >= 0) & (row < self.rows)
+        blocked = np.ones(col.shape, dtype=bool)
+        blocked[in_grid] = self.is_blocked(row[in_grid], col[in_grid])
+        return blocked
+
+    def first_blocked(self, x0, y0, x1, y1):
+        # Walk every segment through the grid in lockstep (Amanatides & Woo DDA)
+        # and return, per segment, the fraction along it at which the first
+        # blocking cell is entered. The starting cell is never tested so an
+        # entity standing on a rock can still see and shoot out of it.
+        x0 = np.asarray(x0, dtype=np.float64)
+        y0 = np.asarray(y0, dtype=np.float64)
+        x1 = np.asarray(x1, dtype=np.float64)
+        y1 = np.asarray(y1, dtype=np.float64)
+        hit_t = np.full(x0.shape, np.inf)
+        if x0.size == 0:
+            return hit_t
+
+        cs = self.cell_size
+        dx = x1 - x0
+        dy = y1 - y0
+        col = np.floor(x0 / cs).astype(np.int64)
+        row = np.floor(y0 / cs).astype(np.int64)
+        end_col = np.floor(x1 / cs).astype(np.int64)
+        end_row = np.floor(y1 / cs).astype(np.int64)
+        step_col = np.sign(dx).astype(np.int64)
+        step_row = np.sign(dy).astype(np.int64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            next_x = (col + (step_col > 0)) * cs
+            next_y = (row + (step_row > 0)) * cs
+            t_max_x = np.where(dx != 0, (next_x - x0) / dx, np.inf)
+            t_max_y = np.where(dy != 0, (next_y - y0) / dy, np.inf)
+            t_delta_x = np.where(dx != 0, cs / np.abs(dx), np.inf)
+            t_delta_y = np.where(dy != 0, cs / np.abs(dy), np.inf)
+
+        active = (col != end_col) | (row != end_row)
+        while active.any():
+            step_x = active & (t_max_x < t_max_y)
+            step_y = active & ~step_x
+            t = np.where(step_x, t_max_x, t_max_y)
+            col += np.where(step_x, step_col, 0)
+            row += np.where(step_y, step_row, 0)
+            t_max_x = np.where(step_x, t_max_x + t_delta_x, t_max_x)
+            t_max_y = np.where(step_y, t_max_y + t_delta_y, t_max_y)
+
+            in_grid = (col >= 0) & (col < self.cols) & (row >= 0) & (row < self.rows)
+            blocked = np.zeros_like(active)
+            blocked[in_grid] = self.is_blocked(row[in_grid], col[in_grid])
+            blocked &= active & (t <= 1)
+            hit_t = np.where(blocked, t, hit_t)
+            active &= ~blocked & (t <= 1) & ((col != end_col) | (row != end_row))
+
+        return hit_t
+
+    def batch_line_of_sight(self, x0, y0, x1, y1):
+        # Visibility is resolved between cell centers so results can be shared
+        # by every pair of entities standing in the same two cells
+        start = self.cell_index(x0, y0)
+        end = self.cell_index(x1, y1)
+        keys = (start * (self.rows * self.cols) + end).tolist()
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            if len(self.cache) + len(missing) > MAX_CACHE_ENTRIES:
+                self.cache.clear()
+            start_missing = start[missing]
+            end_missing = end[missing]
+            cs = self.cell_size
+            hit_t = self.first_blocked((start_missing % self.cols + 0.5) * cs,
+                                       (start_missing // self.cols + 0.5) * cs,
+                                       (end_missing % self.cols + 0.5) * cs,
+                                       (end_missing // self.cols + 0.5) * cs)
+            for i, t in zip(missing, hit_t.tolist()):
+                visible = t == math.inf
+                results[i] = visible
+                self.cache[keys[i]] = visible
+        return results
+
+    def has_line_of_sight(self, x0, y0, x1, y1):
+        return self.batch_line_of_sight([x0], [y0], [x1], [y1])[0]
@@ -0,0 +1,84 @@
+import numpy as np
+import pygame
+
+
+class Minimap:
+    # The terrain layer is baked once per match; entity dots are redrawn into
+    # a separate overlay at refresh_interval (ms of sim time), and each frame
+    # only blits the two layers and draws the storm ring on top.
+    def __init__(self, width, height, map_width, map_height, refresh_interval=250):
+        self.width = width
+        self.height = height
+        self.scale_x = width / map_width
+        self.scale_y = height / map_height
+        self.refresh_interval = refresh_interval
+        self.terrain = pygame.Surface((width, height))
+        self.overlay = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.mapped_colors = {}
+        self.last_refresh = None
+
+    def to_minimap(self, x, y):
+        px = np.clip((np.asarray(x) * self.scale_x).astype(np.int64), 0, self.width - 1)
+        py = np.clip((np.asarray(y) * self.scale_y).astype(np.int64), 0, self.height - 1)
+        return px, py
+
+    def bake(self, patches, background):
+        self.terrain.fill(background)
+        self.paint_patches(patches)
+        self.last_refresh = None
+
+    def paint_patches(self, patches):
+        for patch in patches:
+            radius = max(1, int(patch.size * self.scale_x))
+            center = (int(patch.x * self.scale_x), int(patch.y * self.scale_y))
+            pygame.draw.circle(self.terrain, patch.color, center, radius)
+
+    def map_color(self, color):
+        mapped = self.mapped_colors.get(color)
+        if mapped is None:
+            mapped = self.overlay.map_rgb(color) & 0xFFFFFFFF
+            self.mapped_colors[color] = mapped
+        return mapped
+
+    def refresh_due(self, sim_time):
+        return self.last_refresh is None or sim_time - self.last_refresh >= self.refresh_interval
+
+    def refresh(self, sim_time, x, y, colors):
+        # x, y are world positions of the entities to show and colors their
+        # RGB tuples; dots are written straight into the overlay's pixels
+        if not self.refresh_due(sim_time):
+            return
+        self.last_refresh = sim_time
+
+        self.overlay.fill((0, 0, 0, 0))
+        if len(x) == 0:
+            return
+        px, py = self.to_minimap(x, y)
+        mapped = np.array([self.map_color(color) for color in colors], dtype=np.uint32)
+        pixels = pygame.surfarray.pixels2d(self.overlay)
+        mapped = mapped.astype(pixels.dtype)
+        for ox, oy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            pixels[np.minimum(px + ox, self.width - 1), np.minimum(py + oy, self.height - 1)] = mapped
+        del pixels
+
+    def draw(self, target, position, storm_center=None, storm_radius=0, view_rect=None):
+        left, top = position
+        target.blit(self.terrain, position)
+        target.blit(self.overlay, position)
+
+        if storm_center is not None:
+            center = (int(left + storm_center[0] * self.scale_x),
+                      int(top + storm_center[1] * self.scale_y))
+            radius = max(1, int(storm_radius * self.scale_x))
+            target.set_clip(pygame.Rect(left, top, self.width, self.height))
+            pygame.draw.circle(target, (255, 255, 0), center, radius, 1)
+            target.set_clip(None)
+
+        if view_rect is not None:
+            view_left, view_top, view_right, view_bottom = view_rect
+            pygame.draw.rect(target, (255, 255, 255),
+                             (left + int(view_left * self.scale_x), top + int(view_top * self.scale_y),
+                              int((view_right - view_left) * self.scale_x),
+                              int((view_bottom - view_top) * self.scale_y)), 1)
+
+        pygame.draw.rect(target, (0, 0, 0), (left, top, self.width, self.height), 1)
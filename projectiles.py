@@ -0,0 +1,169 @@
+import math
+import numpy as np
+
+# Rows of precomputed spread offsets per weapon before a table wraps around
+SPREAD_TABLE_ROWS = 4096
+
+
+class BulletPool:
+    # Structure-of-arrays storage for every bullet in flight. Live bullets
+    # occupy the first `count` slots; owner is the index of the shooter in
+    # [player] + bots and weapon the id of the weapon that fired it.
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        old = getattr(self, 'x', None)
+        fields = {
+            'x': np.float64, 'y': np.float64, 'dx': np.float64, 'dy': np.float64,
+            'damage': np.float64, 'speed': np.float64, 'size': np.float64,
+            'owner': np.int64, 'weapon': np.int64,
+        }
+        for name, dtype in fields.items():
+            array = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, x, y, dx, dy, damage, speed, size, owner, weapon=0):
+        added = len(x)
+        if self.count + added > self.capacity:
+            self.allocate(max(self.capacity * 2, self.count + added))
+        end = self.count + added
+        self.x[self.count:end] = x
+        self.y[self.count:end] = y
+        self.dx[self.count:end] = dx
+        self.dy[self.count:end] = dy
+        self.damage[self.count:end] = damage
+        self.speed[self.count:end] = speed
+        self.size[self.count:end] = size
+        self.owner[self.count:end] = owner
+        self.weapon[self.count:end] = weapon
+        self.count = end
+
+    def move(self):
+        n = self.count
+        self.x[:n] += self.dx[:n] * self.speed[:n]
+        self.y[:n] += self.dy[:n] * self.speed[:n]
+
+    def compact(self, keep):
+        # Drops every bullet whose keep flag is False, preserving order
+        kept = np.flatnonzero(keep)
+        for name in ('x', 'y', 'dx', 'dy', 'damage', 'speed', 'size', 'owner', 'weapon'):
+            array = getattr(self, name)
+            array[:len(kept)] = array[kept]
+        self.count = len(kept)
+
+
+class SpreadTable:
+    # Precomputed rotations for a weapon's pellets. Each row holds the cosine
+    # and sine of one shot's per-pellet angle offsets, so a blast is a table
+    # lookup and a rotation instead of atan2/cos/sin per pellet.
+    def __init__(self, pellets, spread, rng, rows=SPREAD_TABLE_ROWS):
+        self.pellets = pellets
+        if spread > 0:
+            offsets = rng.uniform(-spread, spread, size=(rows, pellets))
+        else:
+            offsets = np.zeros((1, pellets))
+        self.cos = np.cos(offsets)
+        self.sin = np.sin(offsets)
+        self.cursor = 0
+
+    def take(self, shots):
+        rows = (self.cursor + np.arange(shots)) % len(self.cos)
+        self.cursor = (self.cursor + shots) % len(self.cos)
+        return self.cos[rows], self.sin[rows]
+
+
+class ProjectileSpawner:
+    # Collects every fire request made during a tick and resolves cooldowns
+    # and bullet emission for all shooters together in resolve(). weapons is
+    # the scenario's weapon record table; stats are read from it by weapon id.
+    def __init__(self, weapons, seed=None):
+        self.weapons = weapons
+        self.rng = np.random.default_rng(seed)
+        self.tables = {}
+        self.requests = []
+
+    def table_for(self, weapon):
+        table = self.tables.get(weapon.name)
+        if table is None:
+            table = SpreadTable(weapon.pellets, weapon.spread, self.rng)
+            self.tables[weapon.name] = table
+        return table
+
+    def request(self, shooter, target_x, target_y):
+        self.requests.append((shooter, target_x, target_y))
+
+    def resolve(self, current_time, pool, owner_index):
+        requests = self.requests
+        self.requests = []
+        if not requests:
+            return []
+
+        # A shooter gets at most one shot per tick; later requests are dropped
+        seen = set()
+        unique = []
+        for request in requests:
+            if id(request[0]) not in seen:
+                seen.add(id(request[0]))
+                unique.append(request)
+
+        shooters = [shooter for shooter, _, _ in unique]
+        weapons = [shooter.weapon_inventory.current_weapon if shooter.alive else None
+                   for shooter in shooters]
+        weapon_ids = np.array([weapon.id if weapon else -1 for weapon in weapons])
+        last_shot = np.array([shooter.last_shot_time for shooter in shooters], dtype=float)
+        fire_rate = np.where(weapon_ids >= 0, self.weapons['fire_rate'][weapon_ids], math.inf)
+        ready = current_time - last_shot >= fire_rate
+        fired = np.flatnonzero(ready).tolist()
+        if not fired:
+            return []
+
+        for index in fired:
+            shooters[index].last_shot_time = current_time
+
+        start_x = np.array([shooters[i].x for i in fired], dtype=float)
+        start_y = np.array([shooters[i].y for i in fired], dtype=float)
+        dx = np.array([unique[i][1] for i in fired], dtype=float) - start_x
+        dy = np.array([unique[i][2] for i in fired], dtype=float) - start_y
+        length = np.hypot(dx, dy)
+        moving = length > 0
+        dx[moving] /= length[moving]
+        dy[moving] /= length[moving]
+        owners = np.array([owner_index[id(shooters[i])] for i in fired])
+
+        # Emit each weapon's shots as one block, in order of first use,
+        # rotating the aim direction by that weapon's precomputed pellet offsets
+        fired_ids = weapon_ids[fired]
+        used, first = np.unique(fired_ids, return_index=True)
+        for weapon_id, index in zip(used[np.argsort(first)].tolist(), np.sort(first).tolist()):
+            group = fired_ids == weapon_id
+            stats = self.weapons[weapon_id]
+            table = self.table_for(weapons[fired[index]])
+            shots = int(group.sum())
+            cos, sin = table.take(shots)
+            gx = dx[group, None]
+            gy = dy[group, None]
+            pool.add(np.repeat(start_x[group], table.pellets),
+                     np.repeat(start_y[group], table.pellets),
+                     (gx * cos - gy * sin).ravel(),
+                     (gx * sin + gy * cos).ravel(),
+                     stats['damage'] // table.pellets,
+                     stats['bullet_speed'],
+                     stats['bullet_size'],
+                     np.repeat(owners[group], table.pellets),
+                     weapon_id)
+
+        return [shooters[i] for i in fired]
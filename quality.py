@@ -0,0 +1,88 @@
+from collections import deque
+import math
+
+# Quality tiers from best to cheapest. Each tier keeps everything the tiers
+# before it turned down and turns down one more piece of optional work:
+#
+#   particle_cap          most live particles; new ones are dropped past it
+#   damage_number_every   show one damage number per this many hits
+#   terrain_detail        2 full, 1 trees without trunks
+#   bot_lod_distance      bots farther than this from the player are drawn
+#                         as a single rectangle
+#   far_ai_interval       bots farther than FAR_BOT_DISTANCE replan only
+#                         every this many ticks
+QUALITY_TIERS = [
+    ('full', {}),
+    ('fewer particles', {'particle_cap': 64}),
+    ('fewer damage numbers', {'damage_number_every': 3}),
+    ('simple terrain', {'terrain_detail': 1}),
+    ('bot LOD', {'bot_lod_distance': 400}),
+    ('far bot AI', {'far_ai_interval': 4}),
+]
+
+DEFAULT_SETTINGS = {
+    'particle_cap': 512,
+    'damage_number_every': 1,
+    'terrain_detail': 2,
+    'bot_lod_distance': math.inf,
+    'far_ai_interval': 1,
+}
+
+FAR_BOT_DISTANCE = 800
+
+
+def tier_settings(tier):
+    settings = dict(DEFAULT_SETTINGS)
+    for _, changes in QUALITY_TIERS[:tier + 1]:
+        settings.update(changes)
+    return settings
+
+
+class QualityGovernor:
+    # Tracks a rolling average of frame time against budget_ms. It steps one
+    # tier down when the average goes over budget and one tier up once it has
+    # stayed under upgrade_ratio * budget for a full window. Samples are
+    # discarded after every change, so each tier is judged on its own frames.
+    def __init__(self, budget_ms, window=60, upgrade_ratio=0.7):
+        self.budget_ms = budget_ms
+        self.upgrade_ratio = upgrade_ratio
+        self.samples = deque(maxlen=window)
+        self.tier = 0
+        self.settings = tier_settings(0)
+        self.changes = 0
+
+    @property
+    def average_ms(self):
+        return sum(self.samples) / len(self.samples) if self.samples else 0
+
+    @property
+    def tier_name(self):
+        return QUALITY_TIERS[self.tier][0]
+
+    def record(self, frame_ms):
+        # Returns True when the tier changed
+        self.samples.append(frame_ms)
+        if len(self.samples) < self.samples.maxlen:
+            return False
+        average = self.average_ms
+        if average > self.budget_ms and self.tier < len(QUALITY_TIERS) - 1:
+            self.set_tier(self.tier + 1)
+            return True
+        if average < self.budget_ms * self.upgrade_ratio and self.tier > 0:
+            self.set_tier(self.tier - 1)
+            return True
+        return False
+
+    def set_tier(self, tier):
+        self.tier = tier
+        self.settings = tier_settings(tier)
+        self.samples.clear()
+        self.changes += 1
+
+    def describe(self):
+        # One line per setting the current tier has turned down
+        lines = []
+        for name, value in self.settings.items():
+            if value != DEFAULT_SETTINGS[name]:
+                lines.append(f"{name} {DEFAULT_SETTINGS[name]} -> {value}")
+        return lines
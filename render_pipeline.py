@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+# Draws frames on a worker thread so the main thread can simulate the next
+# tick at the same time. The main thread keeps event pumping and
+# display.flip; the worker only ever sees immutable frame snapshots, never
+# the live game state, and draws them onto the target surface.
+#
+#   pipeline.present()        wait for the frame in flight and flip it
+#   pipeline.submit(view)     start drawing the next one
+
+
+class RenderPipeline:
+    def __init__(self, draw, surface):
+        self.draw = draw          # draw(surface, view)
+        self.surface = surface
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='render')
+        self.pending = None
+        self.frames = 0
+
+    def submit(self, view):
+        self.wait()
+        self.pending = self.executor.submit(self.draw, self.surface, view)
+
+    def wait(self):
+        # Blocks until the frame in flight is drawn; re-raises its errors
+        if self.pending is not None:
+            pending = self.pending
+            self.pending = None
+            pending.result()
+            return True
+        return False
+
+    def present(self):
+        if self.wait():
+            pygame.display.flip()
+            self.frames += 1
+
+    def close(self):
+        self.wait()
+        self.executor.shutdown()
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+
+# Renders a replay recorded with battle_royale.py --record into numbered
+# frames, offscreen and without a display.
+#
+#   python render_replay.py match.brrp --out frames/ --jobs 8
+#   python render_replay.py match.brrp --out frames/ --format raw --every 2
+#
+# Each frame is the recorded snapshot for that tick loaded into a headless
+# Game and drawn with the same draw_view code the live game uses. Frames
+# are split into contiguous ranges across a process pool; within a range a
+# worker keeps its terrain and only loads the chunks the camera moves onto.
+# The output directory gets frame_NNNNNN.png (or .rgb, raw 24-bit RGB rows)
+# plus manifest.json describing the sequence, e.g. for
+#
+#   ffmpeg -framerate 60 -i frames/frame_%06d.png match.mp4
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame  # noqa: E402
+import battle_royale  # noqa: E402
+from replay import ReplayReader  # noqa: E402
+from scenario import load_scenario  # noqa: E402
+from snapshot import load_snapshot  # noqa: E402
+
+FORMATS = {'png': '.png', 'raw': '.rgb'}
+
+_worker = None
+
+
+class FrameWorker:
+    # One per process: a headless game set up for the replay's scenario
+    def __init__(self, path, out, image_format):
+        self.reader = ReplayReader(path)
+        metadata = self.reader.metadata
+        battle_royale.apply_scenario(load_scenario(metadata.get('scenario', 'small')))
+        if 'map_width' in metadata:
+            battle_royale.set_map_size(metadata['map_width'], metadata['map_height'])
+        self.screen = pygame.Surface((battle_royale.WINDOW_WIDTH, battle_royale.WINDOW_HEIGHT))
+        self.game = battle_royale.Game(screen=self.screen)
+        self.out = out
+        self.image_format = image_format
+
+    def render(self, frames):
+        game = self.game
+        # Minimap dots refresh on sim time moving forward; ranges can arrive
+        # in any order
+        game.minimap.last_refresh = None
+        written = []
+        for number, index in frames:
+            load_snapshot(game, self.reader.frame(index), keep_world=True)
+            game.draw_view(self.screen, game.render_view())
+            name = f'frame_{number:06d}{FORMATS[self.image_format]}'
+            path = os.path.join(self.out, name)
+            if self.image_format == 'png':
+                pygame.image.save(self.screen, path)
+            else:
+                with open(path, 'wb') as stream:
+                    stream.write(pygame.image.tobytes(self.screen, 'RGB'))
+            written.append({'frame': number, 'tick': index, 'sim_time': game.sim_time, 'file': name})
+        return written
+
+
+def init_worker(path, out, image_format):
+    global _worker
+    _worker = FrameWorker(path, out, image_format)
+
+
+def render_range(frames):
+    return _worker.render(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a recorded match to numbered frames")
+    parser.add_argument('replay', help='replay file written by battle_royale.py --record')
+    parser.add_argument('--out', default='replay_frames', help='output directory')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='png')
+    parser.add_argument('--every', type=int, default=1, metavar='N',
+                        help='render every Nth tick (2 gives 30 fps footage)')
+    parser.add_argument('--start', type=int, default=0, help='first tick to render')
+    parser.add_argument('--stop', type=int, help='tick to stop before')
+    parser.add_argument('--chunk', type=int, default=120, help='frames per job')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    try:
+        reader = ReplayReader(args.replay)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    metadata = reader.metadata
+    ticks = list(range(len(reader)))[args.start:args.stop:max(1, args.every)]
+    reader.close()
+    if not ticks:
+        parser.error("no frames in the requested range")
+
+    os.makedirs(args.out, exist_ok=True)
+    frames = list(enumerate(ticks))
+    ranges = [frames[i:i + args.chunk] for i in range(0, len(frames), args.chunk)]
+    started = time.perf_counter()
+    written = []
+    initargs = (args.replay, args.out, args.format)
+    if args.jobs > 1 and len(ranges) > 1:
+        with Pool(min(args.jobs, len(ranges)), initializer=init_worker, initargs=initargs) as pool:
+            for part in pool.imap_unordered(render_range, ranges):
+                written.extend(part)
+    else:
+        init_worker(*initargs)
+        for frame_range in ranges:
+            written.extend(render_range(frame_range))
+    elapsed = time.perf_counter() - started
+    written.sort(key=lambda frame: frame['frame'])
+
+    fps = metadata.get('fps', battle_royale.FPS) / max(1, args.every)
+    manifest = {
+        'replay': os.path.abspath(args.replay),
+        'metadata': metadata,
+        'format': args.format,
+        'pixel_format': 'rgb24' if args.format == 'raw' else None,
+        'width': battle_royale.WINDOW_WIDTH,
+        'height': battle_royale.WINDOW_HEIGHT,
+        'fps': fps,
+        'every': args.every,
+        'pattern': f'frame_%06d{FORMATS[args.format]}',
+        'frame_count': len(written),
+        'frames': written,
+        'render_seconds': round(elapsed, 3),
+    }
+    with open(os.path.join(args.out, 'manifest.json'), 'w') as stream:
+        json.dump(manifest, stream, indent=1)
+
+    footage = len(written) / fps
+    print(f"Rendered {len(written)} frames ({footage:.1f} s of footage at {fps:g} fps) "
+          f"in {elapsed:.1f} s, {footage / elapsed:.2f}x real time, to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+import json
+import mmap
+import struct
+
+from snapshot import parse_snapshot, save_snapshot
+
+# A recorded match: one snapshot (see snapshot.py) per simulated tick.
+#
+#   MAGIC | u32 header length | JSON header | (u32 length | snapshot)*
+#
+# Storing the whole state every tick rather than inputs means playback
+# needs no deterministic simulation: any tick can be drawn on its own, in
+# any order, by any process. The header holds what a player of the file
+# has to set up first, such as the scenario.
+MAGIC = b'BRRPLY'
+LENGTH = struct.Struct('<I')
+
+
+class ReplayRecorder:
+    def __init__(self, path, metadata=None):
+        self.path = path
+        self.frames = 0
+        self.stream = open(path, 'wb')
+        header = json.dumps({'format': 1, 'metadata': metadata or {}}).encode('utf-8')
+        self.stream.write(MAGIC + LENGTH.pack(len(header)) + header)
+
+    def record(self, game):
+        # Spread tables are large and only matter for resuming play
+        data = save_snapshot(game, spawner=False)
+        self.stream.write(LENGTH.pack(len(data)))
+        self.stream.write(data)
+        self.frames += 1
+
+    def close(self):
+        if not self.stream.closed:
+            self.stream.close()
+
+
+class ReplayReader:
+    # Memory-maps a replay and indexes where every frame starts, so frames
+    # are read without copying
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a battle royale replay")
+        (length,) = LENGTH.unpack_from(self.data, len(MAGIC))
+        start = len(MAGIC) + LENGTH.size
+        self.header = json.loads(self.data[start:start + length].decode('utf-8'))
+        self.offsets = []
+        offset = start + length
+        # A recording cut short by a crash ends in a partial frame; stop there
+        while offset + LENGTH.size <= len(self.data):
+            (length,) = LENGTH.unpack_from(self.data, offset)
+            offset += LENGTH.size
+            if offset + length > len(self.data):
+                break
+            self.offsets.append((offset, length))
+            offset += length
+
+    @property
+    def metadata(self):
+        return self.header['metadata']
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def frame(self, index):
+        # The snapshot for frame index, for snapshot.load_snapshot
+        offset, length = self.offsets[index]
+        return memoryview(self.data)[offset:offset + length]
+
+    def frame_header(self, index):
+        return parse_snapshot(self.frame(index))[0]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
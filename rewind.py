@@ -0,0 +1,222 @@
+import math
+import time
+from collections import deque
+from itertools import islice
+import numpy as np
+
+from snapshot import pack_snapshot, parse_snapshot, snapshot_state, storm_schedule
+
+# Rolling history of the last few seconds of a match, for the kill cam and
+# for rewinding while debugging.
+#
+# Every tick is packed like a snapshot (see snapshot.py, without the
+# spawner tables) into one preallocated byte ring, so memory use is capped
+# at memory_bytes however big the match. Every keyframe_interval ticks a
+# keyframe holds the full entity table and the match's constant state
+# (world seed, storm schedule). The ticks in between only hold the entity
+# rows that changed since the tick before, plus the bullets, particles and
+# damage numbers of the tick, which are small and short-lived anyway.
+#
+# Any tick still held can be rebuilt: start at the keyframe before it and
+# apply the changed rows of every tick after it. The oldest ticks are
+# dropped a keyframe interval at a time, when the ring is full or holds more
+# than the requested seconds.
+#
+# Recording still reads every entity object, so its cost grows with the
+# crowd. It is kept to a budget share of the time between ticks by
+# recording only every stride-th tick, with the stride raised while the
+# moving average is over budget (up to MAX_STRIDE) and lowered again once
+# it isn't. The history then holds fewer ticks per second, not fewer
+# seconds.
+
+MAX_STRIDE = 15        # Still four recorded ticks a second at 60 fps
+MAX_TICK_GAP_MS = 250  # Longer gaps are pauses, not ticks, and aren't averaged
+
+
+class RewindFrame:
+    def __init__(self, tick, offset, length, keyframe, sim_time):
+        self.tick = tick
+        self.offset = offset
+        self.length = length
+        self.keyframe = keyframe
+        self.sim_time = sim_time
+
+
+class RewindBuffer:
+    def __init__(self, seconds=10, fps=60, memory_bytes=16 << 20, keyframe_interval=30,
+                 budget=0.1):
+        self.seconds = seconds
+        self.fps = fps
+        self.keyframe_interval = keyframe_interval
+        self.budget = budget   # Share of the time between ticks recording may take
+        self.ring = np.zeros(memory_bytes, dtype=np.uint8)
+        self.frames = deque()
+        self.head = 0          # Where the next frame is written
+        self.ticks = 0         # Ticks recorded, also the next frame's tick number
+        self.previous = None   # Last recorded tick's entity rows, as bytes per row
+        self.match = None      # Constant state the held frames belong to
+        self.storm = None      # Storm object self.match was last checked against
+        self.record_ms = 0     # Moving average of the time a recorded tick takes
+        self.tick_ms = 0       # Moving average of the time between ticks
+        self.last_call = None
+        self.stride = 1        # Ticks per recorded tick
+        self.skipped = 0       # Ticks passed over since the last recorded one
+
+    def clear(self):
+        self.frames.clear()
+        self.head = 0
+        self.previous = None
+        self.match = None
+
+    @property
+    def used_bytes(self):
+        return sum(frame.length for frame in self.frames)
+
+    @property
+    def held_seconds(self):
+        if not self.frames:
+            return 0
+        return (self.frames[-1].sim_time - self.frames[0].sim_time) / 1000 + 1 / self.fps
+
+    def record(self, game):
+        started = time.perf_counter()
+        if self.last_call is not None:
+            gap = (started - self.last_call) * 1000
+            if gap < MAX_TICK_GAP_MS:
+                self.tick_ms += (gap - self.tick_ms) * (0.05 if self.tick_ms else 1)
+        self.last_call = started
+        self.skipped += 1
+        if self.skipped < self.stride:
+            return
+        self.skipped = 0
+
+        if (game.storm is not self.storm or self.match is None
+                or self.match[0] != game.world.seed):
+            # The schedule is only compared when the storm was replaced, by a
+            # new match or a loaded save or rewind
+            match = [game.world.seed, [game.world.width, game.world.height],
+                     storm_schedule(game.storm)]
+            if match != self.match:
+                # A new match or a loaded save; older frames don't lead here
+                self.clear()
+                self.match = match
+            self.storm = game.storm
+
+        keyframe = (self.previous is None or len(self.previous) != len(game.bots) + 1
+                    or self.ticks % self.keyframe_interval == 0)
+        header, arrays = snapshot_state(game, spawner=False, constants=keyframe)
+        entities = arrays.pop('entities')
+        rows = entities.view(np.uint8).reshape(len(entities), entities.dtype.itemsize)
+        if keyframe:
+            arrays['entities'] = entities
+        else:
+            changed = np.flatnonzero((rows != self.previous).any(axis=1))
+            arrays['entity_index'] = changed.astype(np.int32)
+            arrays['entity_rows'] = entities[changed]
+            del header['spawner']
+        header['keyframe'] = keyframe
+        self.previous = rows.copy()
+
+        data = np.frombuffer(pack_snapshot(header, arrays), dtype=np.uint8)
+        if len(data) > len(self.ring):
+            # Can't hold even one tick; the history restarts at the next keyframe
+            match = self.match
+            self.clear()
+            self.match = match
+        else:
+            self.write(data, keyframe, game.sim_time)
+        self.ticks += 1
+        elapsed = (time.perf_counter() - started) * 1000
+        self.record_ms += (elapsed - self.record_ms) * (0.05 if self.record_ms else 1)
+        if self.tick_ms:
+            self.stride = max(1, min(MAX_STRIDE,
+                                     math.ceil(self.record_ms / (self.budget * self.tick_ms))))
+
+    def write(self, data, keyframe, sim_time):
+        offset = self.head
+        if offset + len(data) > len(self.ring):
+            # Wrapping around; the frames left past the head are the oldest
+            while self.frames and self.frames[0].offset >= self.head:
+                self.drop_oldest()
+            offset = 0
+        end = offset + len(data)
+        # Drop whatever the new frame overwrites, and past the time limit
+        while self.frames and (self.expired(sim_time) or
+                               self.overlaps(self.frames[0], offset, end)):
+            self.drop_oldest()
+        if not keyframe and not self.frames:
+            # Its keyframe was just dropped; start over at the next tick
+            self.previous = None
+            return
+        self.ring[offset:end] = data
+        self.frames.append(RewindFrame(self.ticks, offset, len(data), keyframe, sim_time))
+        self.head = end
+
+    def expired(self, sim_time):
+        # The oldest keyframe and its deltas can go once the next keyframe
+        # alone still reaches back the requested seconds
+        limit = sim_time - self.seconds * 1000
+        for frame in islice(self.frames, 1, None):
+            if frame.sim_time > limit:
+                return False
+            if frame.keyframe:
+                return True
+        return False
+
+    def overlaps(self, frame, start, end):
+        return frame.offset < end and start < frame.offset + frame.length
+
+    def drop_oldest(self):
+        # Deltas are useless without their keyframe, so they go with it
+        self.frames.popleft()
+        while self.frames and not self.frames[0].keyframe:
+            self.frames.popleft()
+
+    def frame_data(self, frame):
+        return memoryview(self.ring)[frame.offset:frame.offset + frame.length]
+
+    def index_before(self, sim_time):
+        # Index of the latest held frame at or before sim_time, or the oldest
+        for index in range(len(self.frames) - 1, -1, -1):
+            if self.frames[index].sim_time <= sim_time:
+                return index
+        return 0
+
+    def state(self, index):
+        # (header, arrays) of the held frame at index (0 is the oldest, -1
+        # the newest), ready for snapshot.load_state; copied out of the ring
+        if index < 0:
+            index += len(self.frames)
+        start = index
+        while not self.frames[start].keyframe:
+            start -= 1
+        key_header, key_arrays = parse_snapshot(self.frame_data(self.frames[start]))
+        entities = key_arrays['entities'].copy()
+        header, arrays = key_header, key_arrays
+        for position in range(start + 1, index + 1):
+            header, arrays = parse_snapshot(self.frame_data(self.frames[position]))
+            entities[arrays['entity_index']] = arrays['entity_rows']
+        header = dict(key_header, game=header['game'], camera=header['camera'],
+                      storm=dict(key_header['storm'], **header['storm']))
+        arrays = {name: array.copy() for name, array in arrays.items()
+                  if name not in ('entity_index', 'entity_rows')}
+        arrays['entities'] = entities
+        return header, arrays
+
+    def truncate(self, index):
+        # Forgets every frame after index, e.g. after rewinding to it
+        if index < 0:
+            index += len(self.frames)
+        while len(self.frames) > index + 1:
+            self.frames.pop()
+        frame = self.frames[index]
+        self.head = frame.offset + frame.length
+        self.ticks = frame.tick + 1
+        self.skipped = 0
+        entities = self.state(index)[1]['entities']
+        self.previous = entities.view(np.uint8).reshape(len(entities), entities.dtype.itemsize).copy()
+
+    def describe(self):
+        return (f"Rewind: {self.held_seconds:.1f} s held, {self.used_bytes / 1024:.0f} KB "
+                f"of {len(self.ring) / 1024:.0f} KB, {self.record_ms:.3f} ms per recorded "
+                f"tick, every {self.stride} of {self.tick_ms:.1f} ms ticks")
@@ -0,0 +1,189 @@
+import json
+import os
+import numpy as np
+
+# Scenario files describe a match: arena size, bot population, movement
+# speeds, the weapon roster and the storm schedule. They live in scenarios/
+# as JSON and are checked field by field when loaded; anything missing,
+# mistyped or misspelled raises ValueError naming the field. Weapons and
+# storm phases are compiled into NumPy record arrays indexed by weapon id
+# and phase number, so per-tick code reads numbers out of columns.
+#
+#   scenario = load_scenario('large')      # scenarios/large.json
+#   scenario = load_scenario('my.json')    # or any path
+#   scenario.weapons['fire_rate'][weapon_id]
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+DEFAULT_SCENARIO = 'small'
+
+WEAPON_DTYPE = np.dtype([
+    ('name', 'U16'),
+    ('damage', np.int32),
+    ('fire_rate', np.int32),      # Milliseconds between shots
+    ('bullet_speed', np.int32),
+    ('bullet_size', np.int32),
+    ('color', np.uint8, 3),
+    ('sound_freq', np.int32),
+    ('pellets', np.int32),
+    ('spread', np.float64),       # Radians either side of the aim
+])
+
+# One row per shrink; each shrink closes in on a circle `fraction` of the
+# starting radius, then holds for hold_time
+STORM_PHASE_DTYPE = np.dtype([
+    ('fraction', np.float64),
+    ('shrink_time', np.float64),
+    ('hold_time', np.float64),
+    ('damage_scale', np.float64),
+])
+
+
+class Scenario:
+    pass
+
+
+def scenario_path(name):
+    if os.sep in name or name.endswith('.json'):
+        return name
+    return os.path.join(SCENARIO_DIR, name + '.json')
+
+
+def scenario_names():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(SCENARIO_DIR)
+                  if name.endswith('.json'))
+
+
+def load_scenario(name):
+    path = scenario_path(name)
+    with open(path) as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"{path}: not valid JSON: {error}") from None
+    return compile_scenario(data, path)
+
+
+def field(data, key, kind, where, minimum=None, maximum=None, default=None):
+    # Reads data[key], checking its type and range; where names the parent
+    # for error messages
+    if key not in data:
+        if default is None:
+            raise ValueError(f"{where}: missing '{key}'")
+        return default
+    value = data[key]
+    name = f"{where}.{key}"
+    if kind is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, kind) and not isinstance(value, bool)
+    if not valid:
+        raise ValueError(f"{name}: expected {kind.__name__}, got {value!r}")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name}: must be at least {minimum}, got {value!r}")
+    if maximum is not None and value > maximum:
+        raise ValueError(f"{name}: must be at most {maximum}, got {value!r}")
+    return value
+
+
+def section(data, key, where, allowed):
+    value = field(data, key, dict, where)
+    unknown = sorted(set(value) - set(allowed))
+    if unknown:
+        raise ValueError(f"{where}.{key}: unknown field '{unknown[0]}'")
+    return value
+
+
+def compile_weapons(weapons, where):
+    if not isinstance(weapons, list) or not weapons:
+        raise ValueError(f"{where}.weapons: expected a non-empty list")
+    allowed = set(WEAPON_DTYPE.names)
+    table = np.zeros(len(weapons), dtype=WEAPON_DTYPE)
+    names = []
+    for index, weapon in enumerate(weapons):
+        at = f"{where}.weapons[{index}]"
+        if not isinstance(weapon, dict):
+            raise ValueError(f"{at}: expected an object")
+        unknown = sorted(set(weapon) - allowed)
+        if unknown:
+            raise ValueError(f"{at}: unknown field '{unknown[0]}'")
+        name = field(weapon, 'name', str, at)
+        if not name or len(name) > 16:
+            raise ValueError(f"{at}.name: must be 1 to 16 characters")
+        if name in names:
+            raise ValueError(f"{at}.name: duplicate weapon '{name}'")
+        names.append(name)
+        color = field(weapon, 'color', list, at)
+        if len(color) != 3 or not all(isinstance(c, int) and 0 <= c <= 255 for c in color):
+            raise ValueError(f"{at}.color: expected three integers from 0 to 255")
+        table[index] = (name,
+                        field(weapon, 'damage', int, at, minimum=1),
+                        field(weapon, 'fire_rate', int, at, minimum=1),
+                        field(weapon, 'bullet_speed', int, at, minimum=1),
+                        field(weapon, 'bullet_size', int, at, minimum=1),
+                        color,
+                        field(weapon, 'sound_freq', int, at, minimum=1),
+                        field(weapon, 'pellets', int, at, minimum=1, default=1),
+                        field(weapon, 'spread', float, at, minimum=0, maximum=np.pi, default=0.0))
+    return table
+
+
+def compile_storm_phases(phases, where):
+    if not isinstance(phases, list) or not phases:
+        raise ValueError(f"{where}.phases: expected a non-empty list")
+    table = np.zeros(len(phases), dtype=STORM_PHASE_DTYPE)
+    for index, phase in enumerate(phases):
+        at = f"{where}.phases[{index}]"
+        if not isinstance(phase, dict):
+            raise ValueError(f"{at}: expected an object")
+        unknown = sorted(set(phase) - set(STORM_PHASE_DTYPE.names))
+        if unknown:
+            raise ValueError(f"{at}: unknown field '{unknown[0]}'")
+        table[index] = (field(phase, 'fraction', float, at, minimum=0, maximum=1),
+                        field(phase, 'shrink_time', float, at, minimum=1),
+                        field(phase, 'hold_time', float, at, minimum=0),
+                        field(phase, 'damage_scale', float, at, minimum=0))
+    return table
+
+
+def compile_scenario(data, where='scenario'):
+    if not isinstance(data, dict):
+        raise ValueError(f"{where}: expected a JSON object")
+    unknown = sorted(set(data) - {'name', 'description', 'map', 'player', 'bots', 'weapons', 'storm'})
+    if unknown:
+        raise ValueError(f"{where}: unknown field '{unknown[0]}'")
+    scenario = Scenario()
+    scenario.name = field(data, 'name', str, where)
+    scenario.description = field(data, 'description', str, where, default='')
+
+    arena = section(data, 'map', where, ('width', 'height'))
+    scenario.map_width = field(arena, 'width', int, where + '.map', minimum=400)
+    scenario.map_height = field(arena, 'height', int, where + '.map', minimum=300)
+
+    player = section(data, 'player', where, ('speed', 'shoot_cooldown'))
+    scenario.player_speed = field(player, 'speed', float, where + '.player', minimum=0)
+    scenario.shoot_cooldown = field(player, 'shoot_cooldown', int, where + '.player', minimum=0)
+
+    scenario.weapons = compile_weapons(data.get('weapons'), where)
+    weapon_names = scenario.weapons['name'].tolist()
+
+    bots = section(data, 'bots', where, ('count', 'speed', 'shoot_range', 'weapons'))
+    scenario.num_bots = field(bots, 'count', int, where + '.bots', minimum=0)
+    scenario.bot_speed = field(bots, 'speed', float, where + '.bots', minimum=0)
+    scenario.bot_shoot_range = field(bots, 'shoot_range', float, where + '.bots', minimum=0)
+    bot_weapons = field(bots, 'weapons', list, where + '.bots')
+    for name in bot_weapons:
+        if name not in weapon_names:
+            raise ValueError(f"{where}.bots.weapons: unknown weapon {name!r}")
+    if not bot_weapons:
+        raise ValueError(f"{where}.bots.weapons: expected at least one weapon")
+    scenario.bot_weapons = list(bot_weapons)
+
+    storm = section(data, 'storm', where, ('wait_time', 'damage_per_second', 'damage_interval',
+                                           'min_radius', 'phases'))
+    at = where + '.storm'
+    scenario.storm_wait_time = field(storm, 'wait_time', float, at, minimum=0)
+    scenario.storm_damage_per_second = field(storm, 'damage_per_second', float, at, minimum=0)
+    scenario.storm_damage_interval = field(storm, 'damage_interval', int, at, minimum=1)
+    scenario.storm_min_radius = field(storm, 'min_radius', float, at, minimum=1)
+    scenario.storm_phases = compile_storm_phases(storm.get('phases'), at)
+    return scenario
@@ -1,11 +1,40 @@
 import http.server
+import json
 import socketserver
 import subprocess
 import sys
 import os
+import threading
 
 PORT = 8050
 
+# Spectator stream, started by the first browser that asks for it
+streamer = None
+streamer_lock = threading.Lock()
+
+
+def restart_match(game):
+    game.reset_game()
+    game.game_over = False
+    game.begin_match()
+
+
+def get_streamer():
+    global streamer
+    with streamer_lock:
+        if streamer is None:
+            # Imported here so serving the page never needs pygame
+            import pygame
+            import battle_royale
+            from streaming import FrameStreamer
+            game = battle_royale.Game(screen=pygame.Surface((battle_royale.WINDOW_WIDTH,
+                                                             battle_royale.WINDOW_HEIGHT)))
+            restart_match(game)
+            streamer = FrameStreamer(game, restart_match)
+            streamer.start()
+        return streamer
+
+
 class GameHandler(http.server.SimpleHTTPRequestHandler):
     def do_POST(self):
         if self.path == '/start-game':
@@ -18,10 +47,47 @@ class GameHandler(http.server.SimpleHTTPRequestHandler):
             self.end_headers()
 
     def do_GET(self):
+        if self.path == '/stream':
+            return self.stream()
+        if self.path == '/stream/stats':
+            body = json.dumps(get_streamer().stats()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return None
         if self.path == '/':
             self.path = '/index.html'
         return http.server.SimpleHTTPRequestHandler.do_GET(self)
 
-with socketserver.TCPServer(("", PORT), GameHandler) as httpd:
-    print(f"Serving at http://localhost:{PORT}")
-    httpd.serve_forever()
+    def stream(self):
+        # Server-Sent Events: one 'frame' event per keyframe or tile delta
+        frames = get_streamer()
+        client = frames.add_client()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'keep-alive')
+        self.end_headers()
+        try:
+            while True:
+                self.wfile.write(client.messages.get())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            frames.remove_client(client)
+
+
+class GameServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    # Each open stream holds its own thread
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if __name__ == '__main__':
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    with GameServer(("", PORT), GameHandler) as httpd:
+        print(f"Serving at http://localhost:{PORT}")
+        httpd.serve_forever()
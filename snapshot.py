@@ -0,0 +1,346 @@
+import json
+import math
+import struct
+import sys
+from collections import deque
+from itertools import repeat
+from operator import attrgetter
+import numpy as np
+
+from storm import Storm, StormPhase
+
+# Full simulation state in one versioned binary blob:
+#
+#   MAGIC | u16 version | u32 header length | JSON header | array data
+#
+# The JSON header holds scalar state and, for every array, its dtype, shape
+# and byte offset into the data section, so loading is a set of zero-copy
+# np.frombuffer views.
+#
+# Version 2 added the plan_* entity columns and player_hits; version 1
+# snapshots still load, with no last plan for the bots to follow.
+MAGIC = b'BRSNAP'
+SNAPSHOT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+ALIGNMENT = 16
+
+ENTITY_DTYPE = np.dtype([
+    ('x', '<f8'),
+    ('y', '<f8'),
+    ('health', '<f8'),
+    ('max_health', '<f8'),
+    ('alive', '?'),
+    ('last_shot_time', '<f8'),
+    ('hit_flash_time', '<f8'),
+    ('color', 'u1', 3),
+    ('weapon', 'u1'),
+    ('target_x', '<f8'),
+    ('target_y', '<f8'),
+    ('decision_time', '<f8'),
+    ('decision_interval', '<f8'),
+    ('facing_dx', '<f8'),
+    ('facing_dy', '<f8'),
+    # Game.last_plan, which bots follow on ticks they aren't replanned
+    ('plan_target', '<i4'),
+    ('plan_step_x', '<f8'),
+    ('plan_step_y', '<f8'),
+])
+
+PARTICLE_DTYPE = np.dtype([
+    ('x', '<f8'), ('y', '<f8'), ('dx', '<f8'), ('dy', '<f8'),
+    ('lifetime', '<i4'), ('size', '<i4'), ('color', 'u1', 3),
+])
+
+DAMAGE_NUMBER_DTYPE = np.dtype([
+    ('x', '<f8'), ('y', '<f8'), ('damage', '<f8'),
+    ('lifetime', '<i4'), ('y_offset', '<i4'), ('alpha', '<i4'),
+])
+
+# Entity columns held as plain attributes by every bot
+BOT_FIELDS = ('x', 'y', 'health', 'max_health', 'alive', 'last_shot_time', 'hit_flash_time',
+              'target_x', 'target_y', 'decision_time', 'decision_interval')
+PLAYER_FIELDS = BOT_FIELDS[:7]
+current_weapon_id = attrgetter('weapon_inventory.current_weapon.id')
+
+BULLET_FIELDS = ('x', 'y', 'dx', 'dy', 'damage', 'speed', 'size', 'owner', 'weapon')
+GAME_FLAGS = ('sim_time', 'score', 'game_started', 'in_countdown', 'in_weapon_select',
+              'selected_weapon_index', 'game_over', 'victory', 'player_hits')
+
+
+def as_tuples(value):
+    # JSON turns the tuples in a dtype description into lists
+    if isinstance(value, list):
+        return tuple(as_tuples(item) for item in value)
+    return value
+
+
+_descrs = {}
+
+
+def dtype_descr(dtype):
+    # dtype_to_descr is slow next to everything else a snapshot does per
+    # tick, and only a handful of dtypes are ever saved
+    descr = _descrs.get(dtype)
+    if descr is None:
+        descr = _descrs[dtype] = np.lib.format.dtype_to_descr(dtype)
+    return descr
+
+
+def dtype_from_descr(descr):
+    return np.lib.format.descr_to_dtype([as_tuples(field) for field in descr]
+                                        if isinstance(descr, list) else descr)
+
+
+def game_module(game):
+    # The entity classes live in whichever module defined the game's class,
+    # which is __main__ when battle_royale.py is run directly
+    return sys.modules[type(game).__module__]
+
+
+def record_table(objects, dtype):
+    # Read a whole object at a time, as with bots in entity_table
+    table = np.zeros(len(objects), dtype=dtype)
+    if objects:
+        columns = zip(*map(attrgetter(*dtype.names), objects))
+        for name, column in zip(dtype.names, columns):
+            table[name] = column
+    return table
+
+
+def entity_table(game):
+    bots = game.bots
+    table = np.zeros(len(bots) + 1, dtype=ENTITY_DTYPE)
+    # The player has no targets, and is the only one with a facing once it
+    # has moved or shot
+    player = game.player
+    for name in PLAYER_FIELDS:
+        table[0][name] = getattr(player, name)
+    table[0]['color'] = player.color
+    table[0]['weapon'] = current_weapon_id(player)
+    table[0]['facing_dx'] = getattr(player, 'facing_dx', math.nan)
+    table[0]['facing_dy'] = getattr(player, 'facing_dy', math.nan)
+    # Bots are read a whole row at a time, without a Python loop per bot
+    rows = table[1:]
+    if bots:
+        columns = list(zip(*map(attrgetter(*BOT_FIELDS, 'color'), bots)))
+        for name, column in zip(BOT_FIELDS + ('color',), columns):
+            rows[name] = column
+        rows['weapon'] = [bot.weapon_inventory.current_weapon.id for bot in bots]
+    rows['facing_dx'] = math.nan
+    rows['facing_dy'] = math.nan
+    # No plan yet reads back the same as a plan of no target and no step
+    plan = game.last_plan
+    if plan is not None and len(plan[0]) == len(table):
+        table['plan_target'], table['plan_step_x'], table['plan_step_y'] = plan
+    else:
+        table['plan_target'] = -1
+    return table
+
+
+def storm_schedule(storm):
+    return [[phase.kind, phase.duration, list(phase.center), phase.radius,
+             list(phase.end_center), phase.end_radius, phase.damage_per_second]
+            for phase in storm.schedule]
+
+
+def snapshot_state(game, spawner=True, constants=True):
+    # Returns (header, arrays) for pack_snapshot. Without spawner, the shot
+    # spread tables and RNG state are left out; the state still draws the
+    # same but can't resume the match exactly. Without constants, neither is
+    # what stays fixed for the whole match (world seed, map size, storm
+    # schedule), for callers that keep those elsewhere
+    arrays = {'entities': entity_table(game)}
+
+    n = game.bullets.count
+    for name in BULLET_FIELDS:
+        # Copied, since the pool keeps changing in place
+        arrays[f'bullet_{name}'] = getattr(game.bullets, name)[:n].copy()
+
+    arrays['particles'] = record_table(game.particles, PARTICLE_DTYPE)
+    arrays['damage_numbers'] = record_table(game.damage_numbers, DAMAGE_NUMBER_DTYPE)
+
+    spawner_state = None
+    if spawner:
+        spawner_tables = {}
+        for weapon_name, table in game.spawner.tables.items():
+            arrays[f'spread_cos_{weapon_name}'] = table.cos
+            arrays[f'spread_sin_{weapon_name}'] = table.sin
+            spawner_tables[weapon_name] = {'pellets': table.pellets, 'cursor': table.cursor}
+        spawner_state = {'rng': game.spawner.rng.bit_generator.state, 'tables': spawner_tables}
+
+    header = {
+        'game': {name: getattr(game, name, None) for name in GAME_FLAGS},
+        'camera': [game.camera.x, game.camera.y, game.camera.zoom],
+        'storm': {'next_damage_time': game.storm.next_damage_time},
+        'spawner': spawner_state,
+    }
+    if constants:
+        header['world_seed'] = game.world.seed
+        header['map'] = [game.world.width, game.world.height]
+        header['storm']['damage_interval'] = game.storm.damage_interval
+        header['storm']['schedule'] = storm_schedule(game.storm)
+    return header, arrays
+
+
+def pack_snapshot(header, arrays):
+    header = dict(header, arrays={})
+    chunks = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        padding = -offset % ALIGNMENT
+        chunks.append(b'\0' * padding)
+        offset += padding
+        header['arrays'][name] = {'dtype': dtype_descr(array.dtype),
+                                  'shape': array.shape, 'offset': offset}
+        data = array.tobytes()
+        chunks.append(data)
+        offset += len(data)
+
+    payload = json.dumps(header, default=float).encode('utf-8')
+    return b''.join([MAGIC, struct.pack('<HI', SNAPSHOT_VERSION, len(payload)), payload] + chunks)
+
+
+def save_snapshot(game, spawner=True):
+    return pack_snapshot(*snapshot_state(game, spawner))
+
+
+def parse_snapshot(data):
+    # Returns (header, arrays) with arrays as read-only views into data
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a battle royale snapshot")
+    version, length = struct.unpack_from('<HI', data, len(MAGIC))
+    if version not in READABLE_VERSIONS:
+        raise ValueError(f"unsupported snapshot version {version}")
+    start = len(MAGIC) + struct.calcsize('<HI')
+    header = json.loads(bytes(data[start:start + length]).decode('utf-8'))
+    base = start + length
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = dtype_from_descr(spec['dtype'])
+        count = int(np.prod(spec['shape'])) if spec['shape'] else 1
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count,
+                                     offset=base + spec['offset']).reshape(spec['shape'])
+    return header, arrays
+
+
+def load_snapshot(game, data, keep_world=False):
+    # With keep_world, terrain already generated from the same world seed is
+    # kept instead of starting over, for loading many snapshots of one match
+    return load_state(game, *parse_snapshot(data), keep_world=keep_world)
+
+
+def resize_bots(game, module, count):
+    # Keeps the existing bot objects, so a population that changed size
+    # only creates or drops the difference; dropped bots leave the render
+    # index with them
+    bots = game.bots
+    for bot in bots[count:]:
+        game.render_index.remove(bot)
+    del bots[count:]
+    while len(bots) < count:
+        bot = module.Bot(0, 0, (0, 0, 0))
+        bot.weapon_inventory = module.WeaponInventory()
+        bots.append(bot)
+
+
+def load_entities(game, module, table):
+    resize_bots(game, module, len(table) - 1)
+    player = game.player
+    row = table[0]
+    for name in PLAYER_FIELDS:
+        setattr(player, name, row[name].item())
+    player.color = tuple(row['color'].tolist())
+    if not math.isnan(row['facing_dx']):
+        player.facing_dx = row['facing_dx'].item()
+        player.facing_dy = row['facing_dy'].item()
+    bots = game.bots
+    rows = table[1:]
+    # A column at a time across every bot, with the loop over bots run by
+    # map rather than by Python code
+    for name in BOT_FIELDS:
+        deque(map(setattr, bots, repeat(name), rows[name].tolist()), maxlen=0)
+    deque(map(setattr, bots, repeat('color'), map(tuple, rows['color'].tolist())), maxlen=0)
+
+    # Weapons rarely change between snapshots of one match
+    weapons = table['weapon']
+    entities = [player] + bots
+    current = [entity.weapon_inventory.current_weapon.id for entity in entities]
+    for index in np.flatnonzero(weapons != current).tolist():
+        inventory = entities[index].weapon_inventory
+        inventory.current_weapon = list(inventory.weapons.values())[weapons[index]]
+
+    if 'plan_target' in table.dtype.names:
+        game.last_plan = (table['plan_target'].astype(np.int64), table['plan_step_x'].copy(),
+                          table['plan_step_y'].copy())
+    else:
+        game.last_plan = None
+
+
+def load_state(game, header, arrays, keep_world=False):
+    module = game_module(game)
+    if header['map'] != [module.MAP_WIDTH, module.MAP_HEIGHT]:
+        raise ValueError(f"snapshot is for a {header['map'][0]}x{header['map'][1]} map")
+
+    for name, value in header['game'].items():
+        setattr(game, name, value)
+    game.camera.x, game.camera.y, game.camera.zoom = header['camera']
+
+    load_entities(game, module, arrays['entities'])
+
+    bullets = game.bullets
+    bullets.clear()
+    bullets.add(*(arrays[f'bullet_{name}'] for name in BULLET_FIELDS))
+
+    # Particles are rebuilt without running their constructor, which would
+    # roll new random values. Damage numbers go through theirs, which only
+    # picks up the shared font from get_font.
+    game.particles = []
+    for x, y, dx, dy, lifetime, size, color in arrays['particles'].tolist():
+        particle = module.Particle.__new__(module.Particle)
+        particle.x, particle.y, particle.dx, particle.dy = x, y, dx, dy
+        particle.lifetime, particle.size, particle.color = lifetime, size, tuple(color.tolist())
+        game.particles.append(particle)
+    game.damage_numbers = []
+    for x, y, damage, lifetime, y_offset, alpha in arrays['damage_numbers'].tolist():
+        number = module.DamageNumber(x, y, damage)
+        number.lifetime, number.y_offset, number.alpha = lifetime, y_offset, alpha
+        game.damage_numbers.append(number)
+
+    storm = header['storm']
+    schedule = [StormPhase(kind, duration, tuple(center), radius, tuple(end_center), end_radius,
+                           damage) for kind, duration, center, radius, end_center, end_radius, damage
+                in storm['schedule']]
+    game.storm = Storm(schedule, storm['damage_interval'])
+    game.storm.next_damage_time = storm['next_damage_time']
+    game.update_safe_zone()
+
+    spawner = header['spawner']
+    if spawner is not None:
+        game.spawner.tables = {}
+        for weapon_name, info in spawner['tables'].items():
+            table = game.spawner.table_for(game.player.weapon_inventory.weapons[weapon_name])
+            table.cos = arrays[f'spread_cos_{weapon_name}'].copy()
+            table.sin = arrays[f'spread_sin_{weapon_name}'].copy()
+            table.cursor = info['cursor']
+        game.spawner.rng.bit_generator.state = spawner['rng']
+    game.spawner.requests = []
+
+    if keep_world and game.world.seed == header['world_seed']:
+        game.update_render_index()
+        game.update_world()
+    else:
+        game.start_world(header['world_seed'])
+    return game
+
+
+def write_snapshot(game, path):
+    data = save_snapshot(game)
+    with open(path, 'wb') as stream:
+        stream.write(data)
+    return len(data)
+
+
+def read_snapshot(game, path):
+    with open(path, 'rb') as stream:
+        return load_snapshot(game, stream.read())
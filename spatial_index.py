@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class UniformGrid:
+    # Buckets drawables by the world-space cells their bounding circle covers
+    # so a view query only visits the cells under the camera. Items keep the
+    # order they were inserted in, which is also the order they are drawn in.
+    def __init__(self, cell_size=200):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entries = {}
+        self.next_order = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item):
+        return id(item) in self.entries
+
+    def clear(self):
+        self.cells.clear()
+        self.entries.clear()
+        self.next_order = 0
+
+    def cell_range(self, x, y, radius):
+        cs = self.cell_size
+        return (int((x - radius) // cs), int((y - radius) // cs),
+                int((x + radius) // cs), int((y + radius) // cs))
+
+    def cell_ranges(self, x, y, radius):
+        # cell_range for arrays of positions, one row per position
+        cs = self.cell_size
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        return np.stack([(x - radius) // cs, (y - radius) // cs,
+                         (x + radius) // cs, (y + radius) // cs], axis=1).astype(np.int64)
+
+    def insert(self, item, x, y, radius):
+        cell_range = self.cell_range(x, y, radius)
+        entry = [item, radius, cell_range, self.next_order]
+        self.next_order += 1
+        self.entries[id(item)] = entry
+        self.add_to_cells(entry, cell_range)
+
+    def move(self, item, x, y):
+        # Only touches the buckets when the item has crossed a cell boundary
+        entry = self.entries[id(item)]
+        cell_range = self.cell_range(x, y, entry[1])
+        if cell_range != entry[2]:
+            self.remove_from_cells(entry, entry[2])
+            entry[2] = cell_range
+            self.add_to_cells(entry, cell_range)
+
+    def remove(self, item):
+        entry = self.entries.pop(id(item), None)
+        if entry is not None:
+            self.remove_from_cells(entry, entry[2])
+
+    def add_to_cells(self, entry, cell_range):
+        col0, row0, col1, row1 = cell_range
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                self.cells.setdefault((col, row), {})[id(entry[0])] = entry
+
+    def remove_from_cells(self, entry, cell_range):
+        col0, row0, col1, row1 = cell_range
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                bucket = self.cells.get((col, row))
+                if bucket is not None:
+                    bucket.pop(id(entry[0]), None)
+                    if not bucket:
+                        del self.cells[(col, row)]
+
+    def query(self, left, top, right, bottom):
+        # Returns the items whose bounds may intersect the rect, in insertion order
+        cs = self.cell_size
+        found = {}
+        for row in range(int(top // cs), int(bottom // cs) + 1):
+            for col in range(int(left // cs), int(right // cs) + 1):
+                bucket = self.cells.get((col, row))
+                if bucket:
+                    found.update(bucket)
+        entries = sorted(found.values(), key=lambda entry: entry[3])
+        return [entry[0] for entry in entries]
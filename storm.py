@@ -0,0 +1,132 @@
+import bisect
+import math
+import random
+import numpy as np
+
+WAIT = 'wait'
+SHRINK = 'shrink'
+HOLD = 'hold'
+
+
+class StormPhase:
+    def __init__(self, kind, duration, center, radius, end_center=None, end_radius=None,
+                 damage_per_second=0):
+        self.kind = kind
+        self.duration = duration  # Milliseconds of sim time
+        self.center = center
+        self.radius = radius
+        self.end_center = end_center if end_center is not None else center
+        self.end_radius = end_radius if end_radius is not None else radius
+        self.damage_per_second = damage_per_second
+
+    def state_at(self, elapsed):
+        # Shrink phases move the circle linearly from start to end over the phase
+        if self.kind != SHRINK or self.duration <= 0:
+            return self.end_center, self.end_radius
+        progress = min(1.0, max(0.0, elapsed / self.duration))
+        center = (self.center[0] + (self.end_center[0] - self.center[0]) * progress,
+                  self.center[1] + (self.end_center[1] - self.center[1]) * progress)
+        radius = self.radius + (self.end_radius - self.radius) * progress
+        return center, radius
+
+
+# (fraction of the starting radius, shrink ms, hold ms, damage scale) per shrink
+DEFAULT_SHRINKS = ((0.65, 45000, 20000, 0.5),
+                   (0.35, 40000, 15000, 0.75),
+                   (0.0, 35000, 0, 1.0))
+
+
+def default_schedule(map_width, map_height, damage_per_second, seed=None, wait_time=20000,
+                     min_radius=100, shrinks=DEFAULT_SHRINKS):
+    rng = random.Random(seed)
+    center = (map_width // 2, map_height // 2)
+    radius = min(map_width, map_height) // 2
+    phases = [StormPhase(WAIT, wait_time, center, radius)]
+
+    # Each shrink closes in on a new circle that lies inside the previous one,
+    # pausing between shrinks, with the damage rising as the zone gets smaller
+    for fraction, shrink_time, hold_time, damage_scale in shrinks:
+        end_radius = max(min_radius, radius * fraction) if fraction else min_radius
+        drift = rng.uniform(0, radius - end_radius)
+        angle = rng.uniform(0, 2 * math.pi)
+        end_center = (center[0] + math.cos(angle) * drift, center[1] + math.sin(angle) * drift)
+        damage = damage_per_second * damage_scale
+        phases.append(StormPhase(SHRINK, shrink_time, center, radius, end_center, end_radius, damage))
+        if hold_time:
+            phases.append(StormPhase(HOLD, hold_time, end_center, end_radius,
+                                     damage_per_second=damage))
+        center, radius = end_center, end_radius
+
+    # The final circle holds for the rest of the match
+    phases.append(StormPhase(HOLD, math.inf, center, radius, damage_per_second=damage_per_second))
+    return phases
+
+
+class Storm:
+    def __init__(self, schedule, damage_interval=500):
+        self.schedule = schedule
+        self.damage_interval = damage_interval
+        self.phase_starts = []
+        elapsed = 0
+        for phase in schedule:
+            self.phase_starts.append(elapsed)
+            elapsed += phase.duration
+        self.phase_index = 0
+        self.center = schedule[0].center
+        self.radius = schedule[0].radius
+        self.next_damage_time = 0
+        self.update(0)
+
+    @property
+    def phase(self):
+        return self.schedule[self.phase_index]
+
+    @property
+    def started(self):
+        # The storm counts as started once the opening wait is over
+        return self.phase_index > 0 or self.phase.kind != WAIT
+
+    def update(self, sim_time):
+        self.phase_index = max(0, bisect.bisect_right(self.phase_starts, sim_time) - 1)
+        self.center, self.radius = self.phase.state_at(sim_time - self.phase_starts[self.phase_index])
+
+    def next_target(self):
+        # Where the zone is heading: the end circle of the current shrink, or
+        # of the next one while waiting or holding
+        for phase in self.schedule[self.phase_index:]:
+            if phase.kind == SHRINK:
+                return phase.end_center, phase.end_radius
+        return self.phase.end_center, self.phase.end_radius
+
+    def time_until_start(self, sim_time):
+        for phase, start in zip(self.schedule, self.phase_starts):
+            if phase.kind != WAIT:
+                return max(0, start - sim_time)
+        return 0
+
+    def damage_due(self, sim_time):
+        return sim_time >= self.next_damage_time
+
+    def apply_damage(self, sim_time, x, y, health, alive):
+        # Deals all damage ticks that have elapsed up to sim_time to every
+        # living entity outside the circle, updating health and alive in place.
+        # Returns the mask of entities that took damage.
+        damaged = np.zeros(len(x), dtype=bool)
+        while sim_time >= self.next_damage_time:
+            tick_time = self.next_damage_time
+            self.next_damage_time += self.damage_interval
+            self.update(tick_time)
+            damage = self.phase.damage_per_second * self.damage_interval / 1000
+            if not self.started or damage <= 0:
+                continue
+
+            dx = x - self.center[0]
+            dy = y - self.center[1]
+            outside = alive & (dx * dx + dy * dy > self.radius * self.radius)
+            health[outside] -= damage
+            alive &= health > 0
+            damaged |= outside
+
+        np.maximum(health, 0, out=health)
+        self.update(sim_time)
+        return damaged
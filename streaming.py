@@ -0,0 +1,225 @@
+import base64
+import collections
+import io
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import numpy as np
+import pygame
+
+# Streams a headless match to browsers as Server-Sent Events.
+#
+# Every frame is compared with the previous one tile by tile. Clients get a
+# JPEG keyframe of the whole frame when they connect and every
+# KEYFRAME_INTERVAL seconds, and in between only the tiles that changed
+# since the last frame they were sent. Tiles are JPEG-encoded in a pool of
+# worker processes, and each encoded tile is shared by every client that
+# needs it.
+#
+# Each client has a small message queue. When it is still full at the
+# client's next frame the client is falling behind, so it moves one level
+# down CLIENT_LEVELS (fewer frames, then half resolution); after
+# UPGRADE_AFTER frames sent without backlog it moves one level back up.
+
+TILE_SIZE = 100
+STREAM_FPS = 30
+KEYFRAME_INTERVAL = 2.0   # Seconds between keyframes for each client
+CLIENT_QUEUE_SIZE = 2
+UPGRADE_AFTER = 90
+
+# (send every Nth frame, downscale factor) from best to cheapest
+CLIENT_LEVELS = [(1, 1), (2, 1), (3, 1), (2, 2), (4, 2), (8, 2)]
+
+
+def encode_jpeg(job):
+    raw, width, height = job
+    surface = pygame.image.frombuffer(raw, (width, height), 'RGB')
+    stream = io.BytesIO()
+    pygame.image.save(surface, stream, 'frame.jpg')
+    return stream.getvalue()
+
+
+def dirty_tiles(previous, current, tile_size):
+    # (columns, rows) mask of tiles whose pixels differ; frames are (w, h, 3)
+    changed = (previous != current).any(axis=2)
+    width, height = changed.shape
+    columns = -(-width // tile_size)
+    rows = -(-height // tile_size)
+    padded = np.zeros((columns * tile_size, rows * tile_size), dtype=bool)
+    padded[:width, :height] = changed
+    return padded.reshape(columns, tile_size, rows, tile_size).any(axis=(1, 3))
+
+
+def region_job(pixels, left, top, width, height):
+    # pixels is (w, h, 3); JPEG rows run along y
+    region = pixels[left:left + width, top:top + height]
+    return (np.ascontiguousarray(region.transpose(1, 0, 2)).tobytes(),
+            region.shape[0], region.shape[1])
+
+
+class StreamClient:
+    def __init__(self):
+        self.messages = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.level = 0
+        self.scale = None          # Scale of the last keyframe sent
+        self.pending = None        # Tiles changed since the last frame sent; None needs a keyframe
+        self.next_keyframe = 0
+        self.clean_frames = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.connected_at = time.monotonic()
+
+    def stats(self):
+        elapsed = max(time.monotonic() - self.connected_at, 1e-6)
+        interval, scale = CLIENT_LEVELS[self.level]
+        return {
+            'level': self.level,
+            'frame_interval': interval,
+            'scale': scale,
+            'fps': round(self.frames_sent / elapsed, 1),
+            'bytes_per_second': round(self.bytes_sent / elapsed),
+        }
+
+
+class FrameStreamer:
+    # Owns a headless game: advances it in real time, renders each frame to
+    # the game's offscreen surface and hands encoded frames to every client.
+    # reset_match is called when a match ends.
+    def __init__(self, game, reset_match, fps=STREAM_FPS, ticks_per_frame=2, workers=2):
+        self.game = game
+        self.reset_match = reset_match
+        self.fps = fps
+        self.ticks_per_frame = ticks_per_frame
+        self.clients = []
+        self.lock = threading.Lock()
+        # Spawned rather than forked, since the server is already threaded
+        self.pool = multiprocessing.get_context('spawn').Pool(workers) if workers > 0 else None
+        self.previous = None
+        self.frame_number = 0
+        self.running = False
+        self.thread = threading.Thread(target=self.run, name='frame-streamer', daemon=True)
+
+    def start(self):
+        self.running = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        if self.pool:
+            self.pool.terminate()
+
+    def add_client(self):
+        client = StreamClient()
+        with self.lock:
+            self.clients.append(client)
+        return client
+
+    def remove_client(self, client):
+        with self.lock:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def stats(self):
+        with self.lock:
+            return {'frame': self.frame_number, 'clients': [client.stats() for client in self.clients]}
+
+    def encode(self, jobs):
+        if self.pool:
+            return self.pool.map(encode_jpeg, jobs)
+        return [encode_jpeg(job) for job in jobs]
+
+    def run(self):
+        no_input = collections.defaultdict(bool)
+        frame_time = 1 / self.fps
+        next_frame = time.perf_counter()
+        while self.running:
+            for _ in range(self.ticks_per_frame):
+                self.game.step(no_input)
+                if self.game.game_over:
+                    self.reset_match(self.game)
+            self.game.draw_view(self.game.screen, self.game.render_view())
+            self.publish(pygame.surfarray.array3d(self.game.screen))
+
+            next_frame += frame_time
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.perf_counter()
+
+    def publish(self, pixels):
+        dirty = (np.ones((-(-pixels.shape[0] // TILE_SIZE), -(-pixels.shape[1] // TILE_SIZE)), dtype=bool)
+                 if self.previous is None else dirty_tiles(self.previous, pixels, TILE_SIZE))
+        self.previous = pixels
+        self.frame_number += 1
+        now = time.monotonic()
+
+        with self.lock:
+            clients = list(self.clients)
+
+        # Decide what each client gets this frame
+        plans = []
+        for client in clients:
+            if client.pending is not None:
+                client.pending |= dirty
+            interval, scale = CLIENT_LEVELS[client.level]
+            if self.frame_number % interval:
+                continue
+            if client.messages.full():
+                # Still busy with earlier frames: back off and keep the tiles pending
+                client.level = min(client.level + 1, len(CLIENT_LEVELS) - 1)
+                client.clean_frames = 0
+                continue
+            client.clean_frames += 1
+            if client.clean_frames >= UPGRADE_AFTER and client.level > 0:
+                client.level -= 1
+                client.clean_frames = 0
+                interval, scale = CLIENT_LEVELS[client.level]
+            if client.pending is None or scale != client.scale or now >= client.next_keyframe:
+                plans.append((client, scale, None))
+            elif client.pending.any():
+                plans.append((client, scale, np.argwhere(client.pending)))
+        if not plans:
+            return
+
+        # Encode each keyframe and tile once per scale, in the worker pool
+        scaled = {}
+        for _, scale, _ in plans:
+            if scale not in scaled:
+                scaled[scale] = pixels if scale == 1 else pixels[::scale, ::scale]
+        jobs = {}
+        for _, scale, tiles in plans:
+            frame = scaled[scale]
+            if tiles is None:
+                jobs.setdefault((scale, None), region_job(frame, 0, 0, *frame.shape[:2]))
+                continue
+            size = TILE_SIZE // scale
+            for column, row in tiles.tolist():
+                jobs.setdefault((scale, column, row),
+                                region_job(frame, column * size, row * size, size, size))
+        encoded = dict(zip(jobs, (base64.b64encode(data).decode('ascii')
+                                  for data in self.encode(list(jobs.values())))))
+
+        for client, scale, tiles in plans:
+            frame = scaled[scale]
+            if tiles is None:
+                message = {'type': 'key', 'width': frame.shape[0], 'height': frame.shape[1],
+                           'scale': scale, 'image': encoded[(scale, None)]}
+                client.scale = scale
+                client.next_keyframe = now + KEYFRAME_INTERVAL
+            else:
+                message = {'type': 'delta', 'tile': TILE_SIZE // scale,
+                           'tiles': [[column, row, encoded[(scale, column, row)]]
+                                     for column, row in tiles.tolist()]}
+            client.pending = np.zeros_like(dirty)
+            data = f"event: frame\ndata: {json.dumps(message)}\n\n".encode('ascii')
+            try:
+                client.messages.put_nowait(data)
+            except queue.Full:
+                client.pending = None
+                continue
+            client.frames_sent += 1
+            client.bytes_sent += len(data)
@@ -0,0 +1,151 @@
+import gzip
+import json
+import queue
+import struct
+import threading
+import numpy as np
+
+SHOT = 1
+HIT = 2
+KILL = 3
+ZONE_DAMAGE = 4
+WEAPON_SWITCH = 5
+MATCH_START = 6
+
+EVENT_NAMES = {
+    SHOT: 'shot',
+    HIT: 'hit',
+    KILL: 'kill',
+    ZONE_DAMAGE: 'zone_damage',
+    WEAPON_SWITCH: 'weapon_switch',
+    MATCH_START: 'match_start',
+}
+
+# One fixed-width record per event. actor/target are entity indexes in
+# [player] + bots (-1 for none), x/y is where the event happened and
+# src_x/src_y where its actor stood. value holds damage dealt.
+EVENT_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('kind', 'u1'),
+    ('weapon', 'u1'),
+    ('actor', '<i4'),
+    ('target', '<i4'),
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('src_x', '<f4'),
+    ('src_y', '<f4'),
+    ('value', '<f4'),
+])
+
+# Binary logs start with MAGIC, a little-endian u32 header length and a JSON
+# header, followed by raw EVENT_DTYPE records up to the end of the file
+MAGIC = b'BRTL0001'
+
+
+def write_binary_header(stream, header):
+    payload = json.dumps(header).encode('utf-8')
+    stream.write(MAGIC)
+    stream.write(struct.pack('<I', len(payload)))
+    stream.write(payload)
+
+
+def read_binary_header(path):
+    # Returns (header, offset of the first record)
+    with open(path, 'rb') as stream:
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a telemetry log")
+        length, = struct.unpack('<I', stream.read(4))
+        header = json.loads(stream.read(length).decode('utf-8'))
+    return header, len(MAGIC) + 4 + length
+
+
+class TelemetryRecorder:
+    # Events are written into a preallocated ring buffer on the game thread
+    # and handed to a background thread in batches for writing, so recording
+    # an event is a single row assignment. If the writer falls a full ring
+    # behind, new events are dropped and counted rather than blocking a frame.
+    def __init__(self, path, capacity=1 << 16, batch_size=4096, metadata=None):
+        self.path = path
+        self.binary = not path.endswith('.jsonl.gz')
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.head = 0      # Events recorded so far
+        self.queued = 0    # Events handed to the writer
+        self.written = 0   # Events the writer has finished with
+        self.dropped = 0
+        self.header = {
+            'format': 1,
+            'dtype': [(name, EVENT_DTYPE[name].str) for name in EVENT_DTYPE.names],
+            'events': {str(kind): name for kind, name in EVENT_NAMES.items()},
+            'metadata': metadata or {},
+        }
+        self.batches = queue.Queue()
+        self.thread = threading.Thread(target=self.write_batches, name='telemetry-writer',
+                                       daemon=True)
+        self.thread.start()
+
+    def record(self, time, kind, actor=-1, target=-1, x=0, y=0, src_x=0, src_y=0, value=0,
+               weapon=0):
+        if self.head - self.written >= self.capacity:
+            self.dropped += 1
+            return
+        self.buffer[self.head % self.capacity] = (time, kind, weapon, actor, target,
+                                                  x, y, src_x, src_y, value)
+        self.head += 1
+        if self.head - self.queued >= self.batch_size:
+            self.flush()
+
+    def record_many(self, time, kind, actor, target, x, y, src_x, src_y, value, weapon=0):
+        # Vectorized record for many events of one kind; arguments broadcast
+        columns = (('time', time), ('kind', kind), ('weapon', weapon), ('actor', actor),
+                   ('target', target), ('x', x), ('y', y), ('src_x', src_x), ('src_y', src_y),
+                   ('value', value))
+        total = np.broadcast(*(np.atleast_1d(values) for _, values in columns)).size
+        room = self.capacity - (self.head - self.written)
+        count = min(total, room)
+        self.dropped += total - count
+        if count <= 0:
+            return
+        rows = (self.head + np.arange(count)) % self.capacity
+        for name, values in columns:
+            self.buffer[name][rows] = np.broadcast_to(values, (total,))[:count]
+        self.head += count
+        if self.head - self.queued >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.head > self.queued:
+            self.batches.put((self.queued, self.head))
+            self.queued = self.head
+
+    def close(self):
+        self.flush()
+        self.batches.put(None)
+        self.thread.join()
+
+    def write_batches(self):
+        if self.binary:
+            stream = open(self.path, 'wb')
+            write_binary_header(stream, self.header)
+        else:
+            stream = gzip.open(self.path, 'wt', encoding='utf-8')
+            stream.write(json.dumps({'header': self.header}) + '\n')
+
+        with stream:
+            while True:
+                batch = self.batches.get()
+                if batch is None:
+                    break
+                start, end = batch
+                rows = (np.arange(start, end) % self.capacity)
+                records = self.buffer[rows]
+                self.written = end
+                if self.binary:
+                    stream.write(records.tobytes())
+                else:
+                    names = EVENT_DTYPE.names
+                    for row in records.tolist():
+                        event = dict(zip(names, row))
+                        event['kind'] = EVENT_NAMES.get(event['kind'], event['kind'])
+                        stream.write(json.dumps(event) + '\n')
@@ -0,0 +1,185 @@
+import math
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+TERRAIN_TYPES = ('water', 'sand', 'tree', 'rock', 'grass')
+PATCH_DTYPE = np.dtype([('x', '<f4'), ('y', '<f4'), ('size', '<f4'), ('type', 'u1')])
+
+# Patches per square pixel, matching the 3 lakes, 50 trees, 30 rocks and 200
+# grass patches the original 2400x1750 playfield was populated with
+REFERENCE_AREA = 2400 * 1750
+DENSITY = {
+    'water': 3 / REFERENCE_AREA,
+    'tree': 50 / REFERENCE_AREA,
+    'rock': 30 / REFERENCE_AREA,
+    'grass': 200 / REFERENCE_AREA,
+}
+SIZE_RANGE = {
+    'water': (100, 200),
+    'tree': (30, 50),
+    'rock': (20, 35),
+    'grass': (20, 40),
+}
+SAND_SIZE = 40
+SAND_PER_WATER = 8
+
+# Farthest any patch reaches from the chunk that generated it (a lake's sand ring)
+MAX_PATCH_REACH = SIZE_RANGE['water'][1] + 20 + SAND_SIZE
+
+
+def generate_chunk(seed, cx, cy, left, top, right, bottom):
+    # Terrain for one chunk depends only on (seed, cx, cy) so a chunk can be
+    # thrown away and regenerated identically at any time
+    rng = np.random.default_rng([seed, cx, cy])
+    area = max(0, right - left) * max(0, bottom - top)
+    records = []
+
+    for _ in range(rng.poisson(DENSITY['water'] * area)):
+        x = rng.uniform(left, right)
+        y = rng.uniform(top, bottom)
+        size = rng.integers(*SIZE_RANGE['water'], endpoint=True)
+        records.append((x, y, size, TERRAIN_TYPES.index('water')))
+        # Add sand around water
+        for i in range(SAND_PER_WATER):
+            angle = i * (2 * math.pi / SAND_PER_WATER)
+            records.append((x + math.cos(angle) * (size + 20), y + math.sin(angle) * (size + 20),
+                            SAND_SIZE, TERRAIN_TYPES.index('sand')))
+
+    for kind in ('tree', 'rock', 'grass'):
+        count = rng.poisson(DENSITY[kind] * area)
+        xs = rng.uniform(left, right, count)
+        ys = rng.uniform(top, bottom, count)
+        sizes = rng.integers(*SIZE_RANGE[kind], size=count, endpoint=True)
+        records.extend(zip(xs.tolist(), ys.tolist(), sizes.tolist(),
+                           [TERRAIN_TYPES.index(kind)] * count))
+
+    return np.array(records, dtype=PATCH_DTYPE)
+
+
+class ChunkedWorld:
+    # Terrain is generated a chunk at a time on first use. At most max_loaded
+    # chunks are kept as live patch objects, least recently used first out,
+    # or more while the entities and camera need more at once (see ensure).
+    # Evicted chunks are kept as compressed records, which reload quicker
+    # than regenerating; past max_stored the oldest are dropped, since a
+    # chunk regenerates identically from the seed.
+    def __init__(self, seed, width, height, top=0, make_patch=None, chunk_size=600,
+                 max_loaded=256, on_load=None, on_unload=None, max_stored=1024):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.top = top
+        self.make_patch = make_patch
+        self.chunk_size = chunk_size
+        self.min_loaded = max_loaded
+        self.max_loaded = max_loaded
+        self.max_stored = max_stored
+        self.on_load = on_load
+        self.on_unload = on_unload
+        self.cols = int(math.ceil(width / chunk_size))
+        self.rows = int(math.ceil(height / chunk_size))
+        self.loaded = OrderedDict()
+        self.stored = OrderedDict()
+
+    def chunk_bounds(self, cx, cy):
+        cs = self.chunk_size
+        return (cx * cs, max(self.top, cy * cs),
+                min(self.width, (cx + 1) * cs), min(self.height, (cy + 1) * cs))
+
+    def chunk_of(self, x, y):
+        return (min(self.cols - 1, max(0, int(x // self.chunk_size))),
+                min(self.rows - 1, max(0, int(y // self.chunk_size))))
+
+    def patches(self):
+        for patches in self.loaded.values():
+            yield from patches
+
+    def load(self, key):
+        patches = self.loaded.get(key)
+        if patches is not None:
+            self.loaded.move_to_end(key)
+            return patches
+
+        compact = self.stored.pop(key, None)
+        if compact is not None:
+            records = np.frombuffer(zlib.decompress(compact), dtype=PATCH_DTYPE)
+        else:
+            records = generate_chunk(self.seed, key[0], key[1], *self.chunk_bounds(*key))
+        patches = [self.make_patch(x, y, size, TERRAIN_TYPES[kind])
+                   for x, y, size, kind in records.tolist()]
+        self.loaded[key] = patches
+        if self.on_load:
+            self.on_load(key, patches)
+
+        self.evict_over(self.max_loaded)
+        return patches
+
+    def evict_over(self, count):
+        while len(self.loaded) > count:
+            self.evict(next(iter(self.loaded)))
+
+    def evict(self, key):
+        patches = self.loaded.pop(key)
+        records = np.array([(p.x, p.y, p.size, TERRAIN_TYPES.index(p.type)) for p in patches],
+                           dtype=PATCH_DTYPE)
+        self.stored[key] = zlib.compress(records.tobytes())
+        while len(self.stored) > self.max_stored:
+            self.stored.popitem(last=False)
+        if self.on_unload:
+            self.on_unload(key, patches)
+
+    def ensure(self, keys):
+        # Loads every chunk in keys, in order. The LRU is first sized to hold
+        # them all with room to spare, so a crowd spread over more chunks
+        # than max_loaded doesn't evict chunks it is about to load again;
+        # once the crowd thins out it shrinks back.
+        keys = dict.fromkeys(keys)
+        self.max_loaded = max(self.min_loaded, len(keys) + len(keys) // 4)
+        for key in keys:
+            self.load(key)
+        self.evict_over(self.max_loaded)
+
+    def rect_keys(self, left, top, right, bottom):
+        # Patches can reach past the chunk that owns them, so neighbours of
+        # the rect are loaded as well
+        col0, row0 = self.chunk_of(left - MAX_PATCH_REACH, top - MAX_PATCH_REACH)
+        col1, row1 = self.chunk_of(right + MAX_PATCH_REACH, bottom + MAX_PATCH_REACH)
+        return [(cx, cy) for cy in range(row0, row1 + 1) for cx in range(col0, col1 + 1)]
+
+    def point_keys(self, x, y, radius):
+        # Every chunk within radius of any of the given positions
+        if len(x) == 0:
+            return []
+        reach = radius + MAX_PATCH_REACH
+        cs = self.chunk_size
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        col0 = np.clip(((x - reach) // cs).astype(np.int64), 0, self.cols - 1)
+        col1 = np.clip(((x + reach) // cs).astype(np.int64), 0, self.cols - 1)
+        row0 = np.clip(((y - reach) // cs).astype(np.int64), 0, self.rows - 1)
+        row1 = np.clip(((y + reach) // cs).astype(np.int64), 0, self.rows - 1)
+        # Most positions share their chunk range with others; a flat key
+        # dedups them far quicker than np.unique over rows
+        keys = np.unique(((col0 * self.rows + row0) * self.cols + col1) * self.rows + row1)
+        row1, keys = keys % self.rows, keys // self.rows
+        col1, keys = keys % self.cols, keys // self.cols
+        row0, col0 = keys % self.rows, keys // self.rows
+        return [(cx, cy)
+                for c0, r0, c1, r1 in zip(col0.tolist(), row0.tolist(), col1.tolist(), row1.tolist())
+                for cy in range(r0, r1 + 1) for cx in range(c0, c1 + 1)]
+
+    def neighbour_patches(self, key):
+        # Patches of the loaded chunks around key, which may reach into it
+        cx, cy = key
+        for ny in range(cy - 1, cy + 2):
+            for nx in range(cx - 1, cx + 2):
+                if (nx, ny) != key:
+                    yield from self.loaded.get((nx, ny), ())
+
+    def ensure_rect(self, left, top, right, bottom):
+        self.ensure(self.rect_keys(left, top, right, bottom))
+
+    def ensure_points(self, x, y, radius):
+        # Loads every chunk within radius of any of the given positions
+        self.ensure(self.point_keys(x, y, radius))